@@ -0,0 +1,154 @@
+"""
+Registro de asistencias como libro de movimientos (solo se agregan entradas)
+con contadores incrementales del día y de la semana ISO actuales.
+
+Formato compacto de cada administrador en attendance_data.json:
+    name, total_attendance, manual_weekly_attendance,
+    ledger: [[timestamp, tipo, cantidad, contraparte]]  (en orden cronológico),
+    current_day, day_count, current_week, week_count,
+    weeks: {"AAAA-Www": [lun, mar, mié, jue, vie, sáb, dom]},
+    archived_attendance: asistencias de semanas ya descartadas por la retención
+"""
+
+from bisect import bisect_left
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+# Tipos de movimiento (códigos cortos para el archivo)
+KIND_GRANT = "g"            # asistencia diaria otorgada
+KIND_MANUAL_DAILY = "md"    # asistencias diarias agregadas manualmente
+KIND_MANUAL_WEEKLY = "mw"   # asistencias semanales agregadas manualmente
+KIND_TRANSFER_IN = "ti"
+KIND_TRANSFER_OUT = "to"
+
+# Movimientos que cuentan como asistencias del día
+DAILY_KINDS = (KIND_GRANT, KIND_MANUAL_DAILY, KIND_TRANSFER_IN, KIND_TRANSFER_OUT)
+
+# Solo los días de lunes a viernes cuentan para el límite semanal
+WEEKLY_LIMIT_WEEKDAYS = 5
+DAYS_PER_WEEK = 7
+
+
+def week_key(day: date) -> str:
+    """Clave de la semana ISO de un día ("2025-W26")"""
+    iso_year, iso_week, _ = day.isocalendar()
+    return f"{iso_year}-W{iso_week:02d}"
+
+
+def week_end(key: str) -> date:
+    """Domingo de una semana ISO a partir de su clave"""
+    iso_year, iso_week = key.split("-W")
+    return date.fromisocalendar(int(iso_year), int(iso_week), DAYS_PER_WEEK)
+
+
+def new_admin_record(name: str) -> Dict[str, Any]:
+    """Registro vacío de asistencias de un administrador"""
+    return {
+        'name': name,
+        'total_attendance': 0,
+        'manual_weekly_attendance': 0,
+        'ledger': [],
+        'current_day': None,
+        'day_count': 0,
+        'current_week': None,
+        'week_count': 0,
+        'weeks': {},
+        'archived_attendance': 0,
+    }
+
+
+def _add_to_week(admin_data: Dict[str, Any], day: date, amount: int) -> None:
+    """Sumar asistencias al día correspondiente del arreglo de su semana"""
+    week = admin_data['weeks'].setdefault(week_key(day), [0] * DAYS_PER_WEEK)
+    week[day.weekday()] += amount
+
+
+def migrate_admin_record(admin_data: Dict[str, Any], now: datetime) -> None:
+    """Convertir un registro con asistencias por fecha (daily_attendance) al formato compacto"""
+    daily_attendance = admin_data.pop('daily_attendance', None)
+    for key, value in new_admin_record(admin_data.get('name', '')).items():
+        admin_data.setdefault(key, value)
+
+    if not daily_attendance:
+        return
+
+    today = now.date()
+    this_week = week_key(today)
+    admin_data['current_day'] = today.isoformat()
+    admin_data['current_week'] = this_week
+
+    for day_text, count in daily_attendance.items():
+        try:
+            day = date.fromisoformat(day_text)
+        except ValueError:
+            continue
+        _add_to_week(admin_data, day, count)
+        if day == today:
+            admin_data['day_count'] += count
+        if week_key(day) == this_week and day.weekday() < WEEKLY_LIMIT_WEEKDAYS:
+            admin_data['week_count'] += count
+
+
+def roll(admin_data: Dict[str, Any], now: datetime) -> None:
+    """Reiniciar los contadores si cambió el día o la semana (el detalle ya está en `weeks`)"""
+    today = now.date()
+    today_text = today.isoformat()
+    if admin_data.get('current_day') != today_text:
+        admin_data['current_day'] = today_text
+        admin_data['day_count'] = 0
+
+    this_week = week_key(today)
+    if admin_data.get('current_week') != this_week:
+        admin_data['current_week'] = this_week
+        admin_data['week_count'] = 0
+
+
+def record(admin_data: Dict[str, Any], kind: str, quantity: int, now: datetime,
+           counterparty: Optional[str] = None) -> None:
+    """Agregar un movimiento al libro y actualizar los contadores"""
+    roll(admin_data, now)
+    admin_data.setdefault('ledger', []).append([int(now.timestamp()), kind, quantity, counterparty])
+
+    signed = -quantity if kind == KIND_TRANSFER_OUT else quantity
+    if kind in DAILY_KINDS:
+        admin_data['day_count'] += signed
+        if now.weekday() < WEEKLY_LIMIT_WEEKDAYS:
+            admin_data['week_count'] += signed
+        _add_to_week(admin_data, now.date(), signed)
+    elif kind == KIND_MANUAL_WEEKLY:
+        admin_data['manual_weekly_attendance'] = admin_data.get('manual_weekly_attendance', 0) + quantity
+
+    admin_data['total_attendance'] = max(0, admin_data.get('total_attendance', 0) + signed)
+
+
+def daily_count(admin_data: Dict[str, Any], now: datetime) -> int:
+    """Asistencias del día actual"""
+    roll(admin_data, now)
+    return admin_data['day_count']
+
+
+def weekly_count(admin_data: Dict[str, Any], now: datetime) -> int:
+    """Asistencias de la semana actual (lunes a viernes más las manuales semanales)"""
+    roll(admin_data, now)
+    return admin_data['week_count'] + admin_data.get('manual_weekly_attendance', 0)
+
+
+def prune(admin_data: Dict[str, Any], cutoff: datetime) -> int:
+    """
+    Descartar movimientos anteriores a `cutoff` y archivar las semanas que
+    terminaron antes de esa fecha. Devuelve la cantidad de elementos descartados.
+    """
+    ledger = admin_data.get('ledger', [])
+    # El libro está en orden cronológico: basta con buscar el punto de corte
+    cut = bisect_left(ledger, int(cutoff.timestamp()), key=lambda entry: entry[0])
+    if cut:
+        del ledger[:cut]
+
+    cutoff_day = cutoff.date()
+    weeks = admin_data.get('weeks', {})
+    expired = [key for key in weeks if week_end(key) < cutoff_day]
+    for key in expired:
+        admin_data['archived_attendance'] = admin_data.get('archived_attendance', 0) + sum(weeks.pop(key))
+
+    return cut + len(expired)
+
@@ -42,14 +42,34 @@ except ImportError:
         exit(1)
 
 from discord.ext import commands
+import aiohttp
 import json
 import os
+import signal
+import time
+import functools
+from collections import deque
 from datetime import datetime, timedelta
 import asyncio
 import pytz
 from zoneinfo import ZoneInfo
 
+import resilience
+from resilience import CircuitOpenError, ResilienceError, RetryPolicy
+from credit_engine import CreditRules
+from embed_pages import DEFAULT_EMBED_OVERHEAD, EMBED_TOTAL_LIMIT, fit_description, pack_pages
+from limit_engine import LimitScheduler, effective_limit_hours, limit_deadline
+from payroll_export import write_export
+from report_cache import LRUCache, SingleFlight
+from role_cache import RoleClassifier
+from rollups import month_range, week_range
+from status_engine import (
+    DEFAULT_LIMIT_HOURS, STATUS_ACTIVE, STATUS_FINISHED, STATUS_INACTIVE, STATUS_PAUSED,
+    format_limit_hours, get_status, get_status_label,
+    role_label, role_limit_hours
+)
 from time_tracker import TimeTracker
+from voice_tracking import VoiceDebouncer, is_tracked_channel
 
 # Configuración del bot
 intents = discord.Intents.default()
@@ -58,7 +78,22 @@ intents.guilds = True
 intents.members = True
 intents.message_content = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+class TimeTrackerCommandTree(discord.app_commands.CommandTree):
+    """Árbol de comandos que rechaza nuevas interacciones durante el apagado"""
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if shutdown_coordinator.is_shutting_down:
+            try:
+                await interaction.response.send_message(
+                    "🛑 El bot se está reiniciando. Intenta de nuevo en unos segundos.",
+                    ephemeral=True
+                )
+            except Exception:
+                pass
+            return False
+        return True
+
+bot = commands.Bot(command_prefix='!', intents=intents, tree_cls=TimeTrackerCommandTree)
 time_tracker = TimeTracker()
 
 # Rol especial para tiempo ilimitado (se carga desde config.json)
@@ -106,22 +141,137 @@ except Exception as e:
     PAUSE_NOTIFICATION_CHANNEL_ID = 1387194620961751070
     CANCELLATION_NOTIFICATION_CHANNEL_ID = 1387194756211146792
 
+# Clasificación de miembros por ID de rol (mapa ID → tipo precalculado desde config.json)
+role_classifier = RoleClassifier(config.get('role_tiers', {}), UNLIMITED_TIME_ROLE_ID)
+
+# Tabla de créditos por tipo de rol (config.json → credit_rules)
+credit_rules = CreditRules.from_config(config.get('credit_rules'))
+
 # Task para verificar milestones periódicamente
 milestone_check_task = None
 
+# Configuración del seguimiento de tiempo (config.json → time_tracking)
+TIME_TRACKING_CONFIG = config.get('time_tracking', {})
+CLEANUP_INACTIVE_DAYS = TIME_TRACKING_CONFIG.get('cleanup_inactive_days', 30)
+MAX_TIME_HOURS = TIME_TRACKING_CONFIG.get('max_time_hours', 168)
+
+# Tasks de retención de asistencias y limpieza de usuarios inactivos
+attendance_retention_task = None
+user_cleanup_task = None
+
+# =================== REGISTRO DE CANALES ===================
+
+class ChannelRegistry:
+    """Caché de canales de notificación, resueltos una sola vez y actualizados por eventos"""
+
+    def __init__(self):
+        self.channel_ids = {}
+        self.channels = {}
+        self.missing_ids = set()
+
+    def set_channel_id(self, key: str, channel_id):
+        """Registrar el ID de canal de un tipo de notificación (se resuelve al usarlo)"""
+        if not channel_id:
+            self.channel_ids.pop(key, None)
+            self.channels.pop(key, None)
+            return
+        self.channel_ids[key] = channel_id
+        self.channels.pop(key, None)
+        self.missing_ids.discard(channel_id)
+
+    def set_channel(self, key: str, channel):
+        """Actualizar en vivo el canal de un tipo de notificación"""
+        self.channel_ids[key] = channel.id
+        self.channels[key] = channel
+        self.missing_ids.discard(channel.id)
+
+    def get(self, key: str):
+        """Obtener un canal desde la caché o desde la caché local del bot, sin llamadas a la API"""
+        channel = self.channels.get(key)
+        if channel is not None:
+            return channel
+
+        channel_id = self.channel_ids.get(key)
+        if not channel_id:
+            return None
+
+        channel = bot.get_channel(channel_id)
+        if channel is not None:
+            self.channels[key] = channel
+        return channel
+
+    async def resolve(self, key: str):
+        """Obtener un canal; si no está en caché se consulta a Discord con fetch_channel"""
+        channel = self.get(key)
+        if channel is not None:
+            return channel
+
+        channel_id = self.channel_ids.get(key)
+        if not channel_id or channel_id in self.missing_ids:
+            return None
+
+        try:
+            channel = await bot.fetch_channel(channel_id)
+        except (discord.NotFound, discord.Forbidden) as e:
+            # No reintentar en cada envío un canal que no existe o no es accesible
+            self.missing_ids.add(channel_id)
+            print(f"❌ Canal '{key}' no accesible (ID: {channel_id}): {e}")
+            return None
+        except discord.HTTPException as e:
+            print(f"⚠️ Error obteniendo canal '{key}' (ID: {channel_id}): {e}")
+            return None
+
+        self.channels[key] = channel
+        return channel
+
+    async def warm(self):
+        """Resolver todos los canales configurados (se llama desde on_ready)"""
+        self.missing_ids.clear()
+        for key in list(self.channel_ids):
+            channel = await self.resolve(key)
+            if channel:
+                channel_name = getattr(channel, 'name', None) or channel.id
+                print(f"✅ Canal '{key}' resuelto: {channel_name} (ID: {channel.id})")
+            else:
+                print(f"⚠️ Canal '{key}' no encontrado con ID: {self.channel_ids.get(key)}")
+
+    def refresh(self, channel):
+        """Reemplazar un canal cacheado tras un evento de actualización"""
+        for key, channel_id in self.channel_ids.items():
+            if channel_id == channel.id:
+                self.channels[key] = channel
+
+    def invalidate(self, channel_id: int):
+        """Olvidar un canal eliminado para que no se usen referencias obsoletas"""
+        for key, registered_id in self.channel_ids.items():
+            if registered_id == channel_id:
+                self.channels.pop(key, None)
+        self.missing_ids.add(channel_id)
+
+channel_registry = ChannelRegistry()
+channel_registry.set_channel_id('milestones', NOTIFICATION_CHANNEL_ID)
+channel_registry.set_channel_id('pauses', PAUSE_NOTIFICATION_CHANNEL_ID)
+channel_registry.set_channel_id('cancellations', CANCELLATION_NOTIFICATION_CHANNEL_ID)
+channel_registry.set_channel_id('unpause', config.get("notification_channels", {}).get("unpause"))
+channel_registry.set_channel_id('movements', MOVEMENTS_CHANNEL_ID)
+
 @bot.event
 async def on_ready():
     print(f'{bot.user} se ha conectado a Discord!')
 
-    # Verificar que el canal de notificaciones existe
-    channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
-    if channel:
-        if hasattr(channel, 'name'):
-            print(f'Canal de notificaciones encontrado: {channel.name} (ID: {channel.id})')
-        else:
-            print(f'Canal de notificaciones encontrado (ID: {channel.id})')
-    else:
-        print(f'⚠️ Canal de notificaciones no encontrado con ID: {NOTIFICATION_CHANNEL_ID}')
+    # Resolver una sola vez todos los canales de notificación configurados
+    await channel_registry.warm()
+
+    # Precalcular el mapa ID de rol → tipo con los roles de los servidores
+    for guild in bot.guilds:
+        role_classifier.learn_guild_roles(guild.roles)
+
+    # Límite materializado de todos los registros (los antiguos no lo tienen) antes de programar límites
+    updated = backfill_user_limits()
+    if updated:
+        print(f"✅ Límite de horas actualizado para {updated} usuario(s) según sus roles")
+    limit_scheduler.start(asyncio.get_running_loop(), time_tracker.get_all_tracked_users().items())
+    print(f'✅ Límites de tiempo programados para {len(limit_scheduler)} usuario(s) activo(s) (tope global {MAX_TIME_HOURS}h)')
 
     try:
         # Sincronización global primero
@@ -151,6 +301,251 @@ async def on_ready():
     except Exception as e:
         print(f'❌ Error al sincronizar comandos: {e}')
 
+@bot.event
+async def on_guild_channel_update(before, after):
+    """Mantener actualizada la caché de canales de notificación"""
+    channel_registry.refresh(after)
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    """Invalidar canales de notificación eliminados"""
+    channel_registry.invalidate(channel.id)
+
+@bot.event
+async def on_member_update(before, after):
+    """Reclasificar a un miembro cuando cambian sus roles"""
+    if [role.id for role in before.roles] == [role.id for role in after.roles]:
+        return
+
+    role_classifier.invalidate_member(after.id)
+
+    # Mantener actualizado el límite materializado de los usuarios con seguimiento
+    if time_tracker.get_user_data(after.id):
+        time_tracker.set_user_limit(after.id, get_user_limit_hours(after))
+
+def backfill_user_limits() -> int:
+    """Guardar el límite de horas de cada usuario con seguimiento según sus roles actuales (una sola escritura)"""
+    updated = 0
+    with time_tracker.batch():
+        for user_id_str, user_data in time_tracker.get_all_tracked_users().items():
+            user_id = int(user_id_str)
+            member = None
+            for guild in bot.guilds:
+                member = guild.get_member(user_id)
+                if member:
+                    break
+
+            # Quien ya no está en el servidor conserva su límite; si nunca se clasificó, queda como recluta
+            if member is None and 'limit_hours' in user_data:
+                continue
+            if time_tracker.set_user_limit(user_id, get_user_limit_hours(member)):
+                updated += 1
+    return updated
+
+@bot.event
+async def on_member_remove(member):
+    """Olvidar la clasificación de roles de un miembro que salió del servidor"""
+    role_classifier.invalidate_member(member.id)
+
+def refresh_guild_roles(guild) -> None:
+    """Recalcular el mapa ID de rol → tipo (invalida todas las clasificaciones)"""
+    role_classifier.learn_guild_roles(guild.roles)
+
+@bot.event
+async def on_guild_role_create(role):
+    refresh_guild_roles(role.guild)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    if before.name != after.name or before.position != after.position:
+        refresh_guild_roles(after.guild)
+
+@bot.event
+async def on_guild_role_delete(role):
+    refresh_guild_roles(role.guild)
+
+# =================== SEGUIMIENTO POR CANALES DE VOZ ===================
+
+# Opcional (config.json → time_tracking): inicia el tiempo al entrar a voz y lo detiene al salir
+AUTO_VOICE_TRACKING = TIME_TRACKING_CONFIG.get('auto_voice_tracking', False)
+VOICE_DEBOUNCE_SECONDS = TIME_TRACKING_CONFIG.get('voice_debounce_seconds', 30)
+VOICE_CHANNEL_IDS = set(TIME_TRACKING_CONFIG.get('voice_channel_ids', []))
+VOICE_EXCLUDED_CHANNEL_IDS = set(TIME_TRACKING_CONFIG.get('voice_excluded_channel_ids', []))
+
+voice_debouncer = VoiceDebouncer(VOICE_DEBOUNCE_SECONDS)
+voice_flush_handle = None
+
+def in_tracked_voice(voice_state) -> bool:
+    """Verificar si un estado de voz está en un canal con seguimiento"""
+    channel = voice_state.channel
+    return is_tracked_channel(channel.id if channel else None, VOICE_CHANNEL_IDS, VOICE_EXCLUDED_CHANNEL_IDS)
+
+@bot.event
+async def on_voice_state_update(member, before, after):
+    """Registrar entradas y salidas de voz (se aplican agrupadas tras la ventana de espera)"""
+    if not AUTO_VOICE_TRACKING or member.bot:
+        return
+
+    was_tracked = in_tracked_voice(before)
+    is_tracked = in_tracked_voice(after)
+    if was_tracked == is_tracked:
+        return  # Cambio de canal con seguimiento, silencio, etc.
+
+    # El límite se calcula ahora que el miembro está disponible
+    payload = (member.display_name, get_user_limit_hours(member))
+    voice_debouncer.record(member.id, is_tracked, time.monotonic(), payload)
+    schedule_voice_flush()
+
+def schedule_voice_flush() -> None:
+    """Programar la próxima aplicación de eventos de voz (una sola a la vez)"""
+    global voice_flush_handle
+    if voice_flush_handle is not None:
+        return
+    settle_time = voice_debouncer.next_settle_time()
+    if settle_time is None:
+        return
+    delay = max(0.0, settle_time - time.monotonic())
+    voice_flush_handle = asyncio.get_running_loop().call_later(delay, run_voice_flush)
+
+def run_voice_flush() -> None:
+    global voice_flush_handle
+    voice_flush_handle = None
+    changes = voice_debouncer.pop_settled(time.monotonic())
+    if changes:
+        flush_voice_changes(changes)
+    schedule_voice_flush()
+
+def apply_voice_changes(changes: list):
+    """Iniciar o detener el tiempo de los usuarios con eventos de voz asentados (una sola escritura)
+
+    Se ejecuta en el event loop, como el resto de las modificaciones del TimeTracker.
+    """
+    started, stopped, skipped = [], [], []
+    with time_tracker.batch():
+        for user_id, joined, (user_name, limit_hours) in changes:
+            user_data = time_tracker.get_user_data(user_id)
+            if joined:
+                if time_tracker.get_total_time(user_id) / 3600 >= limit_hours:
+                    skipped.append(user_name)
+                    continue
+                if time_tracker.start_tracking(user_id, user_name):
+                    time_tracker.set_user_limit(user_id, limit_hours)
+                    # Solo las sesiones iniciadas por voz se detienen al salir
+                    time_tracker.get_user_data(user_id)['voice_session'] = True
+                    started.append(user_name)
+            elif user_data and user_data.get('is_active', False) and user_data.get('voice_session', False):
+                if time_tracker.stop_tracking(user_id):
+                    stopped.append(user_name)
+    return started, stopped, skipped
+
+def flush_voice_changes(changes: list) -> None:
+    """Aplicar un lote de eventos de voz y registrar el resultado"""
+    try:
+        started, stopped, skipped = apply_voice_changes(changes)
+        if started or stopped or skipped:
+            print(f"🎙️ Voz: {len(started)} iniciado(s), {len(stopped)} detenido(s), {len(skipped)} en su límite")
+    except Exception as e:
+        print(f"❌ Error aplicando eventos de voz: {e}")
+
+# =================== RESPUESTA RÁPIDA A INTERACCIONES ===================
+
+# Segundos desde la creación de la interacción tras los cuales se hace defer automático
+# (Discord invalida la interacción a los 3 segundos sin respuesta)
+AUTO_DEFER_BUDGET = config.get('interactions', {}).get('auto_defer_budget_seconds', 2.0)
+
+class CommandLatencyStats:
+    """Latencias acumuladas de un comando slash"""
+
+    def __init__(self, window: int = 200):
+        self.count = 0
+        self.deferred_count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, seconds: float, deferred: bool) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.recent.append(seconds)
+        if deferred:
+            self.deferred_count += 1
+
+    def average(self) -> float:
+        return self.total_seconds / self.count if self.count else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        if not self.recent:
+            return 0.0
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+command_latency_stats = {}
+
+def record_command_latency(command_name: str, seconds: float, deferred: bool) -> None:
+    """Registrar la duración total de un comando"""
+    stats = command_latency_stats.get(command_name)
+    if stats is None:
+        stats = command_latency_stats[command_name] = CommandLatencyStats()
+    stats.record(seconds, deferred)
+    if deferred:
+        print(f"⏱️ /{command_name} tardó {seconds:.2f}s (defer automático, p95: {stats.percentile(0.95):.2f}s)")
+
+def interaction_age(interaction: discord.Interaction) -> float:
+    """Segundos transcurridos desde que Discord creó la interacción"""
+    age = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    return max(0.0, age)
+
+def _ack_lock(interaction: discord.Interaction) -> asyncio.Lock:
+    """Lock por interacción para que el defer automático y la respuesta no compitan"""
+    lock = interaction.extras.get('ack_lock')
+    if lock is None:
+        lock = interaction.extras['ack_lock'] = asyncio.Lock()
+    return lock
+
+async def send_response(interaction: discord.Interaction, *args, **kwargs):
+    """Responder a una interacción, usando followup si ya fue reconocida (defer)"""
+    async with _ack_lock(interaction):
+        if not interaction.response.is_done():
+            await interaction.response.send_message(*args, **kwargs)
+            return
+    await interaction.followup.send(*args, **kwargs)
+
+def fast_ack(budget: float = None, ephemeral: bool = False):
+    """
+    Decorator que ejecuta el comando en una tarea en segundo plano y hace defer
+    automático si no respondió antes de agotar el presupuesto. El comando debe
+    responder con send_response para que su respuesta pase a ser un followup.
+    Con ephemeral=True el defer es privado (el followup hereda la visibilidad del defer).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(interaction: discord.Interaction, *args, **kwargs):
+            command_budget = AUTO_DEFER_BUDGET if budget is None else budget
+            started = time.monotonic()
+            deferred = False
+
+            task = asyncio.create_task(func(interaction, *args, **kwargs))
+            remaining = command_budget - interaction_age(interaction)
+            done, _ = await asyncio.wait({task}, timeout=max(0.0, remaining))
+
+            if not done:
+                async with _ack_lock(interaction):
+                    if not interaction.response.is_done():
+                        try:
+                            await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+                            deferred = True
+                        except discord.HTTPException as e:
+                            print(f"⚠️ No se pudo hacer defer automático de /{func.__name__}: {e}")
+
+            try:
+                return await task
+            finally:
+                record_command_latency(func.__name__, time.monotonic() - started, deferred)
+
+        return wrapper
+    return decorator
+
 def is_admin():
     """Decorator para verificar si el usuario tiene permisos"""
     async def predicate(interaction: discord.Interaction) -> bool:
@@ -190,36 +585,15 @@ def load_config():
 
 def has_unlimited_time_role(member: discord.Member) -> bool:
     """Verificar si el usuario tiene el rol de tiempo ilimitado"""
-    if UNLIMITED_TIME_ROLE_ID is None:
+    if UNLIMITED_TIME_ROLE_ID is None or not member:
         return False
 
-    for role in member.roles:
-        if role.id == UNLIMITED_TIME_ROLE_ID:
-            return True
-    return False
+    return role_classifier.classify(member)[1]
 
 def calculate_credits(total_seconds: float, role_type: str = "normal") -> int:
-    """Calcular créditos basado en el tiempo total y el rol - SISTEMA SIMPLIFICADO"""
+    """Calcular créditos basado en el tiempo total y el rol (según la tabla credit_rules)"""
     try:
-        if not isinstance(total_seconds, (int, float)) or total_seconds < 0:
-            return 0
-
-        total_hours = total_seconds / 3600
-
-        if role_type == "gold":
-            if total_hours >= 2.0:
-                return 10  # 2 horas = 10 créditos
-            elif total_hours >= 1.0:
-                return 5   # 1 hora = 5 créditos
-            else:
-                return 0   # Menos de 1 hora = 0 créditos
-        else:
-            # Usuarios sin rol específico (normal)
-            if total_hours >= 1.0:
-                return 3   # 1 hora = 3 créditos
-            else:
-                return 0   # Menos de 1 hora = 0 créditos
-
+        return credit_rules.credits_for(total_seconds, role_type)
     except Exception as e:
         print(f"Error calculando créditos: {e}")
         return 0
@@ -229,101 +603,87 @@ def get_user_role_type(member: discord.Member) -> str:
     if not member:
         return "normal"
 
-    # Solo verificar Gold
-    for role in member.roles:
-        role_name_lower = role.name.lower()
-        if "gold" in role_name_lower:
-            return "gold"
-
-    return "normal"
+    return role_classifier.classify(member)[0]
 
 def get_role_info(member: discord.Member) -> str:
     """Obtiene la información del rol de mayor jerarquía del usuario"""
     if member and member.roles:
-        user_roles = [role for role in member.roles if role.name != "@everyone"]
-        if user_roles:
-            highest_role = max(user_roles, key=lambda role: role.position)
-            return f" ({highest_role.name})"
+        highest_role_name = role_classifier.classify(member)[2]
+        if highest_role_name:
+            return f" ({highest_role_name})"
     return ""
 
+def get_user_limit_hours(member: discord.Member) -> float:
+    """Límite de horas de un miembro según sus roles"""
+    if not member:
+        return DEFAULT_LIMIT_HOURS
+    return role_limit_hours(get_user_role_type(member), has_unlimited_time_role(member))
+
+def is_before_start_time() -> bool:
+    """Verificar si aún no llega la hora de inicio configurada (hora de Chile): se pre-registra"""
+    chile_now = datetime.now(CHILE_TZ)
+    return (chile_now.hour, chile_now.minute) < (START_TIME_HOUR, START_TIME_MINUTE)
+
 @bot.tree.command(name="iniciar_tiempo", description="Iniciar el seguimiento de tiempo para un usuario")
 @discord.app_commands.describe(usuario="El usuario para quien iniciar el seguimiento de tiempo")
 @is_admin()
+@fast_ack()
 async def iniciar_tiempo(interaction: discord.Interaction, usuario: discord.Member):
     if usuario.bot:
-        await interaction.response.send_message("❌ No se puede rastrear el tiempo de bots.")
+        await send_response(interaction, "❌ No se puede rastrear el tiempo de bots.")
         return
 
-    # Verificar si el usuario tiene el rol de tiempo ilimitado
-    has_unlimited_role = has_unlimited_time_role(usuario)
-
-    # Verificar límites según el rol del usuario
+    # Verificar límites según el rol del usuario (Gold: 2h, rol especial: 4h, resto: 1h)
+    limit_hours = get_user_limit_hours(usuario)
     total_time = time_tracker.get_total_time(usuario.id)
     total_hours = total_time / 3600
 
-    # Verificar el tipo de rol del usuario
-    role_type = get_user_role_type(usuario)
-
-    if role_type == "gold":
-        # Usuarios con rol Gold: límite de 2 horas
-        if total_hours >= 2.0:
-            await interaction.response.send_message(
-                f"❌ {usuario.mention} ya ha alcanzado el límite máximo de 2 horas."
-            )
-            return
-    elif not has_unlimited_role:
-        # Usuarios sin rol específico: límite de 1 hora
-        if total_hours >= 1.0:
-            await interaction.response.send_message(
-                f"❌ {usuario.mention} ya ha alcanzado el límite máximo de 1 hora."
-            )
-            return
-    else:
-        # Usuarios con rol especial: límite de 4 horas
-        if total_hours >= 4.0:
-            await interaction.response.send_message(
-                f"❌ {usuario.mention} ya ha alcanzado el límite máximo de 4 horas."
-            )
-            return
+    if total_hours >= limit_hours:
+        await send_response(
+            interaction,
+            f"❌ {usuario.mention} ya ha alcanzado el límite máximo de {format_limit_hours(limit_hours)}."
+        )
+        return
 
     # Verificar si el usuario tiene tiempo pausado
     user_data = time_tracker.get_user_data(usuario.id)
     if user_data and user_data.get('is_paused', False):
-        await interaction.response.send_message(
+        await send_response(
+            interaction,
             f"⚠️ {usuario.mention} tiene tiempo pausado. Usa `/despausar_tiempo` para continuar el tiempo."
         )
         return
 
-    # Obtener hora actual en Chile
-    chile_now = datetime.now(CHILE_TZ)
-    current_hour = chile_now.hour
-    current_minute = chile_now.minute
-
-    # Verificar si es antes de la hora configurada (13:31)
-    is_before_start_time = (current_hour < START_TIME_HOUR) or (current_hour == START_TIME_HOUR and current_minute < START_TIME_MINUTE)
-    
-    if is_before_start_time:
-        # Pre-registro: registrar usuario pero no iniciar cronómetro
-        success = time_tracker.pre_register_user(usuario.id, usuario.display_name)
+    if is_before_start_time():
+        # Pre-registro: registrar usuario pero no iniciar cronómetro (una sola escritura)
+        with time_tracker.batch():
+            success = time_tracker.pre_register_user(usuario.id, usuario.display_name)
+            if success:
+                time_tracker.set_user_limit(usuario.id, limit_hours)
+                # Guardar quién hizo el pre-registro
+                time_tracker.set_pre_register_initiator(usuario.id, interaction.user.id, interaction.user.display_name)
         if success:
-            # Guardar quién hizo el pre-registro
-            time_tracker.set_pre_register_initiator(usuario.id, interaction.user.id, interaction.user.display_name)
-            await interaction.response.send_message(
+            await send_response(
+                interaction,
                 f"📝 El tiempo de {usuario.mention} ha sido registrado por {interaction.user.mention}"
             )
         else:
-            await interaction.response.send_message(f"⚠️ {usuario.mention} ya está pre-registrado o activo")
+            await send_response(interaction, f"⚠️ {usuario.mention} ya está pre-registrado o activo")
     else:
-        # Hora configurada o después: iniciar normalmente
-        success = time_tracker.start_tracking(usuario.id, usuario.display_name)
+        # Hora configurada o después: iniciar normalmente (una sola escritura)
+        with time_tracker.batch():
+            success = time_tracker.start_tracking(usuario.id, usuario.display_name)
+            if success:
+                time_tracker.set_user_limit(usuario.id, limit_hours)
         if success:
-            await interaction.response.send_message(f"⏰ El tiempo de {usuario.mention} ha sido iniciado por {interaction.user.mention}")
+            await send_response(interaction, f"⏰ El tiempo de {usuario.mention} ha sido iniciado por {interaction.user.mention}")
         else:
-            await interaction.response.send_message(f"⚠️ El tiempo de {usuario.mention} ya está activo")
+            await send_response(interaction, f"⚠️ El tiempo de {usuario.mention} ya está activo")
 
 @bot.tree.command(name="pausar_tiempo", description="Pausar el tiempo de un usuario")
 @discord.app_commands.describe(usuario="El usuario para quien pausar el tiempo")
 @is_admin()
+@fast_ack()
 async def pausar_tiempo(interaction: discord.Interaction, usuario: discord.Member):
     user_data = time_tracker.get_user_data(usuario.id)
     total_time_before = time_tracker.get_total_time(usuario.id)
@@ -338,34 +698,37 @@ async def pausar_tiempo(interaction: discord.Interaction, usuario: discord.Membe
 
         if pause_count >= 3:
             time_tracker.cancel_user_tracking(usuario.id)
-            await interaction.response.send_message(
+            await send_response(
+                interaction,
                 f"⏸️ El tiempo de {usuario.mention} ha sido pausado\n"
                 f"🚫 **{usuario.mention} lleva {pause_count} pausas - Tiempo cancelado automáticamente por exceder el límite**"
             )
-            await send_auto_cancellation_notification(usuario.display_name, formatted_total_time, interaction.user.mention, pause_count)
+            spawn_background(send_auto_cancellation_notification(usuario.display_name, formatted_total_time, interaction.user.mention, pause_count))
         else:
-            await interaction.response.send_message(f"⏸️ El tiempo de {usuario.mention} ha sido pausado")
-            await send_pause_notification(usuario.display_name, total_time_after, interaction.user.mention, formatted_session_time, pause_count)
+            await send_response(interaction, f"⏸️ El tiempo de {usuario.mention} ha sido pausado")
+            spawn_background(send_pause_notification(usuario.display_name, total_time_after, interaction.user.mention, formatted_session_time, pause_count))
     else:
-        await interaction.response.send_message(f"⚠️ No hay tiempo activo para {usuario.mention}")
+        await send_response(interaction, f"⚠️ No hay tiempo activo para {usuario.mention}")
 
 @bot.tree.command(name="despausar_tiempo", description="Despausar el tiempo de un usuario")
 @discord.app_commands.describe(usuario="El usuario para quien despausar el tiempo")
 @is_admin()
+@fast_ack()
 async def despausar_tiempo(interaction: discord.Interaction, usuario: discord.Member):
     paused_duration = time_tracker.get_paused_duration(usuario.id)
     success = time_tracker.resume_tracking(usuario.id)
     if success:
         total_time = time_tracker.get_total_time(usuario.id)
         formatted_paused_duration = time_tracker.format_time_human(paused_duration) if paused_duration > 0 else "0 Segundos"
-        await interaction.response.send_message(
+        await send_response(
+            interaction,
             f"▶️ El tiempo de {usuario.mention} ha sido despausado\n"
             f"**Tiempo pausado:** {formatted_paused_duration}\n"
             f"**Despausado por:** {interaction.user.mention}"
         )
-        await send_unpause_notification(usuario.display_name, total_time, interaction.user.mention, formatted_paused_duration)
+        spawn_background(send_unpause_notification(usuario.display_name, total_time, interaction.user.mention, formatted_paused_duration))
     else:
-        await interaction.response.send_message(f"⚠️ No se puede despausar - {usuario.mention} no tiene tiempo pausado")
+        await send_response(interaction, f"⚠️ No se puede despausar - {usuario.mention} no tiene tiempo pausado")
 
 @bot.tree.command(name="sumar_minutos", description="Sumar minutos al tiempo de un usuario")
 @discord.app_commands.describe(
@@ -373,22 +736,24 @@ async def despausar_tiempo(interaction: discord.Interaction, usuario: discord.Me
     minutos="Cantidad de minutos a sumar"
 )
 @is_admin()
+@fast_ack()
 async def sumar_minutos(interaction: discord.Interaction, usuario: discord.Member, minutos: int):
     if minutos <= 0:
-        await interaction.response.send_message("❌ La cantidad de minutos debe ser positiva")
+        await send_response(interaction, "❌ La cantidad de minutos debe ser positiva")
         return
 
     success = time_tracker.add_minutes(usuario.id, usuario.display_name, minutos)
     if success:
         total_time = time_tracker.get_total_time(usuario.id)
         formatted_time = time_tracker.format_time_human(total_time)
-        await interaction.response.send_message(
+        await send_response(
+            interaction,
             f"✅ Sumados {minutos} minutos a {usuario.mention} por {interaction.user.mention}\n"
             f"⏱️ Tiempo total: {formatted_time}"
         )
-        await check_time_milestone(usuario.id, usuario.display_name)
+        spawn_background(check_time_milestone(usuario.id, usuario.display_name))
     else:
-        await interaction.response.send_message(f"❌ Error al sumar tiempo para {usuario.mention}")
+        await send_response(interaction, f"❌ Error al sumar tiempo para {usuario.mention}")
 
 @bot.tree.command(name="restar_minutos", description="Restar minutos del tiempo de un usuario")
 @discord.app_commands.describe(
@@ -396,92 +761,335 @@ async def sumar_minutos(interaction: discord.Interaction, usuario: discord.Membe
     minutos="Cantidad de minutos a restar"
 )
 @is_admin()
+@fast_ack()
 async def restar_minutos(interaction: discord.Interaction, usuario: discord.Member, minutos: int):
     if minutos <= 0:
-        await interaction.response.send_message("❌ La cantidad de minutos debe ser positiva")
+        await send_response(interaction, "❌ La cantidad de minutos debe ser positiva")
         return
 
     success = time_tracker.subtract_minutes(usuario.id, minutos)
     if success:
         total_time = time_tracker.get_total_time(usuario.id)
         formatted_time = time_tracker.format_time_human(total_time)
-        await interaction.response.send_message(
+        await send_response(
+            interaction,
             f"➖ Restados {minutos} minutos de {usuario.mention} por {interaction.user.mention}\n"
             f"⏱️ Tiempo total: {formatted_time}"
         )
     else:
-        await interaction.response.send_message(f"❌ Error al restar tiempo para {usuario.mention}")
+        await send_response(interaction, f"❌ Error al restar tiempo para {usuario.mention}")
+
+# =================== ACCIONES MASIVAS ===================
+
+# Límite de Discord para el valor de un campo de embed
+EMBED_FIELD_LIMIT = 1024
+
+async def resolve_bulk_members(interaction: discord.Interaction, rol, canal):
+    """Miembros (sin bots) del rol o canal de voz indicado; responde el error si no hay objetivo válido"""
+    if (rol is None) == (canal is None):
+        await send_response(interaction, "❌ Indica un rol o un canal de voz (solo uno de los dos)")
+        return None, None
+
+    target = rol if rol is not None else canal
+    members = [member for member in target.members if not member.bot]
+    if not members:
+        await send_response(interaction, f"⚠️ No hay miembros en {target.mention}")
+        return None, None
+    return members, target.mention
+
+def build_bulk_summary_embed(title: str, target: str, admin_mention: str, sections: list) -> discord.Embed:
+    """Embed de resumen de una acción masiva: un campo por resultado con la lista de miembros"""
+    total = sum(len(mentions) for _, mentions in sections)
+    embed = discord.Embed(
+        title=title,
+        description=f"**Objetivo:** {target}\n**Miembros:** {total}\n**Ejecutado por:** {admin_mention}",
+        color=discord.Color.blue(),
+        timestamp=datetime.now()
+    )
+
+    # Repartir el espacio del embed entre los campos con contenido
+    non_empty = [(label, mentions) for label, mentions in sections if mentions]
+    if non_empty:
+        field_limit = min(EMBED_FIELD_LIMIT, (EMBED_TOTAL_LIMIT - DEFAULT_EMBED_OVERHEAD) // len(non_empty))
+        for label, mentions in non_empty:
+            embed.add_field(name=f"{label} ({len(mentions)})", value=fit_description(mentions, field_limit), inline=False)
+    return embed
+
+def apply_bulk_start(plan: list, pre_register: bool, admin_id: int, admin_name: str) -> dict:
+    """Iniciar (o pre-registrar) a todos los miembros en una sola pasada y una sola escritura"""
+    results = {'started': [], 'limit': [], 'paused': [], 'already': []}
+    with time_tracker.batch():
+        for user_id, user_name, mention, limit_hours in plan:
+            if time_tracker.get_total_time(user_id) / 3600 >= limit_hours:
+                results['limit'].append(mention)
+                continue
+
+            user_data = time_tracker.get_user_data(user_id)
+            if user_data and user_data.get('is_paused', False):
+                results['paused'].append(mention)
+                continue
+
+            if pre_register:
+                success = time_tracker.pre_register_user(user_id, user_name)
+            else:
+                success = time_tracker.start_tracking(user_id, user_name)
+            if not success:
+                results['already'].append(mention)
+                continue
+
+            time_tracker.set_user_limit(user_id, limit_hours)
+            if pre_register:
+                time_tracker.set_pre_register_initiator(user_id, admin_id, admin_name)
+            results['started'].append(mention)
+    return results
+
+def apply_bulk_pause(plan: list) -> dict:
+    """Pausar a todos los miembros activos (3 pausas cancelan el tiempo) en una sola escritura"""
+    results = {'paused': [], 'cancelled': [], 'skipped': []}
+    with time_tracker.batch():
+        for user_id, user_name, mention in plan:
+            if not time_tracker.pause_tracking(user_id):
+                results['skipped'].append(mention)
+                continue
+
+            pause_count = time_tracker.get_pause_count(user_id)
+            if pause_count >= 3:
+                total_time = time_tracker.get_total_time(user_id)
+                time_tracker.cancel_user_tracking(user_id)
+                results['cancelled'].append((mention, user_name, total_time, pause_count))
+            else:
+                results['paused'].append(mention)
+    return results
+
+def apply_bulk_stop(plan: list) -> dict:
+    """Detener el tiempo de todos los miembros activos en una sola escritura"""
+    results = {'stopped': [], 'skipped': []}
+    with time_tracker.batch():
+        for user_id, _, mention in plan:
+            if time_tracker.stop_tracking(user_id):
+                results['stopped'].append(mention)
+            else:
+                results['skipped'].append(mention)
+    return results
+
+@bot.tree.command(name="iniciar_tiempo_masivo", description="Iniciar el tiempo de todos los miembros de un rol o canal de voz")
+@discord.app_commands.describe(
+    rol="Rol cuyos miembros iniciarán el tiempo",
+    canal="Canal de voz cuyos miembros iniciarán el tiempo"
+)
+@is_admin()
+@fast_ack()
+async def iniciar_tiempo_masivo(interaction: discord.Interaction, rol: discord.Role = None, canal: discord.VoiceChannel = None):
+    members, target = await resolve_bulk_members(interaction, rol, canal)
+    if members is None:
+        return
+
+    # Límites de todos los miembros en una sola pasada (clasificación de roles en caché)
+    plan = [(member.id, member.display_name, member.mention, get_user_limit_hours(member)) for member in members]
+    pre_register = is_before_start_time()
+    results = apply_bulk_start(plan, pre_register, interaction.user.id, interaction.user.display_name)
+
+    embed = build_bulk_summary_embed(
+        "📝 Pre-registro Masivo" if pre_register else "⏰ Inicio Masivo de Tiempo",
+        target,
+        interaction.user.mention,
+        [
+            ("📝 Pre-registrados" if pre_register else "✅ Iniciados", results['started']),
+            ("⛔ Límite alcanzado", results['limit']),
+            ("⏸️ Con tiempo pausado", results['paused']),
+            ("⚠️ Ya activos o pre-registrados", results['already']),
+        ]
+    )
+    await send_response(interaction, embed=embed)
+
+@bot.tree.command(name="pausar_tiempo_masivo", description="Pausar el tiempo de todos los miembros de un rol o canal de voz")
+@discord.app_commands.describe(
+    rol="Rol cuyos miembros pausarán el tiempo",
+    canal="Canal de voz cuyos miembros pausarán el tiempo"
+)
+@is_admin()
+@fast_ack()
+async def pausar_tiempo_masivo(interaction: discord.Interaction, rol: discord.Role = None, canal: discord.VoiceChannel = None):
+    members, target = await resolve_bulk_members(interaction, rol, canal)
+    if members is None:
+        return
+
+    plan = [(member.id, member.display_name, member.mention) for member in members]
+    results = apply_bulk_pause(plan)
+
+    embed = build_bulk_summary_embed(
+        "⏸️ Pausa Masiva de Tiempo",
+        target,
+        interaction.user.mention,
+        [
+            ("⏸️ Pausados", results['paused']),
+            ("🚫 Cancelados por 3 pausas", [mention for mention, _, _, _ in results['cancelled']]),
+            ("⚠️ Sin tiempo activo", results['skipped']),
+        ]
+    )
+    await send_response(interaction, embed=embed)
+
+    if results['paused']:
+        spawn_background(send_channel_message(
+            'pauses',
+            f"pausa masiva ({len(results['paused'])} usuarios)",
+            f"⏸️ {interaction.user.mention} pausó el tiempo de {len(results['paused'])} miembro(s) de {target}"
+        ))
+    for _, user_name, total_time, pause_count in results['cancelled']:
+        spawn_background(send_auto_cancellation_notification(
+            user_name, time_tracker.format_time_human(total_time), interaction.user.mention, pause_count
+        ))
+
+@bot.tree.command(name="detener_tiempo_masivo", description="Detener el tiempo de todos los miembros de un rol o canal de voz")
+@discord.app_commands.describe(
+    rol="Rol cuyos miembros detendrán el tiempo",
+    canal="Canal de voz cuyos miembros detendrán el tiempo"
+)
+@is_admin()
+@fast_ack()
+async def detener_tiempo_masivo(interaction: discord.Interaction, rol: discord.Role = None, canal: discord.VoiceChannel = None):
+    members, target = await resolve_bulk_members(interaction, rol, canal)
+    if members is None:
+        return
+
+    plan = [(member.id, member.display_name, member.mention) for member in members]
+    results = apply_bulk_stop(plan)
+
+    embed = build_bulk_summary_embed(
+        "⏹️ Detención Masiva de Tiempo",
+        target,
+        interaction.user.mention,
+        [
+            ("⏹️ Detenidos", results['stopped']),
+            ("⚠️ Sin tiempo activo", results['skipped']),
+        ]
+    )
+    await send_response(interaction, embed=embed)
+
+# Caché de páginas renderizadas de /ver_tiempos y /paga_*
+# Clave: (reporte, filtro, versión del snapshot, página, versión de datos, minuto si hay cronómetros activos)
+page_cache = LRUCache(max_entries=512)
+
+def live_minute_bucket(rows_data) -> int:
+    """Minuto actual si alguna fila tiene un cronómetro en curso (si no, None: la página es estática)"""
+    if any(data.get('is_active', False) for data in rows_data):
+        return int(time.time() // 60)
+    return None
+
+def format_time_row(user_id, data, guild):
+    """Formatear la fila de un usuario para la lista de tiempos"""
+    user_id_int = int(user_id)
+    member = guild.get_member(user_id_int) if guild else None
+
+    if member:
+        user_mention = member.mention
+        role_type = get_user_role_type(member)
+    else:
+        user_name = data.get('name', f'Usuario {user_id}')
+        user_mention = f"**{user_name}** `(ID: {user_id})`"
+        role_type = "normal"
+
+    total_time = time_tracker.get_total_time(user_id_int)
+    formatted_time = time_tracker.format_time_human(total_time)
+    status = get_status_label(data)
+
+    credits = calculate_credits(total_time, role_type)
+    credit_info = f" 💰 {credits} Créditos" if credits > 0 else ""
+    role_info = get_role_info(member) if member else ""
+    return f"📌 {user_mention}{role_info} - ⏱️ {formatted_time}{credit_info} {status}"
+
+def render_time_rows(current_users, guild, snapshot_version=None, filter_key=None, page=0):
+    """Filas formateadas de una página de tiempos (desde la caché de páginas si es posible)"""
+    cache_key = None
+    if snapshot_version is not None:
+        cache_key = (
+            "ver_tiempos", filter_key, snapshot_version, page,
+            time_tracker.version, live_minute_bucket(data for _, _, data in current_users)
+        )
+        cached = page_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    user_list = []
+    for _, user_id, data in current_users:
+        try:
+            user_list.append(format_time_row(user_id, data, guild))
+        except Exception as e:
+            print(f"Error procesando usuario {user_id}: {e}")
+            continue
+
+    if cache_key is not None:
+        page_cache.put(cache_key, user_list)
+    return user_list
 
 # Clase para manejar la paginación
+# Margen por fila para tiempos en vivo que crecen entre el cálculo de páginas y el renderizado
+TIME_ROW_MARGIN = 24
+# Título y pie de página del embed de tiempos
+TIMES_EMBED_OVERHEAD = 128
+
+def compute_time_pages(load_users, guild, snapshot_version=None, filter_key=None):
+    """
+    Listado de tiempos y límites de sus páginas según el tamaño real de cada fila.
+    Se calcula una vez por snapshot: la lista de usuarios se guarda junto a los límites
+    para que las páginas no se desplacen si el índice cambia mientras la vista sigue abierta.
+    Se ejecuta en el event loop (lee miembros del servidor, la caché de roles y los índices).
+    """
+    cache_key = ("ver_tiempos_paginas", filter_key, snapshot_version)
+    if snapshot_version is not None:
+        cached = page_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    sorted_users = load_users()
+    row_lengths = []
+    for _, user_id, data in sorted_users:
+        try:
+            row_lengths.append(len(format_time_row(user_id, data, guild)))
+        except Exception as e:
+            print(f"Error midiendo fila de {user_id}: {e}")
+            row_lengths.append(0)
+
+    pages = (sorted_users, pack_pages(row_lengths, overhead=TIMES_EMBED_OVERHEAD, row_margin=TIME_ROW_MARGIN))
+    if snapshot_version is not None:
+        page_cache.put(cache_key, pages)
+    return pages
+
 class TimesView(discord.ui.View):
-    def __init__(self, sorted_users, guild, max_per_page=25):
+    def __init__(self, sorted_users, guild, page_bounds=None, snapshot_version=None, filter_key=None):
         super().__init__(timeout=300)
         self.sorted_users = sorted_users
         self.guild = guild
-        self.max_per_page = max_per_page
+        self.snapshot_version = snapshot_version
+        self.filter_key = filter_key
         self.current_page = 0
-        self.total_pages = (len(sorted_users) + max_per_page - 1) // max_per_page
+        if page_bounds is None:
+            sorted_users, page_bounds = compute_time_pages(lambda: sorted_users, guild, snapshot_version, filter_key)
+            self.sorted_users = sorted_users
+        self.page_bounds = page_bounds
+        self.total_users = page_bounds[-1][1] if page_bounds else 0
+        self.total_pages = len(page_bounds)
 
         if self.total_pages <= 1:
             self.clear_items()
 
     def get_embed(self):
         """Crear embed para la página actual"""
-        start_idx = self.current_page * self.max_per_page
-        end_idx = min(start_idx + self.max_per_page, len(self.sorted_users))
+        start_idx, end_idx = self.page_bounds[self.current_page]
         current_users = self.sorted_users[start_idx:end_idx]
-        user_list = []
-
-        for _, user_id, data in current_users:
-            try:
-                user_id_int = int(user_id)
-                member = self.guild.get_member(user_id_int) if self.guild else None
-
-                if member:
-                    user_mention = member.mention
-                    role_type = get_user_role_type(member)
-                else:
-                    user_name = data.get('name', f'Usuario {user_id}')
-                    user_mention = f"**{user_name}** `(ID: {user_id})`"
-                    role_type = "normal"
-
-                total_time = time_tracker.get_total_time(user_id_int)
-                formatted_time = time_tracker.format_time_human(total_time)
-
-                status = "🔴 Inactivo"
-                if data.get('is_active', False):
-                    status = "🟢 Activo"
-                elif data.get('is_paused', False):
-                    total_hours = total_time / 3600
-                    has_special_role = has_unlimited_time_role(member) if member else False
-                    role_type = get_user_role_type(member) if member else "normal"
-
-                    # Verificar límites según el tipo de rol
-                    if (data.get("milestone_completed", False) or 
-                        (has_special_role and total_hours >= 4.0) or 
-                        (role_type == "gold" and total_hours >= 2.0) or
-                        (role_type == "normal" and total_hours >= 1.0)):
-                        status = "✅ Terminado"
-                    else:
-                        status = "⏸️ Pausado"
-
-                credits = calculate_credits(total_time, role_type)
-                credit_info = f" 💰 {credits} Créditos" if credits > 0 else ""
-                role_info = get_role_info(member) if member else ""
-                user_list.append(f"📌 {user_mention}{role_info} - ⏱️ {formatted_time}{credit_info} {status}")
-
-            except Exception as e:
-                print(f"Error procesando usuario {user_id}: {e}")
-                continue
+        user_list = render_time_rows(current_users, self.guild, self.snapshot_version, self.filter_key, self.current_page)
 
         embed = discord.Embed(
             title="⏰ Tiempos Registrados",
-            description="\n".join(user_list) if user_list else "No hay usuarios en esta página",
+            description=fit_description(user_list) if user_list else "No hay usuarios en esta página",
             color=discord.Color.blue(),
             timestamp=datetime.now()
         )
 
-        embed.set_footer(text=f"Página {self.current_page + 1}/{self.total_pages} • Total: {len(self.sorted_users)} usuarios")
+        if self.total_pages > 1:
+            embed.set_footer(text=f"Página {self.current_page + 1}/{self.total_pages} • Total: {self.total_users} usuarios")
+        else:
+            embed.set_footer(text=f"Total: {self.total_users} usuarios")
         return embed
 
     @discord.ui.button(label='◀️ Anterior', style=discord.ButtonStyle.secondary)
@@ -543,9 +1151,58 @@ class PageModal(discord.ui.Modal, title='Ir a Página'):
         except ValueError:
             await interaction.response.send_message("❌ Por favor ingresa un número válido", ephemeral=True)
 
+# Coalescencia de reportes pesados: un cálculo por cambio de datos, no uno por administrador
+report_flights = SingleFlight(ttl=15.0)
+
+def build_filtered_users(guild, estado=None, rango=None, orden="nombre", minimo_minutos=0):
+    """Usuarios de /ver_tiempos según los filtros (desde los índices de estado, nombres y ranking)"""
+    order = "time" if orden in ("tiempo", "creditos") else "name"
+    rows = time_tracker.query_users(status=estado, min_seconds=max(0, minimo_minutos) * 60, order=order)
+
+    if rango:
+        filtered = []
+        for row in rows:
+            member = guild.get_member(int(row[1])) if guild else None
+            if get_user_role_type(member) == rango:
+                filtered.append(row)
+        rows = filtered
+
+    if orden == "creditos":
+        # Orden estable: a igualdad de créditos se mantiene el orden por tiempo
+        def row_credits(row):
+            member = guild.get_member(int(row[1])) if guild else None
+            return calculate_credits(time_tracker.get_total_time(int(row[1])), get_user_role_type(member))
+        rows.sort(key=row_credits, reverse=True)
+
+    return rows
+
 @bot.tree.command(name="ver_tiempos", description="Ver todos los tiempos registrados")
+@discord.app_commands.describe(
+    estado="Mostrar solo usuarios con este estado",
+    rango="Mostrar solo usuarios de este rango",
+    orden="Orden del listado (por defecto, nombre)",
+    minimo_minutos="Tiempo mínimo acumulado en minutos"
+)
+@discord.app_commands.choices(
+    estado=[
+        discord.app_commands.Choice(name="🟢 Activo", value=STATUS_ACTIVE),
+        discord.app_commands.Choice(name="⏸️ Pausado", value=STATUS_PAUSED),
+        discord.app_commands.Choice(name="✅ Terminado", value=STATUS_FINISHED),
+        discord.app_commands.Choice(name="🔴 Inactivo", value=STATUS_INACTIVE),
+    ],
+    rango=[
+        discord.app_commands.Choice(name="🏆 Gold", value="gold"),
+        discord.app_commands.Choice(name="👤 Recluta", value="normal"),
+    ],
+    orden=[
+        discord.app_commands.Choice(name="Nombre", value="nombre"),
+        discord.app_commands.Choice(name="Tiempo", value="tiempo"),
+        discord.app_commands.Choice(name="Créditos", value="creditos"),
+    ]
+)
 @is_admin()
-async def ver_tiempos(interaction: discord.Interaction):
+async def ver_tiempos(interaction: discord.Interaction, estado: str = None, rango: str = None,
+                      orden: str = "nombre", minimo_minutos: int = 0):
     try:
         await interaction.response.defer(ephemeral=False)
     except Exception as e:
@@ -556,103 +1213,39 @@ async def ver_tiempos(interaction: discord.Interaction):
             return
 
     try:
-        tracked_users = await asyncio.wait_for(
-            asyncio.to_thread(time_tracker.get_all_tracked_users),
-            timeout=5.0
-        )
+        snapshot_version = time_tracker.version
+        filter_key = None
+        if estado or rango or orden != "nombre" or minimo_minutos > 0:
+            # Listado filtrado: se arma desde los índices de estado y orden
+            filter_key = (estado, rango, orden, minimo_minutos)
+            load_users = lambda: build_filtered_users(interaction.guild, estado, rango, orden, minimo_minutos)
+        else:
+            # Orden alfabético leído del índice de nombres, sin reordenar a todos los usuarios
+            load_users = lambda: time_tracker.get_users_by_name(0, time_tracker.count_users())
+
+        # Páginas empaquetadas según el tamaño de las filas (una sola página si todo cabe)
+        sorted_users, page_bounds = compute_time_pages(load_users, interaction.guild, snapshot_version, filter_key)
 
-        if not tracked_users:
+        if not sorted_users:
+            empty_msg = "📊 No hay usuarios que coincidan con los filtros" if filter_key else "📊 No hay usuarios con tiempo registrado"
             try:
                 if not interaction.response.is_done():
-                    await interaction.response.send_message("📊 No hay usuarios con tiempo registrado", ephemeral=False)
+                    await interaction.response.send_message(empty_msg, ephemeral=False)
                 else:
-                    await interaction.followup.send("📊 No hay usuarios con tiempo registrado")
+                    await interaction.followup.send(empty_msg)
             except Exception as e:
                 print(f"Error enviando mensaje de sin usuarios: {e}")
             return
 
-        # Ordenar usuarios alfabéticamente por nombre
-        sorted_users = []
-        for user_id, data in tracked_users.items():
-            user_name = data.get('name', f'Usuario {user_id}')
-            sorted_users.append((user_name.lower(), user_id, data))
-
-        sorted_users.sort(key=lambda x: x[0])
-
-        # Si hay pocos usuarios, usar el método simple (sin paginación)
-        if len(sorted_users) <= 25:
-            user_list = []
-            for _, user_id, data in sorted_users:
-                try:
-                    user_id_int = int(user_id)
-                    member = interaction.guild.get_member(user_id_int) if interaction.guild else None
-
-                    if member:
-                        user_mention = member.mention
-                        role_type = get_user_role_type(member)
-                    else:
-                        user_name = data.get('name', f'Usuario {user_id}')
-                        user_mention = f"**{user_name}** `(ID: {user_id})`"
-                        role_type = "normal"
-
-                    total_time = time_tracker.get_total_time(user_id_int)
-                    formatted_time = time_tracker.format_time_human(total_time)
-
-                    status = "🔴 Inactivo"
-                    if data.get('is_active', False):
-                        status = "🟢 Activo"
-                    elif data.get('is_paused', False):
-                        total_hours = total_time / 3600
-                        has_special_role = has_unlimited_time_role(member) if member else False
-                        role_type = get_user_role_type(member) if member else "normal"
-
-                        # Verificar límites según el tipo de rol
-                        if (data.get("milestone_completed", False) or 
-                            (has_special_role and total_hours >= 4.0) or 
-                            (role_type == "gold" and total_hours >= 2.0) or
-                            (role_type == "normal" and total_hours >= 1.0)):
-                            status = "✅ Terminado"
-                        else:
-                            status = "⏸️ Pausado"
-
-                    credits = calculate_credits(total_time, role_type)
-                    credit_info = f" 💰 {credits} Créditos" if credits > 0 else ""
-                    role_info = get_role_info(member) if member else ""
-
-                    user_list.append(f"📌 {user_mention}{role_info} - ⏱️ {formatted_time}{credit_info} {status}")
-
-                except Exception as e:
-                    print(f"Error procesando usuario {user_id}: {e}")
-                    continue
-
-            if not user_list:
-                try:
-                    if not interaction.response.is_done():
-                        await interaction.response.send_message("❌ Error al procesar usuarios registrados", ephemeral=False)
-                    else:
-                        await interaction.followup.send("❌ Error al procesar usuarios registrados")
-                except Exception as e:
-                    print(f"Error enviando mensaje de error: {e}")
-                return
-
-            # Embed simple sin paginación
-            embed = discord.Embed(
-                title="⏰ Tiempos Registrados",
-                description="\n".join(user_list),
-                color=discord.Color.blue(),
-                timestamp=datetime.now()
-            )
-            embed.set_footer(text=f"Total: {len(user_list)} usuarios")
+        view = TimesView(sorted_users, interaction.guild, page_bounds, snapshot_version=snapshot_version, filter_key=filter_key)
+        embed = view.get_embed()
 
+        if view.total_pages <= 1:
             if not interaction.response.is_done():
                 await interaction.response.send_message(embed=embed)
             else:
                 await interaction.followup.send(embed=embed)
         else:
-            # Usar paginación para muchos usuarios
-            view = TimesView(sorted_users, interaction.guild, max_per_page=25)
-            embed = view.get_embed()
-
             if not interaction.response.is_done():
                 await interaction.response.send_message(embed=embed, view=view)
             else:
@@ -682,6 +1275,142 @@ async def ver_tiempos(interaction: discord.Interaction):
         except Exception as e2:
             print(f"No se pudo enviar mensaje de error final: {e2}")
 
+# =================== RESÚMENES POR PERÍODO ===================
+
+# Usuarios listados en los resúmenes semanales y mensuales
+SUMMARY_MAX_USERS = 50
+WEEKDAY_NAMES = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
+
+async def send_period_summary(interaction: discord.Interaction, title: str, start_day, end_day, usuario: discord.Member = None):
+    """Responder con el resumen de un período leído desde los totales diarios"""
+    period_text = f"{start_day.strftime('%d/%m/%Y')} - {end_day.strftime('%d/%m/%Y')}"
+
+    if usuario:
+        if not time_tracker.get_user_data(usuario.id):
+            await interaction.response.send_message(f"❌ No se encontraron datos para {usuario.mention}", ephemeral=True)
+            return
+
+        breakdown = time_tracker.get_daily_breakdown(usuario.id, start_day, end_day)
+        total = sum(seconds for _, seconds in breakdown)
+        lines = [
+            f"`{WEEKDAY_NAMES[day.weekday()]} {day.strftime('%d/%m')}` ⏱️ {time_tracker.format_time_human(seconds)}"
+            for day, seconds in breakdown if seconds > 0
+        ]
+
+        embed = discord.Embed(
+            title=f"{title} - {usuario.display_name}",
+            description=fit_description(lines) if lines else "Sin tiempo registrado en este período",
+            color=discord.Color.blue(),
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="⏱️ Total del Período", value=time_tracker.format_time_human(total), inline=True)
+        embed.set_footer(text=period_text)
+        await interaction.response.send_message(embed=embed)
+        return
+
+    totals = time_tracker.get_period_totals(start_day, end_day)
+    if not totals:
+        await interaction.response.send_message(f"📊 No hay tiempo registrado en el período {period_text}")
+        return
+
+    ordered = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    lines = []
+    for position, (user_id_str, seconds) in enumerate(ordered[:SUMMARY_MAX_USERS], start=1):
+        data = time_tracker.get_user_data(int(user_id_str)) or {}
+        member = interaction.guild.get_member(int(user_id_str)) if interaction.guild else None
+        name = member.mention if member else f"**{data.get('name', f'Usuario {user_id_str}')}**"
+        lines.append(f"`#{position}` {name} - ⏱️ {time_tracker.format_time_human(seconds)}")
+
+    embed = discord.Embed(
+        title=title,
+        description=fit_description(lines),
+        color=discord.Color.blue(),
+        timestamp=datetime.now()
+    )
+    embed.add_field(name="👥 Usuarios con tiempo", value=str(len(ordered)), inline=True)
+    embed.add_field(name="⏱️ Tiempo total", value=time_tracker.format_time_human(sum(totals.values())), inline=True)
+    footer = period_text
+    if len(ordered) > SUMMARY_MAX_USERS:
+        footer += f" • Mostrando {SUMMARY_MAX_USERS} de {len(ordered)}"
+    embed.set_footer(text=footer)
+    await interaction.response.send_message(embed=embed)
+
+@bot.tree.command(name="resumen_semanal", description="Ver el tiempo acumulado en la semana actual")
+@discord.app_commands.describe(usuario="Usuario del que ver el detalle por día (opcional)")
+@is_admin()
+async def resumen_semanal(interaction: discord.Interaction, usuario: discord.Member = None):
+    """Resumen de la semana actual (lunes a domingo, hora de Chile)"""
+    try:
+        start_day, end_day = week_range()
+        await send_period_summary(interaction, "📅 Resumen Semanal", start_day, end_day, usuario)
+    except Exception as e:
+        print(f"Error en resumen_semanal: {e}")
+        if not interaction.response.is_done():
+            await interaction.response.send_message("❌ Error al generar el resumen semanal.", ephemeral=True)
+
+@bot.tree.command(name="resumen_mensual", description="Ver el tiempo acumulado en el mes actual")
+@discord.app_commands.describe(usuario="Usuario del que ver el detalle por día (opcional)")
+@is_admin()
+async def resumen_mensual(interaction: discord.Interaction, usuario: discord.Member = None):
+    """Resumen del mes actual (hora de Chile)"""
+    try:
+        start_day, end_day = month_range()
+        await send_period_summary(interaction, "🗓️ Resumen Mensual", start_day, end_day, usuario)
+    except Exception as e:
+        print(f"Error en resumen_mensual: {e}")
+        if not interaction.response.is_done():
+            await interaction.response.send_message("❌ Error al generar el resumen mensual.", ephemeral=True)
+
+RANKING_MEDALS = {1: "🥇", 2: "🥈", 3: "🥉"}
+
+@bot.tree.command(name="ranking_tiempos", description="Ver el ranking de usuarios por tiempo acumulado")
+@discord.app_commands.describe(
+    cantidad="Cantidad de usuarios a mostrar (1-25)",
+    usuario="Usuario cuya posición se quiere consultar (por defecto, tú)"
+)
+@is_admin()
+async def ranking_tiempos(interaction: discord.Interaction, cantidad: int = 10, usuario: discord.Member = None):
+    """Mostrar los usuarios con más tiempo acumulado y la posición de un usuario"""
+    try:
+        cantidad = max(1, min(cantidad, 25))
+        ranking = [(user_id, total) for user_id, total in time_tracker.get_ranking(cantidad) if total > 0]
+
+        if not ranking:
+            await interaction.response.send_message("📊 No hay usuarios con tiempo registrado", ephemeral=True)
+            return
+
+        lines = []
+        for position, (user_id, total_time) in enumerate(ranking, start=1):
+            data = time_tracker.get_user_data(int(user_id)) or {}
+            member = interaction.guild.get_member(int(user_id)) if interaction.guild else None
+            name = member.mention if member else f"**{data.get('name', f'Usuario {user_id}')}**"
+            medal = RANKING_MEDALS.get(position, f"`#{position}`")
+            lines.append(f"{medal} {name} - ⏱️ {time_tracker.format_time_human(total_time)} {get_status_label(data)}")
+
+        embed = discord.Embed(
+            title="🏆 Ranking de Tiempos",
+            description="\n".join(lines),
+            color=discord.Color.gold(),
+            timestamp=datetime.now()
+        )
+
+        target = usuario or interaction.user
+        rank = time_tracker.get_user_rank(target.id)
+        if rank is not None:
+            embed.add_field(
+                name=f"📍 Posición de {target.display_name}",
+                value=f"#{rank} de {len(time_tracker.leaderboard)} - ⏱️ {time_tracker.format_time_human(time_tracker.get_total_time(target.id))}",
+                inline=False
+            )
+
+        embed.set_footer(text=f"Top {len(ranking)} por tiempo acumulado")
+        await interaction.response.send_message(embed=embed)
+
+    except Exception as e:
+        print(f"Error en ranking_tiempos: {e}")
+        if not interaction.response.is_done():
+            await interaction.response.send_message("❌ Error al obtener el ranking de tiempos.", ephemeral=True)
+
 @bot.tree.command(name="reiniciar_tiempo", description="Reiniciar el tiempo de un usuario a cero")
 @discord.app_commands.describe(usuario="El usuario cuyo tiempo se reiniciará")
 @is_admin()
@@ -790,6 +1519,7 @@ async def limpiar_base_datos_confirmar(interaction: discord.Interaction, confirm
 @bot.tree.command(name="cancelar_tiempo", description="Cancelar completamente el tiempo de un usuario")
 @discord.app_commands.describe(usuario="El usuario cuyo tiempo se cancelará por completo")
 @is_admin()
+@fast_ack()
 async def cancelar_tiempo(interaction: discord.Interaction, usuario: discord.Member):
     user_data = time_tracker.get_user_data(usuario.id)
     total_time = time_tracker.get_total_time(usuario.id)
@@ -799,12 +1529,12 @@ async def cancelar_tiempo(interaction: discord.Interaction, usuario: discord.Mem
         formatted_time = time_tracker.format_time_human(total_time)
         success = time_tracker.cancel_user_tracking(user_id)
         if success:
-            await interaction.response.send_message(f"🗑️ El tiempo de {usuario.mention} ha sido cancelado")
-            await send_cancellation_notification(usuario.display_name, interaction.user.mention, formatted_time)
+            await send_response(interaction, f"🗑️ El tiempo de {usuario.mention} ha sido cancelado")
+            spawn_background(send_cancellation_notification(usuario.display_name, interaction.user.mention, formatted_time))
         else:
-            await interaction.response.send_message(f"❌ Error al cancelar el tiempo para {usuario.mention}")
+            await send_response(interaction, f"❌ Error al cancelar el tiempo para {usuario.mention}")
     else:
-        await interaction.response.send_message(f"❌ No se encontró registro de tiempo para {usuario.mention}")
+        await send_response(interaction, f"❌ No se encontró registro de tiempo para {usuario.mention}")
 
 @bot.tree.command(name="configurar_canal_tiempos", description="Configurar el canal donde se enviarán las notificaciones de tiempo completado")
 @discord.app_commands.describe(canal="El canal donde se enviarán las notificaciones de tiempo completado")
@@ -812,6 +1542,7 @@ async def cancelar_tiempo(interaction: discord.Interaction, usuario: discord.Mem
 async def configurar_canal_tiempos(interaction: discord.Interaction, canal: discord.TextChannel):
     global NOTIFICATION_CHANNEL_ID
     NOTIFICATION_CHANNEL_ID = canal.id
+    channel_registry.set_channel('milestones', canal)
     await interaction.response.send_message(f"🎯 Canal de notificaciones de tiempo configurado: {canal.mention}")
 
 @bot.tree.command(name="configurar_canal_pausas", description="Configurar el canal donde se enviarán las notificaciones de pausas")
@@ -820,6 +1551,7 @@ async def configurar_canal_tiempos(interaction: discord.Interaction, canal: disc
 async def configurar_canal_pausas(interaction: discord.Interaction, canal: discord.TextChannel):
     global PAUSE_NOTIFICATION_CHANNEL_ID
     PAUSE_NOTIFICATION_CHANNEL_ID = canal.id
+    channel_registry.set_channel('pauses', canal)
     await interaction.response.send_message(f"⏸️ Canal de notificaciones de pausas configurado: {canal.mention}")
 
 @bot.tree.command(name="configurar_canal_cancelaciones", description="Configurar el canal donde se enviarán las notificaciones de cancelaciones")
@@ -828,6 +1560,7 @@ async def configurar_canal_pausas(interaction: discord.Interaction, canal: disco
 async def configurar_canal_cancelaciones(interaction: discord.Interaction, canal: discord.TextChannel):
     global CANCELLATION_NOTIFICATION_CHANNEL_ID
     CANCELLATION_NOTIFICATION_CHANNEL_ID = canal.id
+    channel_registry.set_channel('cancellations', canal)
     await interaction.response.send_message(f"🗑️ Canal de notificaciones de cancelaciones configurado: {canal.mention}")
 
 @bot.tree.command(name="configurar_canal_movimientos", description="Configurar el canal donde se enviarán las notificaciones de movimientos/inicios automáticos")
@@ -836,58 +1569,34 @@ async def configurar_canal_cancelaciones(interaction: discord.Interaction, canal
 async def configurar_canal_movimientos(interaction: discord.Interaction, canal: discord.TextChannel):
     global MOVEMENTS_CHANNEL_ID
     MOVEMENTS_CHANNEL_ID = canal.id
+    channel_registry.set_channel('movements', canal)
     await interaction.response.send_message(f"📋 Canal de notificaciones de movimientos configurado: {canal.mention}")
 
-@bot.tree.command(name="saber_tiempo", description="Ver estadísticas detalladas de un usuario")
-@discord.app_commands.describe(usuario="El usuario del que ver estadísticas")
-@is_admin()
-async def saber_tiempo_admin(interaction: discord.Interaction, usuario: discord.Member):
-    user_data = time_tracker.get_user_data(usuario.id)
-
-    if not user_data:
-        await interaction.response.send_message(f"❌ No se encontraron datos para {usuario.mention}")
-        return
-
-    total_time = time_tracker.get_total_time(usuario.id)
+def build_user_stats_embed(user_id: int, user_data, display_name: str, avatar_url=None) -> discord.Embed:
+    """Embed de estadísticas detalladas de un usuario con seguimiento"""
+    total_time = time_tracker.get_total_time(user_id)
     formatted_time = time_tracker.format_time_human(total_time)
 
     embed = discord.Embed(
-        title=f"📊 Estadísticas de {usuario.display_name}",
+        title=f"📊 Estadísticas de {display_name}",
         color=discord.Color.green(),
         timestamp=datetime.now()
     )
 
     embed.add_field(name="⏱️ Tiempo Total", value=formatted_time, inline=True)
 
-    has_special_role = has_unlimited_time_role(usuario)
-
-    status = "🟢 Activo" if user_data.get('is_active', False) else "🔴 Inactivo"
-    if user_data.get('is_paused', False):
-        total_hours = total_time / 3600
-        has_special_role = has_unlimited_time_role(usuario) if usuario else False
-        role_type = get_user_role_type(usuario) if usuario else "normal"
-
-        # Verificar límites según el tipo de rol
-        if (user_data.get("milestone_completed", False) or 
-            (has_special_role and total_hours >= 4.0) or 
-            (role_type == "gold" and total_hours >= 2.0) or
-            (role_type == "normal" and total_hours >= 1.0)):
-            status = "✅ Terminado"
-        else:
-            status = "⏸️ Pausado"
-
-    embed.add_field(name="📍 Estado", value=status, inline=True)
+    embed.add_field(name="📍 Estado", value=get_status_label(user_data), inline=True)
 
     if user_data.get('is_paused', False):
-        paused_duration = time_tracker.get_paused_duration(usuario.id)
+        paused_duration = time_tracker.get_paused_duration(user_id)
         formatted_paused_time = time_tracker.format_time_human(paused_duration) if paused_duration > 0 else "0 Segundos"
         embed.add_field(
-            name=f"⏸️ Tiempo Pausado de {usuario.display_name}",
+            name=f"⏸️ Tiempo Pausado de {display_name}",
             value=formatted_paused_time,
             inline=False
         )
 
-    pause_count = time_tracker.get_pause_count(usuario.id)
+    pause_count = time_tracker.get_pause_count(user_id)
     if pause_count > 0:
         pause_text = "pausa" if pause_count == 1 else "pausas"
         embed.add_field(
@@ -896,10 +1605,198 @@ async def saber_tiempo_admin(interaction: discord.Interaction, usuario: discord.
             inline=True
         )
 
-    embed.set_thumbnail(url=usuario.avatar.url if usuario.avatar else usuario.default_avatar.url)
+    if avatar_url:
+        embed.set_thumbnail(url=avatar_url)
     embed.set_footer(text="Estadísticas actualizadas")
+    return embed
 
-    await interaction.response.send_message(embed=embed)
+@bot.tree.command(name="saber_tiempo", description="Ver estadísticas detalladas de un usuario")
+@discord.app_commands.describe(usuario="El usuario del que ver estadísticas")
+@is_admin()
+@fast_ack()
+async def saber_tiempo_admin(interaction: discord.Interaction, usuario: discord.Member):
+    user_data = time_tracker.get_user_data(usuario.id)
+
+    if not user_data:
+        await send_response(interaction, f"❌ No se encontraron datos para {usuario.mention}")
+        return
+
+    avatar_url = usuario.avatar.url if usuario.avatar else usuario.default_avatar.url
+    embed = build_user_stats_embed(usuario.id, user_data, usuario.display_name, avatar_url)
+    await send_response(interaction, embed=embed)
+
+# Discord muestra como máximo 25 sugerencias de autocompletado
+AUTOCOMPLETE_MAX_CHOICES = 25
+
+async def tracked_user_autocomplete(interaction: discord.Interaction, current: str):
+    """Sugerir usuarios con seguimiento cuyo nombre coincide con lo escrito (desde el índice de nombres)"""
+    if current.strip():
+        user_ids = time_tracker.search_users_by_name(current, limit=AUTOCOMPLETE_MAX_CHOICES)
+    else:
+        user_ids = [user_id for _, user_id, _ in time_tracker.get_users_by_name(0, AUTOCOMPLETE_MAX_CHOICES)]
+
+    choices = []
+    for user_id_str in user_ids:
+        data = time_tracker.get_user_data(int(user_id_str)) or {}
+        name = data.get('name', f'Usuario {user_id_str}')
+        choices.append(discord.app_commands.Choice(name=name[:100], value=user_id_str))
+    return choices
+
+def resolve_tracked_user(value: str):
+    """Resolver el valor de un parámetro autocompletado (ID o nombre) a un ID con seguimiento"""
+    value = value.strip()
+    if value.isdigit() and time_tracker.get_user_data(int(value)):
+        return int(value)
+    matches = time_tracker.search_users_by_name(value, limit=2)
+    if len(matches) == 1:
+        return int(matches[0])
+    return None
+
+@bot.tree.command(name="buscar_tiempo", description="Buscar un usuario con seguimiento por nombre y ver sus estadísticas")
+@discord.app_commands.describe(nombre="Nombre del usuario (usa las sugerencias)")
+@discord.app_commands.autocomplete(nombre=tracked_user_autocomplete)
+@is_admin()
+@fast_ack()
+async def buscar_tiempo(interaction: discord.Interaction, nombre: str):
+    user_id = resolve_tracked_user(nombre)
+    if user_id is None:
+        await send_response(interaction, f"❌ No se encontró un único usuario para '{nombre}'. Usa las sugerencias del comando.")
+        return
+
+    user_data = time_tracker.get_user_data(user_id)
+    member = interaction.guild.get_member(user_id) if interaction.guild else None
+    display_name = member.display_name if member else user_data.get('name', f'Usuario {user_id}')
+    avatar_url = None
+    if member:
+        avatar_url = member.avatar.url if member.avatar else member.default_avatar.url
+
+    embed = build_user_stats_embed(user_id, user_data, display_name, avatar_url)
+    await send_response(interaction, embed=embed)
+
+# =================== HISTORIAL DE SESIONES ===================
+
+HISTORY_PAGE_SIZE = 15
+
+def parse_history_date(value: str):
+    """Convertir una fecha DD/MM/AAAA a medianoche en hora de Chile"""
+    return datetime.strptime(value.strip(), "%d/%m/%Y").replace(tzinfo=CHILE_TZ)
+
+def format_session_row(session) -> str:
+    """Formatear una sesión del historial en hora de Chile"""
+    try:
+        start = datetime.fromisoformat(session['start']).astimezone(CHILE_TZ)
+        start_text = start.strftime("%d/%m/%Y %H:%M")
+    except (KeyError, TypeError, ValueError):
+        start_text = "¿?"
+    try:
+        end_text = datetime.fromisoformat(session['end']).astimezone(CHILE_TZ).strftime("%H:%M")
+    except (KeyError, TypeError, ValueError):
+        end_text = "¿?"
+    duration = time_tracker.format_time_human(session.get('duration', 0))
+    return f"`{start_text} → {end_text}` ⏱️ {duration}"
+
+class HistoryView(discord.ui.View):
+    def __init__(self, user_id: int, display_name: str, start_ts=None, end_ts=None, period_text="Todo el historial"):
+        super().__init__(timeout=300)
+        self.user_id = user_id
+        self.display_name = display_name
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.period_text = period_text
+        self.current_page = 0
+        self.total_sessions, _ = time_tracker.get_sessions_page(user_id, start_ts, end_ts, 0, 0)
+        self.total_pages = max(1, (self.total_sessions + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE)
+
+        if self.total_pages <= 1:
+            self.clear_items()
+        else:
+            self.update_buttons()
+
+    def get_embed(self):
+        """Crear embed para la página actual (cada página se lee del índice de sesiones)"""
+        _, sessions = time_tracker.get_sessions_page(
+            self.user_id, self.start_ts, self.end_ts,
+            offset=self.current_page * HISTORY_PAGE_SIZE, limit=HISTORY_PAGE_SIZE
+        )
+
+        embed = discord.Embed(
+            title=f"📜 Historial de {self.display_name}",
+            description="\n".join(format_session_row(session) for session in sessions) or "Sin sesiones en este período",
+            color=discord.Color.blue(),
+            timestamp=datetime.now()
+        )
+        embed.set_footer(text=f"{self.period_text} • Página {self.current_page + 1}/{self.total_pages} • {self.total_sessions} sesiones")
+        return embed
+
+    @discord.ui.button(label='◀️ Anterior', style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.current_page > 0:
+            self.current_page -= 1
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.get_embed(), view=self)
+
+    @discord.ui.button(label='▶️ Siguiente', style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.current_page < self.total_pages - 1:
+            self.current_page += 1
+        self.update_buttons()
+        await interaction.response.edit_message(embed=self.get_embed(), view=self)
+
+    def update_buttons(self):
+        """Actualizar estado de los botones según la página actual"""
+        self.children[0].disabled = (self.current_page == 0)
+        self.children[1].disabled = (self.current_page >= self.total_pages - 1)
+
+    async def on_timeout(self):
+        """Deshabilitar botones cuando expire el timeout"""
+        for item in self.children:
+            item.disabled = True
+
+@bot.tree.command(name="historial_tiempo", description="Ver el historial de sesiones de un usuario")
+@discord.app_commands.describe(
+    usuario="Nombre del usuario (usa las sugerencias)",
+    desde="Fecha inicial DD/MM/AAAA (opcional)",
+    hasta="Fecha final DD/MM/AAAA, inclusive (opcional)"
+)
+@discord.app_commands.autocomplete(usuario=tracked_user_autocomplete)
+@is_admin()
+async def historial_tiempo(interaction: discord.Interaction, usuario: str, desde: str = None, hasta: str = None):
+    """Historial paginado de sesiones con filtros por fecha"""
+    try:
+        user_id = resolve_tracked_user(usuario)
+        if user_id is None:
+            await interaction.response.send_message(
+                f"❌ No se encontró un único usuario para '{usuario}'. Usa las sugerencias del comando.",
+                ephemeral=True
+            )
+            return
+
+        try:
+            start_date = parse_history_date(desde) if desde else None
+            end_date = parse_history_date(hasta) if hasta else None
+        except ValueError:
+            await interaction.response.send_message("❌ Formato de fecha inválido. Usa DD/MM/AAAA.", ephemeral=True)
+            return
+
+        if start_date and end_date and start_date > end_date:
+            await interaction.response.send_message("❌ La fecha inicial debe ser anterior a la final.", ephemeral=True)
+            return
+
+        start_ts = start_date.timestamp() if start_date else None
+        end_ts = (end_date + timedelta(days=1)).timestamp() if end_date else None
+        period_text = f"{desde or 'Inicio'} - {hasta or 'Hoy'}" if (desde or hasta) else "Todo el historial"
+
+        user_data = time_tracker.get_user_data(user_id)
+        member = interaction.guild.get_member(user_id) if interaction.guild else None
+        display_name = member.display_name if member else user_data.get('name', f'Usuario {user_id}')
+
+        view = HistoryView(user_id, display_name, start_ts, end_ts, period_text)
+        await interaction.response.send_message(embed=view.get_embed(), view=view)
+
+    except Exception as e:
+        print(f"Error en historial_tiempo: {e}")
+        if not interaction.response.is_done():
+            await interaction.response.send_message("❌ Error al obtener el historial.", ephemeral=True)
 
 # =================== SISTEMA DE ROLES SIMPLIFICADO ===================
 
@@ -920,7 +1817,13 @@ async def dar_cargo_gold(interaction: discord.Interaction, usuario: discord.Memb
             )
             return
 
-        await usuario.add_roles(rol, reason=f"Rol asignado por {interaction.user.display_name}")
+        with resilience.deadline(ROLE_OPERATION_DEADLINE_SECONDS):
+            await resilience.call(
+                "member_roles",
+                lambda: usuario.add_roles(rol, reason=f"Rol asignado por {interaction.user.display_name}"),
+                policy=ROLE_RETRY_POLICY,
+                is_retryable=is_retryable_discord_error
+            )
 
         embed = discord.Embed(
             title="✅ Rol Asignado",
@@ -941,6 +1844,13 @@ async def dar_cargo_gold(interaction: discord.Interaction, usuario: discord.Memb
             "❌ No tengo permisos para asignar este rol. Verifica que mi rol esté por encima del rol que intentas asignar.",
             ephemeral=True
         )
+    except ResilienceError:
+        await interaction.response.send_message(
+            "⚠️ Discord no está respondiendo correctamente. Intenta asignar el rol en unos segundos.",
+            ephemeral=True
+        )
+    except asyncio.TimeoutError:
+        await interaction.response.send_message("⚠️ Discord tardó demasiado en responder. Intenta de nuevo.", ephemeral=True)
     except discord.HTTPException as e:
         await interaction.response.send_message(f"❌ Error al asignar el rol: {e}", ephemeral=True)
     except Exception as e:
@@ -964,7 +1874,13 @@ async def quitar_cargo(interaction: discord.Interaction, usuario: discord.Member
             )
             return
 
-        await usuario.remove_roles(rol, reason=f"Rol removido por {interaction.user.display_name}")
+        with resilience.deadline(ROLE_OPERATION_DEADLINE_SECONDS):
+            await resilience.call(
+                "member_roles",
+                lambda: usuario.remove_roles(rol, reason=f"Rol removido por {interaction.user.display_name}"),
+                policy=ROLE_RETRY_POLICY,
+                is_retryable=is_retryable_discord_error
+            )
 
         embed = discord.Embed(
             title="✅ Rol Removido",
@@ -984,6 +1900,13 @@ async def quitar_cargo(interaction: discord.Interaction, usuario: discord.Member
             "❌ No tengo permisos para quitar este rol. Verifica que mi rol esté por encima del rol que intentas quitar.",
             ephemeral=True
         )
+    except ResilienceError:
+        await interaction.response.send_message(
+            "⚠️ Discord no está respondiendo correctamente. Intenta quitar el rol en unos segundos.",
+            ephemeral=True
+        )
+    except asyncio.TimeoutError:
+        await interaction.response.send_message("⚠️ Discord tardó demasiado en responder. Intenta de nuevo.", ephemeral=True)
     except discord.HTTPException as e:
         await interaction.response.send_message(f"❌ Error al quitar el rol: {e}", ephemeral=True)
     except Exception as e:
@@ -1016,7 +1939,7 @@ async def ver_roles_usuario(interaction: discord.Interaction, usuario: discord.M
         # Verificar si tiene rol Gold
         role_type = get_user_role_type(usuario)
         if role_type == "gold":
-            gold_roles = [role for role in user_roles if "gold" in role.name.lower()]
+            gold_roles = [role for role in user_roles if role_classifier.role_type_for_id(role.id) == "gold"]
             if gold_roles:
                 gold_text = ""
                 for role in gold_roles:
@@ -1024,7 +1947,7 @@ async def ver_roles_usuario(interaction: discord.Interaction, usuario: discord.M
                 embed.add_field(name="⭐ Rol Gold", value=gold_text, inline=False)
 
         # Otros roles
-        other_roles = [role for role in user_roles if "gold" not in role.name.lower()]
+        other_roles = [role for role in user_roles if role_classifier.role_type_for_id(role.id) != "gold"]
         if other_roles:
             otros_text = ""
             for role in other_roles[:10]:  # Limitar a 10 roles
@@ -1117,7 +2040,49 @@ async def ver_pre_registrados(interaction: discord.Interaction):
         await interaction.response.send_message("❌ Error al obtener usuarios pre-registrados.", ephemeral=True)
         print(f"Error obteniendo pre-registrados: {e}")
 
+# Caché de /mi_tiempo: campos calculados por usuario, válidos mientras no cambie su registro
+MI_TIEMPO_ACTIVE_TTL = 5.0
+MI_TIEMPO_STATIC_TTL = 60.0
+mi_tiempo_cache = LRUCache(max_entries=2048)
+
+def get_mi_tiempo_fields(user_id: int, user_data, member):
+    """Campos de /mi_tiempo de un usuario (desde la caché si su registro no cambió)"""
+    role_type = get_user_role_type(member) if member else "normal"
+    has_special_role = has_unlimited_time_role(member) if member else False
+    record_key = (time_tracker.get_user_version(user_id), role_type, has_special_role)
+
+    now = time.monotonic()
+    cached = mi_tiempo_cache.get(user_id)
+    if cached is not None:
+        cached_key, expires_at, fields = cached
+        if cached_key == record_key and expires_at > now:
+            return fields
+
+    is_active = user_data.get('is_active', False) and bool(user_data.get('last_start'))
+    fields = {
+        'role_type': role_type,
+        'role_label': role_label(role_type, has_special_role),
+        'status_label': get_status_label(user_data),
+        'is_paused': user_data.get('is_paused', False),
+        'pause_count': time_tracker.get_pause_count(user_id),
+        'base_total': user_data.get('total_time', 0),
+        'active_since': datetime.fromisoformat(user_data['last_start']) if is_active else None,
+        'formatted_time': None,
+        'credits': None,
+    }
+
+    # Usuarios sin sesión activa: sus números no cambian hasta la próxima transición
+    if not is_active:
+        total_time = time_tracker.get_total_time(user_id)
+        fields['formatted_time'] = time_tracker.format_time_human(total_time)
+        fields['credits'] = calculate_credits(total_time, role_type)
+
+    ttl = MI_TIEMPO_ACTIVE_TTL if is_active else MI_TIEMPO_STATIC_TTL
+    mi_tiempo_cache.put(user_id, (record_key, now + ttl, fields))
+    return fields
+
 @bot.tree.command(name="mi_tiempo", description="Ver tu propio tiempo registrado")
+@fast_ack(ephemeral=True)
 async def mi_tiempo(interaction: discord.Interaction):
     """Comando para que los usuarios vean su propio tiempo"""
     try:
@@ -1125,19 +2090,24 @@ async def mi_tiempo(interaction: discord.Interaction):
         user_data = time_tracker.get_user_data(user_id)
 
         if not user_data:
-            await interaction.response.send_message(
+            await send_response(
+                interaction,
                 "❌ No tienes tiempo registrado aún. Un administrador debe iniciarte el tiempo primero.", 
                 ephemeral=True
             )
             return
 
-        total_time = time_tracker.get_total_time(user_id)
-        formatted_time = time_tracker.format_time_human(total_time)
-
-        # Obtener tipo de rol del usuario
         member = interaction.guild.get_member(user_id) if interaction.guild else None
-        role_type = get_user_role_type(member) if member else "normal"
-        has_special_role = has_unlimited_time_role(member) if member else False
+        fields = get_mi_tiempo_fields(user_id, user_data, member)
+
+        # Solo el tiempo en vivo (y lo que depende de él) se recalcula en cada llamada
+        if fields['active_since'] is not None:
+            total_time = fields['base_total'] + (datetime.now() - fields['active_since']).total_seconds()
+            formatted_time = time_tracker.format_time_human(total_time)
+            credits = calculate_credits(total_time, fields['role_type'])
+        else:
+            formatted_time = fields['formatted_time']
+            credits = fields['credits']
 
         # Crear embed con información del usuario
         embed = discord.Embed(
@@ -1148,24 +2118,10 @@ async def mi_tiempo(interaction: discord.Interaction):
 
         embed.add_field(name="⏱️ Tiempo Total", value=formatted_time, inline=True)
 
-        # Determinar estado
-        status = "🟢 Activo" if user_data.get('is_active', False) else "🔴 Inactivo"
-        if user_data.get('is_paused', False):
-            total_hours = total_time / 3600
-
-            # Verificar límites según el tipo de rol
-            if (user_data.get("milestone_completed", False) or 
-                (has_special_role and total_hours >= 4.0) or 
-                (role_type == "gold" and total_hours >= 2.0) or
-                (role_type == "normal" and total_hours >= 1.0)):
-                status = "✅ Terminado"
-            else:
-                status = "⏸️ Pausado"
-
-        embed.add_field(name="📍 Estado", value=status, inline=True)
+        embed.add_field(name="📍 Estado", value=fields['status_label'], inline=True)
 
         # Mostrar tiempo pausado si aplica
-        if user_data.get('is_paused', False):
+        if fields['is_paused']:
             paused_duration = time_tracker.get_paused_duration(user_id)
             formatted_paused_time = time_tracker.format_time_human(paused_duration) if paused_duration > 0 else "0 Segundos"
             embed.add_field(
@@ -1175,7 +2131,7 @@ async def mi_tiempo(interaction: discord.Interaction):
             )
 
         # Mostrar contador de pausas si hay
-        pause_count = time_tracker.get_pause_count(user_id)
+        pause_count = fields['pause_count']
         if pause_count > 0:
             pause_text = "pausa" if pause_count == 1 else "pausas"
             embed.add_field(
@@ -1185,7 +2141,6 @@ async def mi_tiempo(interaction: discord.Interaction):
             )
 
         # Mostrar créditos ganados
-        credits = calculate_credits(total_time, role_type)
         embed.add_field(
             name="💰 Créditos Ganados",
             value=f"{credits} créditos",
@@ -1193,32 +2148,19 @@ async def mi_tiempo(interaction: discord.Interaction):
         )
 
         # Mostrar límites según rol
-        if has_special_role:
-            embed.add_field(
-                name="🎭 Tu Rol",
-                value="⭐ Rol Especial - Límite: 4 horas",
-                inline=False
-            )
-        elif role_type == "gold":
-            embed.add_field(
-                name="🎭 Tu Rol",
-                value="🏆 Gold - Límite: 2 horas",
-                inline=False
-            )
-        else:
-            embed.add_field(
-                name="🎭 Tu Rol",
-                value="👤 Recluta - Límite: 1 hora",
-                inline=False
-            )
+        embed.add_field(
+            name="🎭 Tu Rol",
+            value=fields['role_label'],
+            inline=False
+        )
 
         embed.set_thumbnail(url=interaction.user.avatar.url if interaction.user.avatar else interaction.user.default_avatar.url)
         embed.set_footer(text="Tu información personal de tiempo")
 
-        await interaction.response.send_message(embed=embed, ephemeral=False)
+        await send_response(interaction, embed=embed, ephemeral=True)
 
     except Exception as e:
-        await interaction.response.send_message("❌ Error al obtener tu información de tiempo.", ephemeral=True)
+        await send_response(interaction, "❌ Error al obtener tu información de tiempo.", ephemeral=True)
         print(f"Error en comando mi_tiempo para {interaction.user.display_name}: {e}")
 
 @bot.tree.command(name="lista_roles_sistema", description="Ver información sobre el sistema de roles simplificado")
@@ -1246,7 +2188,8 @@ async def lista_roles_sistema(interaction: discord.Interaction):
                   "• `/quitar_cargo` - Quitar cualquier rol\n"
                   "• `/ver_roles_usuario` - Ver roles de un usuario\n"
                   "• `/paga_recluta` - Ver usuarios sin rol específico\n"
-                  "• `/paga_gold` - Ver usuarios con rol Gold",
+                  "• `/paga_gold` - Ver usuarios con rol Gold\n"
+                  "• `/exportar_pagos` - Exportar todos los pagos a CSV/JSONL",
             inline=False
         )
 
@@ -1279,26 +2222,71 @@ async def lista_roles_sistema(interaction: discord.Interaction):
 
 # =================== COMANDOS DE PAGO SIMPLIFICADOS ===================
 
+# Título, campos de resumen y pie de página del embed de pagos
+PAYMENT_EMBED_OVERHEAD = 384
+
+def format_payment_row(user_data, guild):
+    """Formatear la fila de un usuario para el reporte de pagos"""
+    user_id = user_data['user_id']
+    member = guild.get_member(user_id) if guild else None
+
+    if member:
+        user_mention = member.mention
+    else:
+        user_name = user_data.get('name', f'Usuario {user_id}')
+        user_mention = f"**{user_name}** `(ID: {user_id})`"
+
+    formatted_time = time_tracker.format_time_human(user_data['total_time'])
+    status = get_status_label(user_data.get('data', {}))
+    return f"📌 {user_mention} - ⏱️ {formatted_time} - 💰 {user_data['credits']} Créditos {status}"
+
 class PaymentView(discord.ui.View):
-    def __init__(self, filtered_users, role_name, guild, search_term=None):
+    def __init__(self, filtered_users, role_name, guild, search_term=None, snapshot_version=None, total_credits=None):
         super().__init__(timeout=300)
         self.filtered_users = filtered_users
         self.role_name = role_name
         self.guild = guild
         self.search_term = search_term
+        self.snapshot_version = snapshot_version
         self.current_page = 0
-        self.max_per_page = 15
-        self.total_pages = (len(filtered_users) + self.max_per_page - 1) // self.max_per_page if filtered_users else 1
+        # Filas y límites de página: se calculan una vez por snapshot del reporte
+        self.rows, self.page_bounds = self.build_pages()
+        self.total_pages = len(self.page_bounds)
+        # Los créditos del snapshot no cambian: se usan los totales precalculados del reporte
+        if total_credits is None:
+            total_credits = sum(user['credits'] for user in filtered_users)
+        self.total_all_credits = total_credits
 
         if self.total_pages <= 1:
             for item in self.children:
                 if isinstance(item, discord.ui.Button) and item.label in ['◀️ Anterior', '▶️ Siguiente']:
                     item.disabled = True
 
+    def build_pages(self):
+        """Formatear todas las filas del reporte y empaquetarlas en páginas"""
+        cache_key = None
+        if self.snapshot_version is not None:
+            cache_key = ("pago_paginas", self.role_name, self.search_term, self.snapshot_version)
+            cached = page_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        rows = []
+        for user_data in self.filtered_users:
+            try:
+                rows.append(format_payment_row(user_data, self.guild))
+            except Exception as e:
+                print(f"Error procesando usuario en pago: {e}")
+                rows.append(f"📌 Usuario {user_data.get('user_id')}")
+
+        pages = (rows, pack_pages([len(row) for row in rows], overhead=PAYMENT_EMBED_OVERHEAD))
+        if cache_key is not None:
+            page_cache.put(cache_key, pages)
+        return pages
+
     def get_embed(self):
         """Crear embed para la página actual"""
-        start_idx = self.current_page * self.max_per_page
-        end_idx = min(start_idx + self.max_per_page, len(self.filtered_users))
+        start_idx, end_idx = self.page_bounds[self.current_page]
         current_users = self.filtered_users[start_idx:end_idx]
 
         role_emoji = "👤"
@@ -1322,49 +2310,8 @@ class PaymentView(discord.ui.View):
             embed.set_footer(text="No hay datos para mostrar")
             return embed
 
-        user_list = []
-        total_credits = 0
-
-        for user_data in current_users:
-            try:
-                user_id = user_data['user_id']
-                member = self.guild.get_member(user_id) if self.guild else None
-
-                if member:
-                    user_mention = member.mention
-                else:
-                    user_name = user_data.get('name', f'Usuario {user_id}')
-                    user_mention = f"**{user_name}** `(ID: {user_id})`"
-
-                total_time = user_data['total_time']
-                formatted_time = time_tracker.format_time_human(total_time)
-                credits = user_data['credits']
-                total_credits += credits
-
-                data = user_data.get('data', {})
-                status = "🔴 Inactivo"
-                if data.get('is_active', False):
-                    status = "🟢 Activo"
-                elif data.get('is_paused', False):
-                    total_hours = total_time / 3600
-                    has_special_role = has_unlimited_time_role(member) if member else False
-                    role_type = get_user_role_type(member) if member else "normal"
-
-                    if (data.get("milestone_completed", False) or 
-                        (user_data.get('has_special_role', False) and total_hours >= 4.0) or 
-                        (role_type == "gold" and total_hours >= 2.0) or
-                        (role_type == "normal" and total_hours >= 1.0)):
-                        status = "✅ Terminado"
-                    else:
-                        status = "⏸️ Pausado"
-
-                user_list.append(f"📌 {user_mention} - ⏱️ {formatted_time} - 💰 {credits} Créditos {status}")
-
-            except Exception as e:
-                print(f"Error procesando usuario en pago: {e}")
-                continue
-
-        embed.description = "\n".join(user_list)
+        total_credits = sum(user_data['credits'] for user_data in current_users)
+        embed.description = fit_description(self.rows[start_idx:end_idx])
 
         embed.add_field(
             name="📊 Resumen de Página",
@@ -1373,11 +2320,10 @@ class PaymentView(discord.ui.View):
         )
 
         total_users = len(self.filtered_users)
-        total_all_credits = sum(user['credits'] for user in self.filtered_users)
 
         embed.add_field(
             name="🎯 Total General",
-            value=f"Usuarios: {total_users}\nCréditos totales: {total_all_credits}",
+            value=f"Usuarios: {total_users}\nCréditos totales: {self.total_all_credits}",
             inline=True
         )
 
@@ -1430,11 +2376,12 @@ class SearchUserModal(discord.ui.Modal, title='Buscar Usuario'):
     async def on_submit(self, interaction: discord.Interaction):
         search_term = self.search_term.value.lower().strip()
 
-        matching_users = []
-        for user_data in self.payment_view.filtered_users:
-            user_name = user_data.get('name', '').lower()
-            if search_term in user_name:
-                matching_users.append(user_data)
+        # Búsqueda en el índice de nombres, restringida a los usuarios del reporte
+        matching_ids = set(time_tracker.search_users_by_name(search_term))
+        matching_users = [
+            user_data for user_data in self.payment_view.filtered_users
+            if str(user_data['user_id']) in matching_ids
+        ]
 
         if not matching_users:
             await interaction.response.send_message(
@@ -1443,83 +2390,130 @@ class SearchUserModal(discord.ui.Modal, title='Buscar Usuario'):
             )
             return
 
-        new_view = PaymentView(matching_users, self.payment_view.role_name, self.payment_view.guild, search_term)
+        new_view = PaymentView(matching_users, self.payment_view.role_name, self.payment_view.guild, search_term,
+                               snapshot_version=self.payment_view.snapshot_version)
         embed = new_view.get_embed()
 
         await interaction.response.edit_message(embed=embed, view=new_view)
 
-def get_users_by_role_filter(role_filter_func, role_name: str, interaction: discord.Interaction):
-    """Función auxiliar para obtener usuarios filtrados por rol"""
-    try:
-        tracked_users = time_tracker.get_all_tracked_users()
-        filtered_users = []
-
-        for user_id_str, data in tracked_users.items():
-            try:
-                user_id = int(user_id_str)
-                member = interaction.guild.get_member(user_id) if interaction.guild else None
-
-                if not role_filter_func(member, data):
-                    continue
-
-                total_time = time_tracker.get_total_time(user_id)
-
-                if total_time <= 0:
-                    continue
-
-                if member:
-                    role_type = get_user_role_type(member)
-                    has_special_role = has_unlimited_time_role(member)
-                else:
-                    role_type = "normal"
-                    has_special_role = False
+def get_role_members(guild: discord.Guild, role_ids) -> dict:
+    """Miembros del servidor con alguno de los roles indicados (id → miembro)"""
+    members = {}
+    for role_id in role_ids:
+        role = guild.get_role(role_id)
+        if role is None:
+            continue
+        for member in role.members:
+            members[member.id] = member
+    return members
+
+def collect_payroll_rows(candidates):
+    """
+    Filas sin créditos de un reporte de pagos a partir de (user_id, miembro, tipo de rol).
+    Solo se incluyen usuarios con seguimiento y tiempo registrado (se ejecuta en el event loop).
+    """
+    rows = []
+    for user_id, member, role_type in candidates:
+        data = time_tracker.get_user_data(user_id)
+        if not data:
+            continue
 
-                credits = calculate_credits(total_time, role_type)
+        total_time = time_tracker.get_total_time(user_id)
+        if total_time <= 0:
+            continue
 
-                user_info = {
-                    'user_id': user_id,
-                    'name': data.get('name', f'Usuario {user_id}'),
-                    'total_time': total_time,
-                    'credits': credits,
-                    'role_type': role_type,
-                    'has_special_role': has_special_role,
-                    'data': data
-                }
+        rows.append({
+            'user_id': user_id,
+            'name': data.get('name', f'Usuario {user_id}'),
+            'total_time': total_time,
+            'credits': 0,
+            'role_type': role_type,
+            'has_special_role': has_unlimited_time_role(member) if member else False,
+            'data': data
+        })
+    return rows
+
+def price_payroll_rows(rows):
+    """
+    Calcular los créditos de las filas y ordenarlas por nombre (no toca Discord ni el
+    TimeTracker, puede ejecutarse fuera del event loop). Devuelve (filas, créditos totales por nivel).
+    """
+    evaluation = credit_rules.evaluate([row['total_time'] for row in rows], [row['role_type'] for row in rows])
+    for row, user_credits in zip(rows, evaluation.credits):
+        row['credits'] = user_credits
+
+    rows.sort(key=lambda x: x['name'].lower())
+    return rows, evaluation.tier_totals
+
+def get_tier_payroll_users(tier: str, guild: discord.Guild):
+    """Usuarios de un nivel de pago: miembros de los roles del nivel ∩ usuarios con seguimiento"""
+    try:
+        if not guild:
+            return []
+        members = get_role_members(guild, role_classifier.role_ids_for_type(tier))
+        return collect_payroll_rows((member_id, member, tier) for member_id, member in members.items())
+    except Exception as e:
+        print(f"Error obteniendo usuarios del nivel {tier}: {e}")
+        return []
 
-                filtered_users.append(user_info)
+def get_unassigned_payroll_users(guild: discord.Guild):
+    """Usuarios con seguimiento que no pertenecen a ningún nivel de pago (reclutas)"""
+    try:
+        # Cualquier rol que el clasificador asocia a un nivel excluye al miembro
+        tier_member_ids = set(get_role_members(guild, role_classifier.role_type_by_id)) if guild else set()
 
-            except Exception as e:
-                print(f"Error procesando usuario {user_id_str}: {e}")
+        candidates = []
+        for user_id_str in time_tracker.get_all_tracked_users():
+            user_id = int(user_id_str)
+            if user_id in tier_member_ids:
                 continue
+            member = guild.get_member(user_id) if guild else None
+            candidates.append((user_id, member, "normal"))
 
-        filtered_users.sort(key=lambda x: x['name'].lower())
-        return filtered_users
-
+        return collect_payroll_rows(candidates)
     except Exception as e:
-        print(f"Error en get_users_by_role_filter: {e}")
+        print(f"Error obteniendo reclutas: {e}")
         return []
 
+async def get_payroll_report(report_name: str, tier, interaction: discord.Interaction):
+    """
+    Reporte de pagos compartido entre solicitudes simultáneas (single-flight por versión de datos).
+    `tier` None reporta a los usuarios sin nivel de pago.
+    Devuelve (usuarios, créditos totales del reporte, versión del snapshot).
+    """
+    guild = interaction.guild
+    guild_id = guild.id if guild else None
+    snapshot_version = time_tracker.version
+
+    async def compute():
+        # Miembros y datos se leen en el event loop; solo el cálculo de créditos va a un hilo
+        if tier is None:
+            rows = get_unassigned_payroll_users(guild)
+        else:
+            rows = get_tier_payroll_users(tier, guild)
+        return await asyncio.to_thread(price_payroll_rows, rows)
+
+    try:
+        filtered_users, tier_totals = await report_flights.run((report_name, guild_id), snapshot_version, compute)
+        return filtered_users, sum(tier_totals.values()), snapshot_version
+    except Exception as e:
+        print(f"Error calculando reporte {report_name}: {e}")
+        return [], 0, snapshot_version
+
 @bot.tree.command(name="paga_recluta", description="Ver usuarios sin rol específico con sus horas y créditos")
 @is_admin()
 async def paga_recluta(interaction: discord.Interaction):
     """Mostrar usuarios sin rol específico (normales) con sus créditos"""
     await interaction.response.defer()
 
-    def filter_normal_users(member, data):
-        """Filtrar usuarios sin rol específico"""
-        if not member:
-            return True
-
-        role_type = get_user_role_type(member)
-        return role_type == "normal"
-
-    filtered_users = get_users_by_role_filter(filter_normal_users, "Reclutas (Sin Rol)", interaction)
+    filtered_users, total_credits, snapshot_version = await get_payroll_report("paga_recluta", None, interaction)
 
     if not filtered_users:
         await interaction.followup.send("❌ No se encontraron reclutas con tiempo registrado")
         return
 
-    view = PaymentView(filtered_users, "Reclutas (Sin Rol)", interaction.guild)
+    view = PaymentView(filtered_users, "Reclutas (Sin Rol)", interaction.guild, snapshot_version=snapshot_version,
+                       total_credits=total_credits)
     embed = view.get_embed()
     await interaction.followup.send(embed=embed, view=view)
 
@@ -1529,122 +2523,179 @@ async def paga_gold(interaction: discord.Interaction):
     """Mostrar usuarios con rol Gold con sus créditos"""
     await interaction.response.defer()
 
-    gold_role_id = 1382198935971430440
-
-    def filter_gold_users(member, data):
-        """Filtrar usuarios con rol Gold"""
-        if not member:
-            return False
-
-        for role in member.roles:
-            if role.id == gold_role_id:
-                return True
-
-        role_type = get_user_role_type(member)
-        return role_type == "gold"
-
-    filtered_users = get_users_by_role_filter(filter_gold_users, "Gold", interaction)
+    filtered_users, total_credits, snapshot_version = await get_payroll_report("paga_gold", "gold", interaction)
 
     if not filtered_users:
         await interaction.followup.send("❌ No se encontraron usuarios con rol Gold con tiempo registrado")
         return
 
-    view = PaymentView(filtered_users, "Gold", interaction.guild)
+    view = PaymentView(filtered_users, "Gold", interaction.guild, snapshot_version=snapshot_version,
+                       total_credits=total_credits)
     embed = view.get_embed()
     await interaction.followup.send(embed=embed, view=view)
 
+# =================== EXPORTACIÓN DE PAGOS ===================
+
+# Usuarios cuyos créditos se evalúan juntos al generar el archivo
+EXPORT_CHUNK_SIZE = 500
+
+def iter_payroll_export_rows(snapshot):
+    """Generar las filas de la exportación a partir de un snapshot [(user_id, datos, tiempo total, tipo de rol)]"""
+    for start in range(0, len(snapshot), EXPORT_CHUNK_SIZE):
+        chunk = snapshot[start:start + EXPORT_CHUNK_SIZE]
+        evaluation = credit_rules.evaluate([row[2] for row in chunk], [row[3] for row in chunk])
+        for (user_id_str, data, total_time, role_type), user_credits in zip(chunk, evaluation.credits):
+            yield {
+                'user_id': user_id_str,
+                'name': data.get('name', f'Usuario {user_id_str}'),
+                'tier': role_type,
+                'total_seconds': int(total_time),
+                'total_time': time_tracker.format_time_human(total_time),
+                'credits': user_credits,
+                'status': get_status(data),
+            }
+
+def build_payroll_export(snapshot, export_format: str):
+    """Construir el archivo de exportación (se ejecuta fuera del event loop)"""
+    return write_export(iter_payroll_export_rows(snapshot), export_format)
+
+@bot.tree.command(name="exportar_pagos", description="Exportar tiempos y créditos de todos los usuarios a un archivo")
+@discord.app_commands.describe(formato="Formato del archivo: csv o jsonl")
+@discord.app_commands.choices(formato=[
+    discord.app_commands.Choice(name="CSV", value="csv"),
+    discord.app_commands.Choice(name="JSONL", value="jsonl"),
+])
+@is_admin()
+async def exportar_pagos(interaction: discord.Interaction, formato: str = "csv"):
+    """Exportar el reporte de pagos completo como un único archivo adjunto"""
+    await interaction.response.defer(ephemeral=True)
+
+    try:
+        # Snapshot tomado en el event loop (datos copiados y tipo de rol resuelto desde la
+        # caché de miembros): el archivo refleja un único instante y el hilo no toca Discord
+        guild = interaction.guild
+        snapshot = [
+            (user_id_str, dict(data), time_tracker.get_total_time(int(user_id_str)),
+             get_user_role_type(guild.get_member(int(user_id_str)) if guild else None))
+            for user_id_str, data in time_tracker.get_all_tracked_users().items()
+        ]
+
+        if not snapshot:
+            await interaction.followup.send("📊 No hay usuarios con tiempo registrado", ephemeral=True)
+            return
+
+        buffer, extension, row_count = await asyncio.to_thread(
+            build_payroll_export, snapshot, formato
+        )
+
+        timestamp = datetime.now(CHILE_TZ).strftime("%Y%m%d_%H%M")
+        export_file = discord.File(buffer, filename=f"pagos_{timestamp}.{extension}")
+        await interaction.followup.send(
+            f"📁 Exportación de pagos: {row_count} usuarios",
+            file=export_file,
+            ephemeral=True
+        )
+
+    except Exception as e:
+        print(f"Error exportando pagos: {e}")
+        await interaction.followup.send("❌ Error al generar la exportación de pagos.", ephemeral=True)
+
 # =================== NOTIFICACIONES ===================
 
+# Políticas de reintento compartidas para las llamadas a Discord
+NOTIFICATION_RETRY_POLICY = RetryPolicy(max_attempts=3, base_delay=1.0, attempt_timeout=10.0)
+MILESTONE_RETRY_POLICY = RetryPolicy(max_attempts=5, base_delay=1.0, attempt_timeout=10.0, timeout_step=5.0, max_attempt_timeout=30.0)
+ROLE_RETRY_POLICY = RetryPolicy(max_attempts=2, base_delay=0.5, attempt_timeout=2.0)
+
+# Tiempo máximo total (reintentos incluidos) para una notificación
+NOTIFICATION_DEADLINE_SECONDS = 60.0
+# Las operaciones de rol responden a la interacción: deben caber en los 3s de Discord
+ROLE_OPERATION_DEADLINE_SECONDS = 2.5
+
+def is_retryable_discord_error(error: BaseException) -> bool:
+    """Solo se reintentan errores transitorios (timeouts, 5xx, 429 y fallas de red)"""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    if isinstance(error, discord.HTTPException):
+        return error.status >= 500 or error.status == 429
+    if isinstance(error, (OSError, aiohttp.ClientError)):
+        return True
+    return False
+
+async def send_channel_message(channel_key: str, description: str, content: str = None,
+                               policy: RetryPolicy = NOTIFICATION_RETRY_POLICY, **kwargs) -> bool:
+    """Enviar un mensaje a un canal de notificación usando la política de resiliencia compartida"""
+    channel = await channel_registry.resolve(channel_key)
+    if not channel:
+        print(f"❌ Canal '{channel_key}' no encontrado: {channel_registry.channel_ids.get(channel_key)}")
+        return False
+
+    try:
+        with resilience.deadline(NOTIFICATION_DEADLINE_SECONDS):
+            await resilience.call(
+                f"channel:{channel_key}",
+                lambda: channel.send(content, **kwargs),
+                policy=policy,
+                is_retryable=is_retryable_discord_error
+            )
+        print(f"✅ Notificación de {description} enviada")
+        return True
+    except CircuitOpenError as e:
+        print(f"⚠️ Notificación de {description} descartada: {e}")
+    except ResilienceError as e:
+        print(f"⚠️ Notificación de {description} rechazada: {e}")
+    except asyncio.TimeoutError:
+        print(f"❌ Timeout enviando notificación de {description}")
+    except discord.Forbidden:
+        print(f"❌ Sin permisos para enviar mensaje en canal '{channel_key}' ({channel.id})")
+    except discord.NotFound:
+        channel_registry.invalidate(channel.id)
+        print(f"❌ Canal '{channel_key}' ya no existe ({channel.id})")
+    except discord.HTTPException as e:
+        print(f"❌ Error HTTP enviando notificación de {description}: {e}")
+    except Exception as e:
+        print(f"❌ Error enviando notificación de {description}: {e}")
+    return False
+
 async def send_auto_cancellation_notification(user_name: str, total_time: str, cancelled_by: str, pause_count: int):
     """Enviar notificación cuando un usuario es cancelado automáticamente por 3 pausas"""
-    channel = bot.get_channel(CANCELLATION_NOTIFICATION_CHANNEL_ID)
-    if channel:
-        try:
-            message = f"🚫 **CANCELACIÓN AUTOMÁTICA**\n**{user_name}** ha sido cancelado automáticamente por exceder el límite de pausas\n**Tiempo total perdido:** {total_time}\n**Pausas alcanzadas:** {pause_count}/3\n**Última pausa ejecutada por:** {cancelled_by}"
-            await channel.send(message)
-            print(f"✅ Notificación de cancelación automática enviada para {user_name}")
-        except Exception as e:
-            print(f"❌ Error enviando notificación de cancelación automática: {e}")
+    message = f"🚫 **CANCELACIÓN AUTOMÁTICA**\n**{user_name}** ha sido cancelado automáticamente por exceder el límite de pausas\n**Tiempo total perdido:** {total_time}\n**Pausas alcanzadas:** {pause_count}/3\n**Última pausa ejecutada por:** {cancelled_by}"
+    await send_channel_message('cancellations', f"cancelación automática para {user_name}", message)
 
 async def send_cancellation_notification(user_name: str, cancelled_by: str, cancelled_time: str = ""):
     """Enviar notificación cuando un usuario es cancelado"""
-    channel = bot.get_channel(CANCELLATION_NOTIFICATION_CHANNEL_ID)
-    if channel:
-        try:
-            if cancelled_time:
-                message = f"🗑️ El seguimiento de tiempo de **{user_name}** ha sido cancelado\n**Tiempo cancelado:** {cancelled_time}\n**Cancelado por:** {cancelled_by}"
-            else:
-                message = f"🗑️ El seguimiento de tiempo de **{user_name}** ha sido cancelado por {cancelled_by}"
-            await channel.send(message)
-            print(f"✅ Notificación de cancelación enviada para {user_name}")
-        except Exception as e:
-            print(f"❌ Error enviando notificación de cancelación: {e}")
+    if cancelled_time:
+        message = f"🗑️ El seguimiento de tiempo de **{user_name}** ha sido cancelado\n**Tiempo cancelado:** {cancelled_time}\n**Cancelado por:** {cancelled_by}"
+    else:
+        message = f"🗑️ El seguimiento de tiempo de **{user_name}** ha sido cancelado por {cancelled_by}"
+    await send_channel_message('cancellations', f"cancelación para {user_name}", message)
 
 async def send_pause_notification(user_name: str, total_time: float, paused_by: str, session_time: str = "", pause_count: int = 0):
     """Enviar notificación cuando un usuario es pausado"""
-    max_retries = 3
-
-    for attempt in range(max_retries):
-        try:
-            channel = bot.get_channel(PAUSE_NOTIFICATION_CHANNEL_ID)
-            if not channel:
-                print(f"❌ Canal de pausas no encontrado: {PAUSE_NOTIFICATION_CHANNEL_ID}")
-                return
-
-            formatted_total_time = time_tracker.format_time_human(total_time)
-            pause_text = f"pausa" if pause_count == 1 else f"pausas"
-
-            if session_time and session_time != "0 Segundos":
-                message = f"⏸️ El tiempo de **{user_name}** ha sido pausado\n**Tiempo de sesión pausado:** {session_time}\n**Tiempo total acumulado:** {formatted_total_time}\n**Pausado por:** {paused_by}\n📊 **{user_name}** lleva {pause_count} {pause_text}"
-            else:
-                message = f"⏸️ El tiempo de **{user_name}** ha sido pausado por {paused_by}\n**Tiempo total acumulado:** {formatted_total_time}\n📊 **{user_name}** lleva {pause_count} {pause_text}"
-
-            await asyncio.wait_for(channel.send(message), timeout=10.0)
-            print(f"✅ Notificación de pausa enviada para {user_name}")
-            return
+    formatted_total_time = time_tracker.format_time_human(total_time)
+    pause_text = f"pausa" if pause_count == 1 else f"pausas"
 
-        except asyncio.TimeoutError:
-            print(f"⚠️ Timeout enviando notificación de pausa para {user_name} (intento {attempt + 1}/{max_retries})")
-        except Exception as e:
-            print(f"⚠️ Error enviando notificación de pausa para {user_name} (intento {attempt + 1}): {e}")
+    if session_time and session_time != "0 Segundos":
+        message = f"⏸️ El tiempo de **{user_name}** ha sido pausado\n**Tiempo de sesión pausado:** {session_time}\n**Tiempo total acumulado:** {formatted_total_time}\n**Pausado por:** {paused_by}\n📊 **{user_name}** lleva {pause_count} {pause_text}"
+    else:
+        message = f"⏸️ El tiempo de **{user_name}** ha sido pausado por {paused_by}\n**Tiempo total acumulado:** {formatted_total_time}\n📊 **{user_name}** lleva {pause_count} {pause_text}"
 
-        if attempt < max_retries - 1:
-            await asyncio.sleep(2 ** attempt)
+    await send_channel_message('pauses', f"pausa para {user_name}", message)
 
 async def send_unpause_notification(user_name: str, total_time: float, unpaused_by: str, paused_duration: str = ""):
     """Enviar notificación cuando un usuario es despausado"""
-    max_retries = 3
-
-    channel_id = config.get("notification_channels", {}).get("unpause")
-    if not channel_id:
+    if not channel_registry.channel_ids.get('unpause'):
         print("❌ Canal de despausas no configurado")
         return
 
-    for attempt in range(max_retries):
-        try:
-            channel = bot.get_channel(channel_id)
-            if not channel:
-                print(f"❌ Canal de despausas no encontrado: {channel_id}")
-                return
-
-            formatted_total_time = time_tracker.format_time_human(total_time)
-
-            if paused_duration:
-                message = f"▶️ El tiempo de **{user_name}** ha sido despausado\n**Tiempo total acumulado:** {formatted_total_time}\n**Tiempo pausado:** {paused_duration}\n**Despausado por:** {unpaused_by}"
-            else:
-                message = f"▶️ **{user_name}** ha sido despausado por {unpaused_by}. Tiempo acumulado: {formatted_total_time}"
-
-            await asyncio.wait_for(channel.send(message), timeout=10.0)
-            print(f"✅ Notificación de despausa enviada para {user_name}")
-            return
+    formatted_total_time = time_tracker.format_time_human(total_time)
 
-        except asyncio.TimeoutError:
-            print(f"⚠️ Timeout enviando notificación de despausa para {user_name} (intento {attempt + 1}/{max_retries})")
-        except Exception as e:
-            print(f"⚠️ Error enviando notificación de despausa para {user_name} (intento {attempt + 1}): {e}")
+    if paused_duration:
+        message = f"▶️ El tiempo de **{user_name}** ha sido despausado\n**Tiempo total acumulado:** {formatted_total_time}\n**Tiempo pausado:** {paused_duration}\n**Despausado por:** {unpaused_by}"
+    else:
+        message = f"▶️ **{user_name}** ha sido despausado por {unpaused_by}. Tiempo acumulado: {formatted_total_time}"
 
-        if attempt < max_retries - 1:
-            await asyncio.sleep(2 ** attempt)
+    await send_channel_message('unpause', f"despausa para {user_name}", message)
 
 async def check_time_milestone(user_id: int, user_name: str):
     """Verificar si el usuario ha alcanzado milestones de tiempo y enviar notificaciones"""
@@ -1751,10 +2802,7 @@ async def check_time_milestone(user_id: int, user_name: str):
             try:
                 time_tracker.stop_tracking(user_id)
                 if has_unlimited_role:
-                    user_data_refresh = time_tracker.get_user_data(user_id)
-                    if user_data_refresh:
-                        user_data_refresh['milestone_completed'] = True
-                        time_tracker.save_data()
+                    time_tracker.mark_milestone_completed(user_id)
             except Exception as e:
                 print(f"⚠️ Error deteniendo tracking final para {user_name}: {e}")
 
@@ -1766,88 +2814,106 @@ async def check_time_milestone(user_id: int, user_name: str):
         traceback.print_exc()
 
 async def send_milestone_notification(user_name: str, member, is_external_user: bool, hours: int, total_time: float):
-    """Enviar notificación de milestone con sistema de retry ultra-robusto"""
-    max_retries = 5
-    base_delay = 1
-    max_timeout = 30
+    """Enviar notificación de milestone con la política de reintentos de milestones"""
+    formatted_time = time_tracker.format_time_human(total_time)
 
-    for attempt in range(max_retries):
-        try:
-            channel = await asyncio.wait_for(
-                asyncio.to_thread(bot.get_channel, NOTIFICATION_CHANNEL_ID),
-                timeout=5.0
-            )
+    if member and not is_external_user:
+        user_reference = member.mention
+    else:
+        user_reference = f"**{user_name}**"
 
-            if not channel:
-                print(f"❌ Canal de notificaciones no encontrado: {NOTIFICATION_CHANNEL_ID}")
-                return
+    if hours == 1:
+        message = f"🎉 {user_reference} ha completado 1 Hora! Tiempo acumulado: {formatted_time} "
+    else:
+        message = f"🎉 {user_reference} ha completado {hours} Horas! Tiempo acumulado: {formatted_time} "
 
-            formatted_time = time_tracker.format_time_human(total_time)
+    description = f"milestone ({user_name} completó {hours} hora(s))"
+    if await send_channel_message('milestones', description, message, policy=MILESTONE_RETRY_POLICY):
+        return
 
-            if member and not is_external_user:
-                user_reference = member.mention
-            else:
-                user_reference = f"**{user_name}**"
+    # Notificación de emergencia: un único intento (falla rápido si el circuito está abierto)
+    emergency_message = f"⚠️ {user_reference} completó {hours}h - Notificación de emergencia"
+    if await send_channel_message('milestones', f"emergencia para {user_name}", emergency_message,
+                                  policy=RetryPolicy(max_attempts=1, attempt_timeout=10.0)):
+        return
 
-            if hours == 1:
-                message = f"🎉 {user_reference} ha completado 1 Hora! Tiempo acumulado: {formatted_time} "
-            else:
-                message = f"🎉 {user_reference} ha completado {hours} Horas! Tiempo acumulado: {formatted_time} "
+    print(f"❌ CRÍTICO: No se pudo enviar notificación para {user_name} (reintentos + emergencia)")
 
-            current_timeout = min(10 + (attempt * 5), max_timeout)
+# =================== LÍMITE DE TIEMPO AUTOMÁTICO ===================
 
-            await asyncio.wait_for(channel.send(message), timeout=current_timeout)
-            print(f"✅ Notificación enviada exitosamente: {user_name} completó {hours} hora(s) (intento {attempt + 1}, timeout: {current_timeout}s)")
+# Margen para considerar alcanzado el límite cuando el temporizador se dispara
+LIMIT_FIRE_TOLERANCE_SECONDS = 1.0
+
+def stop_user_at_limit(user_id: int, has_unlimited_role: bool = False):
+    """Detener a un usuario en su límite y marcar sus horas como notificadas (una sola escritura)"""
+    with time_tracker.batch():
+        if not time_tracker.stop_tracking(user_id):
+            return None
+        user_data = time_tracker.get_user_data(user_id)
+        total_time = user_data.get('total_time', 0)
+
+        # Evitar que la verificación de milestones vuelva a notificar estas horas
+        notified_milestones = user_data.setdefault('notified_milestones', [])
+        for hours in range(1, int(total_time // 3600) + 1):
+            if hours * 3600 not in notified_milestones:
+                notified_milestones.append(hours * 3600)
+
+        # Igual que la verificación de milestones: el rol especial queda como Terminado
+        if has_unlimited_role:
+            time_tracker.mark_milestone_completed(user_id)
+        time_tracker.save_data()
+    return total_time
+
+async def enforce_time_limit(user_id_str: str):
+    """Detener automáticamente a un usuario que alcanzó su límite y enviar una única notificación"""
+    try:
+        user_id = int(user_id_str)
+        user_data = time_tracker.get_user_data(user_id)
+        deadline = limit_deadline(user_data, MAX_TIME_HOURS)
+        if deadline is None:
             return
 
-        except asyncio.TimeoutError:
-            delay = base_delay * (2 ** attempt)
-            print(f"⚠️ Timeout ({current_timeout if 'current_timeout' in locals() else 'N/A'}s) enviando notificación para {user_name} (intento {attempt + 1}/{max_retries})")
-            if attempt < max_retries - 1:
-                print(f"🔄 Reintentando en {delay}s...")
-                await asyncio.sleep(delay)
-        except discord.HTTPException as e:
-            if "50013" in str(e):
-                print(f"❌ Sin permisos para enviar mensaje en canal {NOTIFICATION_CHANNEL_ID}")
-                return
-            elif "50035" in str(e):
-                print(f"❌ Mensaje inválido para {user_name}: {e}")
-                return
-            print(f"⚠️ Error HTTP enviando notificación para {user_name} (intento {attempt + 1}): {e}")
-            if attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt)
-                await asyncio.sleep(delay)
-        except discord.NotFound:
-            print(f"❌ Canal de notificaciones no encontrado: {NOTIFICATION_CHANNEL_ID}")
+        # El registro cambió desde que se programó: reprogramar al nuevo instante
+        if deadline > time.time() + LIMIT_FIRE_TOLERANCE_SECONDS:
+            limit_scheduler.observe(user_id_str, user_data)
             return
-        except Exception as e:
-            print(f"⚠️ Error inesperado enviando notificación para {user_name} (intento {attempt + 1}): {e}")
-            if attempt < max_retries - 1:
-                delay = base_delay * (2 ** attempt)
-                await asyncio.sleep(delay)
 
-    print(f"🚨 TODOS LOS INTENTOS FALLARON para {user_name}. Intentando notificación de emergencia...")
-    try:
-        channel = bot.get_channel(NOTIFICATION_CHANNEL_ID)
-        if channel:
-            emergency_message = f"⚠️ {user_reference if 'user_reference' in locals() else user_name} completó {hours}h - Notificación de emergencia"
-            await asyncio.wait_for(channel.send(emergency_message), timeout=10.0)
-            print(f"✅ Notificación de emergencia enviada para {user_name}")
+        limit_hours = effective_limit_hours(user_data, MAX_TIME_HOURS)
+        user_name = user_data.get('name', f'Usuario {user_id}')
+        guild = bot.guilds[0] if bot.guilds else None
+        member = guild.get_member(user_id) if guild else None
+        has_unlimited_role = bool(member) and has_unlimited_time_role(member)
+
+        # En el event loop, como el resto de las modificaciones del TimeTracker
+        total_time = stop_user_at_limit(user_id, has_unlimited_role)
+        if total_time is None:
             return
-    except Exception as emergency_error:
-        print(f"❌ Falló notificación de emergencia para {user_name}: {emergency_error}")
+        print(f"⏱️ {user_name} alcanzó su límite de {format_limit_hours(limit_hours)} - tiempo detenido")
+
+        if member and not user_data.get('is_external_user', False):
+            user_reference = member.mention
+        else:
+            user_reference = f"**{user_name}**"
+
+        message = (
+            f"⏱️ {user_reference} alcanzó su límite de {format_limit_hours(limit_hours)}. "
+            f"Tiempo detenido automáticamente. Tiempo acumulado: {time_tracker.format_time_human(total_time)}"
+        )
+        await send_channel_message('milestones', f"límite alcanzado ({user_name})", message, policy=MILESTONE_RETRY_POLICY)
+
+    except Exception as e:
+        print(f"❌ Error aplicando límite de tiempo para {user_id_str}: {e}")
 
-    print(f"❌ CRÍTICO: No se pudo enviar notificación para {user_name} después de {max_retries} intentos + emergencia")
+# Un temporizador por usuario activo en el instante exacto de su límite (rol o tope global)
+limit_scheduler = LimitScheduler(MAX_TIME_HOURS, lambda user_id_str: spawn_background(enforce_time_limit(user_id_str)))
+time_tracker.add_listener(limit_scheduler.observe)
 
 # =================== VERIFICACIÓN PERIÓDICA ===================
 
 async def check_missing_milestones():
     """Verificar y notificar milestones perdidos para todos los usuarios con procesamiento paralelo"""
     try:
-        tracked_users = await asyncio.wait_for(
-            asyncio.to_thread(time_tracker.get_all_tracked_users),
-            timeout=15.0
-        )
+        tracked_users = time_tracker.get_all_tracked_users()
 
         max_users_per_cycle = 100
         max_concurrent = 10
@@ -1873,8 +2939,6 @@ async def check_missing_milestones():
                 print(f"⚠️ Timeout procesando chunk {i//chunk_size + 1}")
                 continue
 
-    except asyncio.TimeoutError:
-        print("⚠️ Timeout obteniendo usuarios tracked")
     except Exception as e:
         print(f"❌ Error verificando milestones perdidos: {e}")
 
@@ -1884,10 +2948,7 @@ async def process_single_user_milestone(user_id_str: str, data: dict):
         user_id = int(user_id_str)
         user_name = data.get('name', f'Usuario {user_id}')
 
-        total_time = await asyncio.wait_for(
-            asyncio.to_thread(time_tracker.get_total_time, user_id),
-            timeout=3.0
-        )
+        total_time = time_tracker.get_total_time(user_id)
 
         guild = None
         member = None
@@ -1928,43 +2989,18 @@ async def process_single_user_milestone(user_id_str: str, data: dict):
                     notified_milestones.append(milestone)
             data['notified_milestones'] = notified_milestones
 
-            try:
-                await asyncio.wait_for(
-                    asyncio.to_thread(time_tracker.save_data),
-                    timeout=2.0
-                )
-            except asyncio.TimeoutError:
-                print(f"⚠️ Timeout guardando milestones para {user_name}")
-
-            if hours_to_notify >= 1:
-                try:
-                    await asyncio.wait_for(
-                        asyncio.to_thread(time_tracker.stop_tracking, user_id),
-                        timeout=2.0
-                    )
-
+            # Las transiciones actualizan los índices del TimeTracker: se aplican en el event loop
+            # y se escriben una sola vez
+            with time_tracker.batch():
+                if hours_to_notify >= 1:
+                    time_tracker.stop_tracking(user_id)
                     if has_unlimited_role:
-                        user_data = time_tracker.get_user_data(user_id)
-                        if user_data:
-                            user_data['milestone_completed'] = True
-                            await asyncio.wait_for(
-                                asyncio.to_thread(time_tracker.save_data),
-                                timeout=2.0
-                            )
-                except asyncio.TimeoutError:
-                    print(f"⚠️ Timeout deteniendo tracking para {user_name}")
+                        time_tracker.mark_milestone_completed(user_id)
+                data['last_milestone_check'] = total_time
+                time_tracker.save_data()
 
             await send_milestone_notification(user_name, member, is_external_user, hours_to_notify, total_time)
 
-            data['last_milestone_check'] = total_time
-            try:
-                await asyncio.wait_for(
-                    asyncio.to_thread(time_tracker.save_data),
-                    timeout=2.0
-                )
-            except asyncio.TimeoutError:
-                print(f"⚠️ Timeout guardando última verificación para {user_name}")
-
     except asyncio.TimeoutError:
         print(f"⚠️ Timeout procesando usuario {user_id_str}")
     except Exception as e:
@@ -1981,7 +3017,9 @@ async def periodic_milestone_check():
             await asyncio.sleep(5)
             milestone_check_count += 1
 
-            if milestone_check_count % 12 == 1:
+            # Tras un apagado limpio no hay notificaciones perdidas: omitir el primer escaneo de recuperación
+            skip_recovery_scan = milestone_check_count == 1 and shutdown_coordinator.clean_restart
+            if milestone_check_count % 12 == 1 and not skip_recovery_scan:
                 try:
                     await asyncio.wait_for(check_missing_milestones(), timeout=30.0)
                 except asyncio.TimeoutError:
@@ -1990,10 +3028,7 @@ async def periodic_milestone_check():
                     print(f"⚠️ Error en verificación de milestones perdidos: {e}")
 
             try:
-                tracked_users = await asyncio.wait_for(
-                    asyncio.to_thread(time_tracker.get_all_tracked_users),
-                    timeout=15.0
-                )
+                tracked_users = time_tracker.get_all_tracked_users()
 
                 active_users = [
                     (user_id_str, data) for user_id_str, data in tracked_users.items()
@@ -2031,8 +3066,6 @@ async def periodic_milestone_check():
 
                 print(f"✅ Verificados {len(active_users)} usuarios activos en chunks paralelos")
 
-            except asyncio.TimeoutError:
-                print("⚠️ Timeout obteniendo usuarios activos")
             except Exception as e:
                 print(f"⚠️ Error obteniendo usuarios activos: {e}")
 
@@ -2116,7 +3149,7 @@ async def auto_start_at_1pm():
 async def send_auto_start_notification(started_users: list, timestamp: datetime):
     """Enviar notificación de inicio automático al canal de movimientos con paginación"""
     try:
-        channel = bot.get_channel(MOVEMENTS_CHANNEL_ID)
+        channel = await channel_registry.resolve('movements')
         if not channel:
             print(f"❌ Canal de movimientos no encontrado: {MOVEMENTS_CHANNEL_ID}")
             return
@@ -2149,8 +3182,7 @@ async def send_auto_start_notification(started_users: list, timestamp: datetime)
 
             embed.set_footer(text="Sistema de inicio automático activado")
 
-            await channel.send(embed=embed)
-            print(f"✅ Notificación de inicio automático enviada ({total_users} usuarios)")
+            await send_channel_message('movements', f"inicio automático ({total_users} usuarios)", embed=embed)
 
         else:
             # Si hay más de 30 usuarios, usar paginación
@@ -2180,8 +3212,8 @@ async def send_auto_start_notification(started_users: list, timestamp: datetime)
 
             summary_embed.set_footer(text=f"Inicio automático - Página 1/{total_pages + 1}")
 
-            await channel.send(embed=summary_embed)
-            print(f"✅ Resumen de inicio automático enviado ({total_users} usuarios)")
+            if not await send_channel_message('movements', f"resumen de inicio automático ({total_users} usuarios)", embed=summary_embed):
+                return
 
             # Enviar páginas con usuarios
             for page in range(total_pages):
@@ -2204,7 +3236,8 @@ async def send_auto_start_notification(started_users: list, timestamp: datetime)
 
                 page_embed.set_footer(text=f"Inicio automático - Página {page + 2}/{total_pages + 1}")
 
-                await channel.send(embed=page_embed)
+                if not await send_channel_message('movements', f"inicio automático página {page + 1}/{total_pages}", embed=page_embed):
+                    return
 
                 # Pequeña pausa entre páginas para evitar rate limits
                 if page < total_pages - 1:  # No pausar después de la última página
@@ -2224,14 +3257,84 @@ async def send_auto_start_notification(started_users: list, timestamp: datetime)
                 color=discord.Color.orange(),
                 timestamp=timestamp
             )
-            await channel.send(embed=fallback_embed)
-            print("✅ Notificación de fallback enviada")
+            await send_channel_message('movements', "inicio automático (fallback)", embed=fallback_embed)
         except Exception as fallback_error:
             print(f"❌ Error crítico enviando notificación de fallback: {fallback_error}")
 
+# =================== RETENCIÓN DE DATOS ===================
+
+# Admins revisados por ciclo y pausa entre ciclos (el recorrido completo se reparte en varios ciclos)
+RETENTION_BATCH_SIZE = 25
+RETENTION_TICK_SECONDS = 60
+
+async def attendance_retention_loop():
+    """Descartar asistencias más antiguas que cleanup_inactive_days, un lote de admins por ciclo"""
+    pending = []
+    removed_in_pass = 0
+
+    while True:
+        try:
+            await asyncio.sleep(RETENTION_TICK_SECONDS)
+
+            # Nueva pasada sobre los admins actuales
+            if not pending:
+                if removed_in_pass:
+                    print(f"🧹 Retención de asistencias: {removed_in_pass} registro(s) antiguos archivados")
+                removed_in_pass = 0
+                pending = time_tracker.get_attendance_admin_ids()
+                if not pending:
+                    continue
+
+            batch = pending[:RETENTION_BATCH_SIZE]
+            del pending[:RETENTION_BATCH_SIZE]
+            removed_in_pass += time_tracker.prune_attendance(batch, CLEANUP_INACTIVE_DAYS)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Error en retención de asistencias: {e}")
+
+# Usuarios archivados como máximo por ciclo (una sola escritura por lote)
+USER_CLEANUP_BATCH_SIZE = 20
+# Nombres listados como máximo en el reporte de limpieza
+USER_CLEANUP_REPORT_NAMES = 20
+
+async def inactive_user_cleanup_loop():
+    """Archivar usuarios sin actividad en los últimos cleanup_inactive_days, un lote por ciclo"""
+    while True:
+        try:
+            await asyncio.sleep(RETENTION_TICK_SECONDS)
+
+            # En el event loop: recorre el índice de actividad y modifica los datos compartidos
+            archived = time_tracker.cleanup_inactive_users(CLEANUP_INACTIVE_DAYS, USER_CLEANUP_BATCH_SIZE)
+            if archived:
+                print(f"🧹 {len(archived)} usuario(s) inactivo(s) archivado(s): {', '.join(entry['name'] for entry in archived)}")
+                spawn_background(send_cleanup_report(archived))
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Error en limpieza de usuarios inactivos: {e}")
+
+async def send_cleanup_report(archived: list):
+    """Informar qué usuarios fueron archivados por inactividad"""
+    lines = [
+        f"• **{entry['name']}** - {time_tracker.format_time_human(entry['total_time'])}"
+        for entry in archived[:USER_CLEANUP_REPORT_NAMES]
+    ]
+    if len(archived) > USER_CLEANUP_REPORT_NAMES:
+        lines.append(f"… y {len(archived) - USER_CLEANUP_REPORT_NAMES} más")
+
+    message = (
+        f"🧹 **LIMPIEZA AUTOMÁTICA**\n"
+        f"{len(archived)} usuario(s) sin actividad en {CLEANUP_INACTIVE_DAYS} días fueron archivados:\n"
+        + "\n".join(lines)
+    )
+    await send_channel_message('cancellations', f"limpieza de {len(archived)} usuario(s) inactivo(s)", message)
+
 async def start_periodic_checks():
     """Iniciar las verificaciones periódicas"""
-    global milestone_check_task, auto_start_task
+    global milestone_check_task, auto_start_task, attendance_retention_task, user_cleanup_task
 
     if milestone_check_task is None:
         milestone_check_task = bot.loop.create_task(periodic_milestone_check())
@@ -2241,17 +3344,181 @@ async def start_periodic_checks():
         auto_start_task = bot.loop.create_task(auto_start_at_1pm())
         print('✅ Task de inicio automático a las 13:00 Chile iniciado')
 
+    if attendance_retention_task is None:
+        attendance_retention_task = bot.loop.create_task(attendance_retention_loop())
+        print(f'✅ Task de retención de asistencias iniciado ({CLEANUP_INACTIVE_DAYS} días)')
+
+    if user_cleanup_task is None:
+        user_cleanup_task = bot.loop.create_task(inactive_user_cleanup_loop())
+        print(f'✅ Task de limpieza de usuarios inactivos iniciado ({CLEANUP_INACTIVE_DAYS} días)')
+
 @bot.event
 async def on_connect():
     """Evento que se ejecuta cuando el bot se conecta"""
     await start_periodic_checks()
 
+# =================== APAGADO ORDENADO ===================
+
+# Marcador escrito al terminar un apagado limpio (permite omitir la recuperación al reiniciar)
+SHUTDOWN_MARKER_FILE = "clean_shutdown.json"
+# Tiempo máximo para drenar notificaciones pendientes y escrituras al apagar
+SHUTDOWN_DRAIN_TIMEOUT = 10.0
+
+# Tareas en segundo plano (notificaciones) que deben drenarse al apagar
+background_tasks = set()
+
+def spawn_background(coro):
+    """Ejecutar una corrutina en segundo plano, registrándola para drenarla al apagar"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+class ShutdownCoordinator:
+    """Coordina el apagado: deja de aceptar interacciones, drena tareas y guarda el estado"""
+
+    def __init__(self, marker_file: str = SHUTDOWN_MARKER_FILE):
+        self.marker_file = marker_file
+        self.is_shutting_down = False
+        self.clean_restart = False
+        self._shutdown_task = None
+
+    def consume_marker(self) -> bool:
+        """Leer y eliminar el marcador de apagado limpio del arranque anterior"""
+        self.clean_restart = False
+        try:
+            if os.path.exists(self.marker_file):
+                with open(self.marker_file, 'r', encoding='utf-8') as f:
+                    marker = json.load(f)
+                os.remove(self.marker_file)
+                self.clean_restart = bool(marker.get('clean_shutdown', False))
+        except Exception as e:
+            print(f"⚠️ Error leyendo marcador de apagado: {e}")
+
+        if self.clean_restart:
+            print("✅ El arranque anterior terminó limpiamente - se omite el escaneo de recuperación")
+        return self.clean_restart
+
+    def write_marker(self) -> None:
+        """Registrar que el apagado terminó limpiamente"""
+        try:
+            with open(self.marker_file, 'w', encoding='utf-8') as f:
+                json.dump({'clean_shutdown': True, 'timestamp': datetime.now().isoformat()}, f, indent=2)
+        except Exception as e:
+            print(f"⚠️ Error escribiendo marcador de apagado: {e}")
+
+    def request_shutdown(self, reason: str) -> None:
+        """Iniciar el apagado (seguro de llamar varias veces, p. ej. desde un manejador de señales)"""
+        if self._shutdown_task is None:
+            self._shutdown_task = asyncio.create_task(self.shutdown(reason))
+        else:
+            print(f"⏳ Apagado ya en curso (señal {reason} ignorada)")
+
+    async def _cancel_task(self, task):
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Error cancelando tarea: {e}")
+
+    async def shutdown(self, reason: str = "solicitud") -> None:
+        """Drenar tareas y escrituras dentro del plazo, escribir el marcador y cerrar el bot"""
+        global milestone_check_task, auto_start_task, attendance_retention_task, user_cleanup_task, voice_flush_handle
+
+        if self.is_shutting_down:
+            return
+        self.is_shutting_down = True
+        print(f"🛑 Apagado ordenado iniciado ({reason})...")
+
+        # 1. Detener las tareas programadas
+        await self._cancel_task(milestone_check_task)
+        await self._cancel_task(auto_start_task)
+        await self._cancel_task(attendance_retention_task)
+        await self._cancel_task(user_cleanup_task)
+        limit_scheduler.stop()
+        milestone_check_task = None
+        auto_start_task = None
+        attendance_retention_task = None
+        user_cleanup_task = None
+
+        # 2. Drenar notificaciones pendientes dentro del plazo
+        clean = True
+        pending = [task for task in background_tasks if not task.done()]
+        if pending:
+            print(f"⏳ Esperando {len(pending)} notificación(es) pendiente(s)...")
+            done, still_pending = await asyncio.wait(pending, timeout=SHUTDOWN_DRAIN_TIMEOUT)
+            if still_pending:
+                clean = False
+                print(f"⚠️ {len(still_pending)} tarea(s) no terminaron a tiempo y se cancelan")
+                for task in still_pending:
+                    task.cancel()
+                await asyncio.gather(*still_pending, return_exceptions=True)
+
+        # 3. Aplicar los eventos de voz aún dentro de la ventana de espera (p. ej. salidas recientes)
+        if voice_flush_handle is not None:
+            voice_flush_handle.cancel()
+            voice_flush_handle = None
+        pending_voice = voice_debouncer.pop_settled(float('inf'))
+        if pending_voice:
+            flush_voice_changes(pending_voice)
+
+        # 4. Escribir los cambios pendientes del TimeTracker
+        try:
+            await asyncio.wait_for(asyncio.to_thread(time_tracker.flush), timeout=SHUTDOWN_DRAIN_TIMEOUT)
+        except Exception as e:
+            clean = False
+            print(f"❌ Error guardando datos al apagar: {e}")
+
+        # flush() registra los errores de escritura sin lanzarlos: si quedó algo pendiente, no fue limpio
+        if time_tracker.has_pending_writes():
+            clean = False
+            print("❌ Quedaron cambios sin guardar al apagar")
+
+        # 5. Marcador de apagado limpio
+        if clean:
+            self.write_marker()
+            print("✅ Estado guardado - apagado limpio")
+        else:
+            print("⚠️ Apagado incompleto - se ejecutará la recuperación al reiniciar")
+
+        await bot.close()
+
+shutdown_coordinator = ShutdownCoordinator()
+
+def install_signal_handlers(loop: asyncio.AbstractEventLoop) -> None:
+    """Conectar SIGTERM y SIGINT con el coordinador de apagado"""
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, shutdown_coordinator.request_shutdown, sig.name)
+        except (NotImplementedError, RuntimeError):
+            # Windows: no hay add_signal_handler, se usa signal.signal
+            signal.signal(sig, lambda signum, frame: loop.call_soon_threadsafe(
+                shutdown_coordinator.request_shutdown, signal.Signals(signum).name
+            ))
+
+def run_bot(token: str) -> None:
+    """Ejecutar el bot con apagado ordenado (reemplaza a bot.run)"""
+    shutdown_coordinator.consume_marker()
+    discord.utils.setup_logging()
+
+    async def runner():
+        install_signal_handlers(asyncio.get_running_loop())
+        async with bot:
+            await bot.start(token)
+
+    asyncio.run(runner())
+
 # =================== MANEJO DE ERRORES ===================
 
 @bot.tree.error
 async def on_app_command_error(interaction: discord.Interaction, error: discord.app_commands.AppCommandError):
     try:
         command_name = interaction.command.name if interaction.command else 'desconocido'
+
         print(f"Error en comando /{command_name}: {type(error).__name__}")
 
         if isinstance(error, discord.app_commands.CommandInvokeError):
@@ -2334,7 +3601,7 @@ if __name__ == "__main__":
 
     print("🔗 Conectando a Discord...")
     try:
-        bot.run(token)
+        run_bot(token)
     except discord.LoginFailure:
         print("❌ Error: Token de Discord inválido")
         print("   Verifica que el token sea correcto en config.json")
@@ -0,0 +1,113 @@
+"""
+Motor de créditos basado en tablas: las reglas (horas mínimas → créditos) se cargan
+desde config.json y se evalúan para todos los usuarios de un reporte a la vez.
+Usa NumPy si está instalado; si no, una búsqueda binaria por usuario.
+"""
+
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+DEFAULT_TIER = "normal"
+
+# Reglas por defecto: (horas mínimas, créditos) por tipo de rol
+DEFAULT_CREDIT_RULES = {
+    "gold": [(1.0, 5), (2.0, 10)],
+    "normal": [(1.0, 3)],
+}
+
+
+class CreditEvaluation:
+    """Resultado de evaluar un lote: créditos por usuario y totales por nivel"""
+
+    def __init__(self, credits: List[int], tier_totals: Dict[str, int]):
+        self.credits = credits
+        self.tier_totals = tier_totals
+
+    @property
+    def total(self) -> int:
+        return sum(self.tier_totals.values())
+
+
+class CreditRules:
+    """Tabla de créditos por nivel: el umbral más alto alcanzado determina los créditos"""
+
+    def __init__(self, rules: Optional[Dict[str, Iterable[Sequence[float]]]] = None, default_tier: str = DEFAULT_TIER):
+        self.default_tier = default_tier
+        self.thresholds: Dict[str, List[float]] = {}
+        self.values: Dict[str, List[int]] = {}
+
+        for tier, tier_rules in (rules or DEFAULT_CREDIT_RULES).items():
+            ordered = sorted((float(hours), int(credits)) for hours, credits in tier_rules)
+            self.thresholds[tier] = [hours * 3600 for hours, _ in ordered]
+            self.values[tier] = [credits for _, credits in ordered]
+
+        if default_tier not in self.thresholds:
+            self.thresholds[default_tier] = []
+            self.values[default_tier] = []
+
+        # Códigos numéricos de cada nivel para la evaluación vectorizada
+        self.tiers: Tuple[str, ...] = tuple(self.thresholds)
+        self.tier_codes = {tier: code for code, tier in enumerate(self.tiers)}
+
+    @classmethod
+    def from_config(cls, config_rules: Optional[Dict[str, Any]]) -> "CreditRules":
+        """
+        Crear la tabla desde config.json. Formato:
+        {"gold": [{"hours": 1, "credits": 5}, {"hours": 2, "credits": 10}], ...}
+        """
+        if not config_rules:
+            return cls()
+        rules = {
+            tier: [(rule['hours'], rule['credits']) for rule in tier_rules]
+            for tier, tier_rules in config_rules.items()
+        }
+        return cls(rules)
+
+    def tier_for(self, role_type: str) -> str:
+        """Nivel de créditos de un tipo de rol (los tipos sin reglas usan el nivel por defecto)"""
+        return role_type if role_type in self.thresholds else self.default_tier
+
+    def credits_for(self, total_seconds: float, role_type: str = DEFAULT_TIER) -> int:
+        """Créditos de un único usuario"""
+        if not isinstance(total_seconds, (int, float)) or total_seconds < 0:
+            return 0
+        tier = self.tier_for(role_type)
+        index = bisect_right(self.thresholds[tier], total_seconds)
+        return self.values[tier][index - 1] if index else 0
+
+    def evaluate(self, total_seconds: Sequence[float], role_types: Sequence[str]) -> CreditEvaluation:
+        """Créditos de todos los usuarios de un lote y totales por nivel"""
+        codes = [self.tier_codes[self.tier_for(role_type)] for role_type in role_types]
+        if np is not None and codes:
+            credits = self._evaluate_numpy(total_seconds, codes)
+        else:
+            credits = [self.credits_for(seconds, self.tiers[code]) for seconds, code in zip(total_seconds, codes)]
+
+        tier_totals = {tier: 0 for tier in self.tiers}
+        for code, user_credits in zip(codes, credits):
+            tier_totals[self.tiers[code]] += user_credits
+        return CreditEvaluation(credits, tier_totals)
+
+    def _evaluate_numpy(self, total_seconds: Sequence[float], codes: List[int]) -> List[int]:
+        seconds = np.asarray(total_seconds, dtype=float)
+        code_array = np.asarray(codes)
+        result = np.zeros(len(seconds), dtype=np.int64)
+
+        for code, tier in enumerate(self.tiers):
+            thresholds = self.thresholds[tier]
+            if not thresholds:
+                continue
+            mask = (code_array == code) & (seconds >= 0)
+            if not mask.any():
+                continue
+            # Índice del umbral alcanzado; 0 significa "ningún umbral"
+            indexes = np.searchsorted(np.asarray(thresholds), seconds[mask], side='right')
+            values = np.concatenate(([0], np.asarray(self.values[tier], dtype=np.int64)))
+            result[mask] = values[indexes]
+
+        return result.tolist()
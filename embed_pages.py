@@ -0,0 +1,66 @@
+"""
+Empaquetado de filas en páginas de embed según los límites de tamaño de Discord:
+cada página lleva tantas filas como quepan en la descripción y en el total del embed.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+# Límites de Discord para embeds
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBED_TOTAL_LIMIT = 6000
+
+# Espacio reservado para título, campos y pie de página cuando no se conocen de antemano
+DEFAULT_EMBED_OVERHEAD = 512
+
+PageBounds = List[Tuple[int, int]]
+
+
+def pack_pages(row_lengths: Sequence[int], overhead: int = DEFAULT_EMBED_OVERHEAD, row_margin: int = 0,
+               max_rows: Optional[int] = None, description_limit: int = EMBED_DESCRIPTION_LIMIT,
+               total_limit: int = EMBED_TOTAL_LIMIT) -> PageBounds:
+    """
+    Calcular los límites [inicio, fin) de cada página.
+
+    `overhead` es el tamaño del resto del embed (título, campos, pie) y `row_margin`
+    un margen por fila para contenido que puede crecer al volver a renderizarse
+    (por ejemplo, tiempos en vivo).
+    """
+    budget = min(description_limit, total_limit - overhead)
+    pages: PageBounds = []
+    start = 0
+    size = 0
+
+    for index, length in enumerate(row_lengths):
+        length += row_margin
+        if index == start:
+            size = length
+            continue
+
+        # +1 por el salto de línea que separa las filas
+        if size + 1 + length > budget or (max_rows is not None and index - start >= max_rows):
+            pages.append((start, index))
+            start = index
+            size = length
+        else:
+            size += 1 + length
+
+    if start < len(row_lengths) or not pages:
+        pages.append((start, len(row_lengths)))
+    return pages
+
+
+def fit_description(rows: Sequence[str], limit: int = EMBED_DESCRIPTION_LIMIT) -> str:
+    """Unir filas en una descripción, recortando las que excedan el límite (último recurso)"""
+    description = "\n".join(rows)
+    if len(description) <= limit:
+        return description
+
+    kept = []
+    size = 0
+    for row in rows:
+        added = len(row) + (1 if kept else 0)
+        if size + added > limit - 2:
+            break
+        kept.append(row)
+        size += added
+    return "\n".join(kept) + "\n…"
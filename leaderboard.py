@@ -0,0 +1,85 @@
+"""
+Ranking de tiempos acumulados mantenido de forma incremental.
+
+Los usuarios inactivos se ordenan por su tiempo total. Los activos se ordenan por
+un desplazamiento (tiempo total - inicio de la sesión): su tiempo en vivo es
+desplazamiento + ahora, así que el orden entre ellos no cambia con el reloj y no
+hace falta reordenarlos. Las consultas combinan ambos índices.
+"""
+
+import heapq
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from order_index import SortedBucketList
+
+
+class Leaderboard:
+    """Índice de ranking por tiempo acumulado con soporte para usuarios activos"""
+
+    def __init__(self):
+        # Entradas (-clave, user_id): el orden ascendente es el ranking descendente
+        self._inactive = SortedBucketList()
+        self._active = SortedBucketList()
+        self._entries: Dict[str, Tuple[bool, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._inactive.clear()
+        self._active.clear()
+        self._entries.clear()
+
+    def update(self, user_id: str, total_time: float, active_since: Optional[float] = None) -> None:
+        """Registrar el tiempo de un usuario (`active_since`: timestamp de inicio si está activo)"""
+        self.remove(user_id)
+        if active_since is None:
+            entry = (False, float(total_time))
+            self._inactive.add((-entry[1], user_id))
+        else:
+            entry = (True, float(total_time) - active_since)
+            self._active.add((-entry[1], user_id))
+        self._entries[user_id] = entry
+
+    def remove(self, user_id: str) -> None:
+        """Quitar a un usuario del ranking"""
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        is_active, key = entry
+        (self._active if is_active else self._inactive).discard((-key, user_id))
+
+    def live_time(self, user_id: str, now: float) -> Optional[float]:
+        """Tiempo en vivo de un usuario según el índice"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        is_active, key = entry
+        return key + now if is_active else key
+
+    def iter_ranked(self, now: float) -> Iterator[Tuple[str, float]]:
+        """Recorrer el ranking de mayor a menor tiempo: (user_id, tiempo en vivo)"""
+        inactive = ((user_id, -neg_key) for neg_key, user_id in self._inactive)
+        active = ((user_id, -neg_key + now) for neg_key, user_id in self._active)
+        return heapq.merge(inactive, active, key=lambda item: item[1], reverse=True)
+
+    def top(self, k: int, now: float) -> List[Tuple[str, float]]:
+        """Los `k` usuarios con más tiempo: [(user_id, tiempo en vivo)]"""
+        return list(islice(self.iter_ranked(now), max(0, k)))
+
+    def rank(self, user_id: str, now: float) -> Optional[int]:
+        """Posición (1 = primero) de un usuario, o None si no está en el ranking"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        is_active, key = entry
+
+        # Umbral equivalente en cada índice (sin redondeos sobre la propia clave)
+        inactive_threshold = key + now if is_active else key
+        active_threshold = key if is_active else key - now
+
+        # Usuarios con tiempo estrictamente mayor en cada índice
+        ahead = self._inactive.bisect_left((-inactive_threshold,))
+        ahead += self._active.bisect_left((-active_threshold,))
+        return ahead + 1
@@ -0,0 +1,94 @@
+"""
+Detención automática al alcanzar el límite de tiempo.
+
+El límite efectivo de cada usuario es el menor entre el límite de su rol
+(limit_hours) y el tope global (time_tracking.max_time_hours). Para cada usuario
+activo se calcula el instante exacto en que lo alcanza y se programa un único
+temporizador en el event loop; cualquier transición del usuario lo reprograma.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from status_engine import DEFAULT_LIMIT_HOURS
+
+
+def effective_limit_hours(user_data: Dict[str, Any], max_hours: float) -> float:
+    """Límite del rol del usuario acotado por el tope global"""
+    return min(user_data.get('limit_hours', DEFAULT_LIMIT_HOURS), max_hours)
+
+
+def limit_deadline(user_data: Optional[Dict[str, Any]], max_hours: float) -> Optional[float]:
+    """Timestamp en que un usuario activo alcanza su límite (None si no está corriendo)"""
+    if not user_data or not user_data.get('is_active', False) or not user_data.get('last_start'):
+        return None
+    try:
+        session_start = datetime.fromisoformat(user_data['last_start']).timestamp()
+    except (TypeError, ValueError):
+        return None
+    remaining = effective_limit_hours(user_data, max_hours) * 3600 - user_data.get('total_time', 0)
+    return session_start + remaining
+
+
+class LimitScheduler:
+    """Temporizadores de detención por usuario, programados para el instante exacto del límite"""
+
+    def __init__(self, max_hours: float, on_limit: Callable[[str], None]):
+        self.max_hours = max_hours
+        self._on_limit = on_limit
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._handles: Dict[str, Tuple[float, asyncio.TimerHandle]] = {}
+        # Cambios recibidos antes de tener event loop (se aplican al iniciar)
+        self._pending: Dict[str, Optional[float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+    def start(self, loop: asyncio.AbstractEventLoop, tracked_users: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """Vincular el event loop y programar a los usuarios activos actuales"""
+        self._loop = loop
+        for user_id_str, user_data in tracked_users:
+            self._pending[user_id_str] = limit_deadline(user_data, self.max_hours)
+        pending, self._pending = self._pending, {}
+        for user_id_str, deadline in pending.items():
+            self._apply(user_id_str, deadline)
+
+    def stop(self) -> None:
+        """Cancelar todos los temporizadores"""
+        for _, handle in self._handles.values():
+            handle.cancel()
+        self._handles.clear()
+        self._loop = None
+
+    def observe(self, user_id_str: str, user_data: Optional[Dict[str, Any]]) -> None:
+        """Reprogramar a un usuario tras una transición (seguro de llamar desde otros hilos)"""
+        deadline = limit_deadline(user_data, self.max_hours)
+        if self._loop is None:
+            self._pending[user_id_str] = deadline
+            return
+        self._loop.call_soon_threadsafe(self._apply, user_id_str, deadline)
+
+    def deadline_for(self, user_id_str: str) -> Optional[float]:
+        """Instante programado para un usuario"""
+        entry = self._handles.get(user_id_str)
+        return entry[0] if entry else None
+
+    def _apply(self, user_id_str: str, deadline: Optional[float]) -> None:
+        current = self._handles.get(user_id_str)
+        if current is not None:
+            if current[0] == deadline:
+                return
+            current[1].cancel()
+            del self._handles[user_id_str]
+        if deadline is None or self._loop is None:
+            return
+
+        delay = max(0.0, deadline - time.time())
+        handle = self._loop.call_later(delay, self._fire, user_id_str)
+        self._handles[user_id_str] = (deadline, handle)
+
+    def _fire(self, user_id_str: str) -> None:
+        self._handles.pop(user_id_str, None)
+        self._on_limit(user_id_str)
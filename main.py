@@ -26,7 +26,7 @@ def main():
             return 1
         
         print("🔗 Conectando a Discord...")
-        bot.bot.run(token)
+        bot.run_bot(token)
         
     except KeyboardInterrupt:
         print("🛑 Bot detenido por el usuario")
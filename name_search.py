@@ -0,0 +1,67 @@
+"""
+Índice de trigramas sobre nombres normalizados para búsquedas por subcadena
+sin recorrer a todos los usuarios.
+"""
+
+from typing import Dict, List, Optional, Set
+
+TRIGRAM_SIZE = 3
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigramas de un texto (vacío si es más corto que un trigrama)"""
+    return {text[i:i + TRIGRAM_SIZE] for i in range(len(text) - TRIGRAM_SIZE + 1)}
+
+
+class TrigramIndex:
+    """Trigrama → IDs de usuario cuyo nombre lo contiene"""
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._names: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._names.clear()
+
+    def add(self, user_id: str, name: str) -> None:
+        """Indexar (o reindexar) el nombre normalizado de un usuario"""
+        self.remove(user_id)
+        self._names[user_id] = name
+        for gram in trigrams(name):
+            self._postings.setdefault(gram, set()).add(user_id)
+
+    def remove(self, user_id: str) -> None:
+        """Quitar a un usuario del índice"""
+        name = self._names.pop(user_id, None)
+        if name is None:
+            return
+        for gram in trigrams(name):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(user_id)
+                if not postings:
+                    del self._postings[gram]
+
+    def search(self, term: str) -> Optional[List[str]]:
+        """
+        IDs cuyo nombre contiene `term` (sin orden). Devuelve None si el término es
+        demasiado corto para usar trigramas.
+        """
+        grams = trigrams(term)
+        if not grams:
+            return None
+
+        # Intersecar empezando por la lista más corta
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates &= posting
+
+        # Los trigramas pueden coincidir sin formar la subcadena completa: verificar
+        return [user_id for user_id in candidates if term in self._names[user_id]]
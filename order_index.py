@@ -0,0 +1,129 @@
+"""
+Lista ordenada por cubetas: inserción, eliminación y búsqueda de posición en
+tiempo sublineal sin reordenar toda la colección. Base de los índices ordenados
+del TimeTracker (ranking de tiempos, índice de nombres).
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from typing import Any, Iterator, List
+
+
+class SortedBucketList:
+    """Colección ordenada dividida en cubetas de tamaño acotado"""
+
+    def __init__(self, bucket_size: int = 256):
+        self.bucket_size = bucket_size
+        self._buckets: List[List[Any]] = []
+        self._maxes: List[Any] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Any]:
+        for bucket in self._buckets:
+            yield from bucket
+
+    def __contains__(self, value: Any) -> bool:
+        i = bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            return False
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, value)
+        return j < len(bucket) and bucket[j] == value
+
+    def clear(self) -> None:
+        self._buckets = []
+        self._maxes = []
+        self._len = 0
+
+    def add(self, value: Any) -> None:
+        """Insertar un valor manteniendo el orden"""
+        if not self._buckets:
+            self._buckets.append([value])
+            self._maxes.append(value)
+            self._len = 1
+            return
+
+        i = bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            i -= 1
+        bucket = self._buckets[i]
+        insort(bucket, value)
+        self._maxes[i] = bucket[-1]
+        self._len += 1
+
+        # Dividir cubetas demasiado grandes para mantener acotado el costo de inserción
+        if len(bucket) > 2 * self.bucket_size:
+            half = len(bucket) // 2
+            self._buckets[i:i + 1] = [bucket[:half], bucket[half:]]
+            self._maxes[i:i + 1] = [bucket[half - 1], bucket[-1]]
+
+    def remove(self, value: Any) -> None:
+        """Eliminar un valor existente (KeyError si no está)"""
+        i = bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            raise KeyError(value)
+        bucket = self._buckets[i]
+        j = bisect_left(bucket, value)
+        if j == len(bucket) or bucket[j] != value:
+            raise KeyError(value)
+
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+
+    def discard(self, value: Any) -> None:
+        """Eliminar un valor si existe"""
+        try:
+            self.remove(value)
+        except KeyError:
+            pass
+
+    def bisect_left(self, value: Any) -> int:
+        """Cantidad de elementos estrictamente menores que `value`"""
+        i = bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            return self._len
+        return sum(len(bucket) for bucket in self._buckets[:i]) + bisect_left(self._buckets[i], value)
+
+    def bisect_right(self, value: Any) -> int:
+        """Cantidad de elementos menores o iguales que `value`"""
+        i = bisect_right(self._maxes, value)
+        if i == len(self._maxes):
+            return self._len
+        return sum(len(bucket) for bucket in self._buckets[:i]) + bisect_right(self._buckets[i], value)
+
+    def islice(self, start: int = 0, stop: int = None) -> Iterator[Any]:
+        """Iterar los elementos de las posiciones [start, stop) sin recorrer las cubetas anteriores"""
+        if stop is None or stop > self._len:
+            stop = self._len
+        if start >= stop:
+            return
+
+        remaining = stop - start
+        for bucket in self._buckets:
+            if start >= len(bucket):
+                start -= len(bucket)
+                continue
+            chunk = bucket[start:start + remaining]
+            yield from chunk
+            remaining -= len(chunk)
+            start = 0
+            if remaining <= 0:
+                return
+
+    def irange_from(self, value: Any) -> Iterator[Any]:
+        """Iterar en orden los elementos mayores o iguales que `value`"""
+        i = bisect_left(self._maxes, value)
+        if i == len(self._maxes):
+            return
+        first = self._buckets[i]
+        yield from islice(first, bisect_left(first, value), None)
+        for bucket in self._buckets[i + 1:]:
+            yield from bucket
@@ -0,0 +1,61 @@
+"""
+Exportación de pagos a CSV o JSONL: las filas se escriben a medida que se generan
+y el archivo se comprime con gzip si supera el umbral de tamaño.
+"""
+
+import csv
+import gzip
+import io
+import json
+from typing import Any, Dict, Iterable, Tuple
+
+EXPORT_FIELDS = ("user_id", "name", "tier", "total_seconds", "total_time", "credits", "status")
+EXPORT_FORMATS = ("csv", "jsonl")
+
+# Por encima de este tamaño el archivo se adjunta comprimido
+COMPRESS_THRESHOLD_BYTES = 1024 * 1024
+
+
+def write_export(rows: Iterable[Dict[str, Any]], export_format: str = "csv",
+                 compress_threshold: int = COMPRESS_THRESHOLD_BYTES) -> Tuple[io.BytesIO, str, int]:
+    """
+    Escribir las filas en un buffer. Devuelve (buffer, extensión, cantidad de filas);
+    la extensión incluye ".gz" si el contenido se comprimió.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato de exportación no soportado: {export_format}")
+
+    raw = io.BytesIO()
+    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    row_count = 0
+
+    if export_format == "csv":
+        writer = csv.DictWriter(text, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            row_count += 1
+    else:
+        for row in rows:
+            text.write(json.dumps({field: row.get(field) for field in EXPORT_FIELDS}, ensure_ascii=False))
+            text.write("\n")
+            row_count += 1
+
+    text.flush()
+    text.detach()
+    extension = export_format
+
+    if raw.tell() > compress_threshold:
+        compressed = io.BytesIO()
+        raw.seek(0)
+        with gzip.GzipFile(fileobj=compressed, mode="wb") as gz:
+            while True:
+                chunk = raw.read(64 * 1024)
+                if not chunk:
+                    break
+                gz.write(chunk)
+        raw = compressed
+        extension += ".gz"
+
+    raw.seek(0)
+    return raw, extension, row_count
@@ -0,0 +1,109 @@
+"""
+Utilidades de caché para reportes: coalescencia de cálculos concurrentes
+(single-flight) con reutilización del resultado por versión de datos, y
+caché LRU de páginas renderizadas.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Comparte un único cálculo en curso entre todas las solicitudes idénticas y
+    reutiliza su resultado durante `ttl` segundos mientras la versión de datos no cambie.
+    """
+
+    def __init__(self, ttl: float = 15.0, max_entries: int = 64):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._inflight: Dict[Tuple[Hashable, Any], asyncio.Task] = {}
+        self._results: Dict[Hashable, Tuple[Any, float, Any]] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def _get_cached(self, key: Hashable, version: Any):
+        cached = self._results.get(key)
+        if cached is None:
+            return False, None
+        cached_version, expires_at, value = cached
+        if cached_version != version or expires_at <= time.monotonic():
+            del self._results[key]
+            return False, None
+        return True, value
+
+    def _store(self, key: Hashable, version: Any, value: Any) -> None:
+        if key not in self._results and len(self._results) >= self.max_entries:
+            # Descartar la entrada que vence primero
+            oldest_key = min(self._results, key=lambda k: self._results[k][1])
+            del self._results[oldest_key]
+        self._results[key] = (version, time.monotonic() + self.ttl, value)
+
+    async def _compute(self, key: Hashable, version: Any, compute: Callable[[], Awaitable[Any]]) -> Any:
+        value = await compute()
+        self._store(key, version, value)
+        return value
+
+    async def run(self, key: Hashable, version: Any, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Obtener el resultado de `compute` para (key, version), calculándolo a lo sumo una vez"""
+        found, value = self._get_cached(key, version)
+        if found:
+            self.hits += 1
+            return value
+
+        flight_key = (key, version)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._compute(key, version, compute))
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(flight_key, None))
+        else:
+            self.coalesced += 1
+
+        # shield: si un solicitante se cancela, el cálculo sigue para los demás
+        return await asyncio.shield(task)
+
+    def invalidate(self, key: Hashable = None) -> None:
+        """Descartar resultados cacheados (todos si no se indica clave)"""
+        if key is None:
+            self._results.clear()
+        else:
+            self._results.pop(key, None)
+
+
+class LRUCache:
+    """Caché acotada con desalojo del elemento usado menos recientemente"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Obtener un valor y marcarlo como usado recientemente"""
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Guardar un valor, desalojando el menos usado si se supera el límite"""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
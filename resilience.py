@@ -0,0 +1,226 @@
+"""
+Políticas de resiliencia compartidas para las llamadas a la API de Discord:
+reintentos con backoff exponencial y jitter, circuit breakers por endpoint
+y propagación de deadlines entre llamadas anidadas.
+"""
+
+import asyncio
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class ResilienceError(Exception):
+    """Error base de las políticas de resiliencia"""
+
+
+class CircuitOpenError(ResilienceError):
+    """El circuito del endpoint está abierto: la llamada se rechaza sin intentarla"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"Circuito abierto para '{endpoint}' (reintentar en {retry_after:.1f}s)")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class BulkheadFullError(ResilienceError):
+    """Demasiadas llamadas en curso para el endpoint: se rechaza en lugar de encolar"""
+
+    def __init__(self, endpoint: str, limit: int):
+        super().__init__(f"Demasiadas llamadas en curso para '{endpoint}' (límite {limit})")
+        self.endpoint = endpoint
+        self.limit = limit
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """El deadline de la operación se agotó antes de completar la llamada"""
+
+
+class RetryPolicy:
+    """Configuración de reintentos con backoff exponencial y jitter completo"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                 attempt_timeout: float = 10.0, timeout_step: float = 0.0, max_attempt_timeout: float = 30.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt_timeout = attempt_timeout
+        self.timeout_step = timeout_step
+        self.max_attempt_timeout = max_attempt_timeout
+
+    def backoff(self, attempt: int) -> float:
+        """Espera antes del siguiente intento (jitter completo sobre el backoff exponencial)"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def timeout_for(self, attempt: int) -> float:
+        """Timeout de un intento concreto (puede crecer con cada reintento)"""
+        return min(self.attempt_timeout + attempt * self.timeout_step, self.max_attempt_timeout)
+
+
+class CircuitBreaker:
+    """Circuit breaker por endpoint: falla rápido mientras Discord está degradado"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0, max_in_flight: int = 50):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_in_flight = max_in_flight
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.in_flight = 0
+        self._probe_in_flight = False
+
+    def retry_after(self) -> float:
+        """Segundos que faltan para permitir una llamada de prueba"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def allow(self) -> bool:
+        """Indicar si se permite una nueva llamada en el estado actual"""
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN:
+            if self.retry_after() > 0:
+                return False
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+
+        # HALF_OPEN: solo una llamada de prueba a la vez
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def release_probe(self) -> None:
+        """Liberar la llamada de prueba sin cambiar el estado (errores no transitorios)"""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        """Registrar una llamada exitosa (cierra el circuito)"""
+        if self.state != self.CLOSED:
+            print(f"✅ Circuito '{self.name}' cerrado de nuevo")
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Registrar una falla transitoria (puede abrir el circuito)"""
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                print(f"🚨 Circuito '{self.name}' abierto tras {self.consecutive_failures} fallas consecutivas")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("resilience_deadline", default=None)
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    """Obtener (o crear) el circuit breaker de un endpoint"""
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        breaker = CircuitBreaker(endpoint)
+        _breakers[endpoint] = breaker
+    return breaker
+
+
+def get_breaker_states() -> Dict[str, str]:
+    """Estado actual de todos los circuit breakers (para diagnóstico)"""
+    return {name: breaker.state for name, breaker in _breakers.items()}
+
+
+def remaining_time() -> Optional[float]:
+    """Segundos restantes del deadline actual, o None si no hay deadline"""
+    deadline_at = _deadline.get()
+    if deadline_at is None:
+        return None
+    return deadline_at - time.monotonic()
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Establecer un deadline para las llamadas internas (nunca extiende uno ya existente)"""
+    deadline_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline_at = min(deadline_at, current)
+    token = _deadline.set(deadline_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _always_retry(error: BaseException) -> bool:
+    return True
+
+
+async def call(endpoint: str, operation: Callable[[], Awaitable[Any]], policy: Optional[RetryPolicy] = None,
+               is_retryable: Optional[Callable[[BaseException], bool]] = None) -> Any:
+    """
+    Ejecutar una llamada con reintentos, circuit breaker y deadline.
+
+    `operation` debe crear una corrutina nueva en cada intento. Los errores no
+    reintentables se propagan de inmediato y no cuentan como fallas del circuito.
+    """
+    policy = policy or RetryPolicy()
+    is_retryable = is_retryable or _always_retry
+    breaker = get_breaker(endpoint)
+
+    if breaker.in_flight >= breaker.max_in_flight:
+        raise BulkheadFullError(endpoint, breaker.max_in_flight)
+
+    breaker.in_flight += 1
+    try:
+        for attempt in range(policy.max_attempts):
+            if not breaker.allow():
+                raise CircuitOpenError(endpoint, breaker.retry_after())
+
+            timeout = policy.timeout_for(attempt)
+            remaining = remaining_time()
+            if remaining is not None:
+                if remaining <= 0:
+                    breaker.release_probe()
+                    raise DeadlineExceeded(f"Deadline agotado antes de llamar a '{endpoint}'")
+                timeout = min(timeout, remaining)
+
+            try:
+                result = await asyncio.wait_for(operation(), timeout=timeout)
+            except asyncio.CancelledError:
+                breaker.release_probe()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    breaker.release_probe()
+                    raise
+
+                breaker.record_failure()
+                if attempt >= policy.max_attempts - 1 or breaker.state == CircuitBreaker.OPEN:
+                    raise
+
+                delay = policy.backoff(attempt)
+                remaining = remaining_time()
+                if remaining is not None and remaining <= delay:
+                    raise DeadlineExceeded(f"Deadline agotado reintentando '{endpoint}'") from e
+
+                print(f"🔄 Reintentando '{endpoint}' en {delay:.1f}s (intento {attempt + 1}/{policy.max_attempts}): {type(e).__name__}")
+                await asyncio.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+    finally:
+        breaker.in_flight -= 1
@@ -0,0 +1,103 @@
+"""
+Clasificación de miembros por ID de rol con caché por miembro.
+
+El mapa ID de rol → tipo se precalcula desde config.json (role_tiers) y desde los
+roles del servidor cuyo nombre contiene el tipo (compatibilidad con la detección
+por nombre). La caché por miembro se invalida con los eventos de miembros y roles.
+"""
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Orden de prioridad de los tipos de rol (el primero que coincida gana)
+ROLE_TYPE_PRIORITY = ("gold",)
+DEFAULT_ROLE_TYPE = "normal"
+
+# (tipo de rol, tiene rol de tiempo ilimitado, nombre del rol más alto)
+MemberRoleInfo = Tuple[str, bool, str]
+
+
+class RoleClassifier:
+    """Caché miembro → (tipo de rol, rol ilimitado, rol más alto) basada en IDs de rol"""
+
+    def __init__(self, tier_role_ids: Optional[Dict[str, Iterable[int]]] = None, unlimited_role_id: Optional[int] = None):
+        self.unlimited_role_id = unlimited_role_id
+        self.configured_role_types: Dict[int, str] = {}
+        self.role_type_by_id: Dict[int, str] = {}
+        self.type_priority: Dict[str, int] = {}
+        self._members: Dict[int, MemberRoleInfo] = {}
+        self.configure(tier_role_ids or {}, unlimited_role_id)
+
+    def configure(self, tier_role_ids: Dict[str, Iterable[int]], unlimited_role_id: Optional[int]) -> None:
+        """Cargar el mapa ID de rol → tipo desde la configuración"""
+        self.unlimited_role_id = unlimited_role_id
+        self.configured_role_types = {}
+        for role_type, role_ids in tier_role_ids.items():
+            for role_id in role_ids or []:
+                self.configured_role_types[int(role_id)] = role_type
+
+        # Prioridad: tipos conocidos primero, luego los tipos extra de la configuración
+        ordered_types = list(ROLE_TYPE_PRIORITY)
+        ordered_types += [t for t in tier_role_ids if t not in ordered_types]
+        self.type_priority = {role_type: index for index, role_type in enumerate(ordered_types)}
+        self.role_type_by_id = dict(self.configured_role_types)
+        self._members.clear()
+
+    def learn_guild_roles(self, roles: Iterable[Any]) -> None:
+        """Añadir al mapa los roles del servidor cuyo nombre contiene un tipo conocido"""
+        self.role_type_by_id = dict(self.configured_role_types)
+        for role in roles:
+            if role.id in self.role_type_by_id:
+                continue
+            role_name_lower = role.name.lower()
+            for role_type in ROLE_TYPE_PRIORITY:
+                if role_type in role_name_lower:
+                    self.role_type_by_id[role.id] = role_type
+                    break
+        self._members.clear()
+
+    def role_type_for_id(self, role_id: int) -> Optional[str]:
+        """Tipo asociado a un ID de rol (None si el rol no define tipo)"""
+        return self.role_type_by_id.get(role_id)
+
+    def role_ids_for_type(self, role_type: str):
+        """IDs de rol que clasifican a un miembro en el tipo indicado"""
+        return [role_id for role_id, mapped_type in self.role_type_by_id.items() if mapped_type == role_type]
+
+    def classify(self, member: Any) -> MemberRoleInfo:
+        """Clasificar un miembro (desde la caché si ya fue clasificado)"""
+        cached = self._members.get(member.id)
+        if cached is not None:
+            return cached
+
+        role_type = DEFAULT_ROLE_TYPE
+        best_priority = len(self.type_priority)
+        has_unlimited = False
+        top_role_name = ""
+        top_position = None
+
+        for role in member.roles:
+            if role.id == self.unlimited_role_id:
+                has_unlimited = True
+
+            mapped_type = self.role_type_by_id.get(role.id)
+            if mapped_type is not None:
+                priority = self.type_priority.get(mapped_type, len(self.type_priority))
+                if priority < best_priority:
+                    best_priority = priority
+                    role_type = mapped_type
+
+            if role.name != "@everyone" and (top_position is None or role.position > top_position):
+                top_position = role.position
+                top_role_name = role.name
+
+        info = (role_type, has_unlimited, top_role_name)
+        self._members[member.id] = info
+        return info
+
+    def invalidate_member(self, member_id: int) -> None:
+        """Olvidar la clasificación de un miembro (cambió de roles o salió del servidor)"""
+        self._members.pop(member_id, None)
+
+    def invalidate_all(self) -> None:
+        """Olvidar todas las clasificaciones (cambió algún rol del servidor)"""
+        self._members.clear()
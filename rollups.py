@@ -0,0 +1,84 @@
+"""
+Totales diarios de tiempo por usuario (días en hora de Chile). Cada registro
+guarda {"AAAA-MM-DD": segundos}; las consultas por semana o mes recorren solo
+los días del rango.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+ROLLUP_TZ = ZoneInfo("America/Santiago")
+
+DailyTotals = Dict[str, float]
+
+
+def to_rollup_tz(moment: datetime) -> datetime:
+    """Convertir un datetime (naive = hora local del servidor) a la zona de los totales"""
+    return moment.astimezone(ROLLUP_TZ)
+
+
+def add_amount(daily: DailyTotals, moment: datetime, seconds: float) -> None:
+    """Sumar (o restar) segundos al día de `moment`"""
+    if not seconds:
+        return
+    day_key = to_rollup_tz(moment).date().isoformat()
+    total = daily.get(day_key, 0) + seconds
+    if total > 0:
+        daily[day_key] = total
+    else:
+        daily.pop(day_key, None)
+
+
+def deduct_amount(daily: DailyTotals, moment: datetime, seconds: float) -> None:
+    """Restar segundos empezando por el día de `moment` y siguiendo hacia atrás (ningún día queda negativo)"""
+    day_key = to_rollup_tz(moment).date().isoformat()
+    for key in sorted((key for key in daily if key <= day_key), reverse=True):
+        if seconds <= 0:
+            break
+        taken = min(daily[key], seconds)
+        if daily[key] > taken:
+            daily[key] -= taken
+        else:
+            del daily[key]
+        seconds -= taken
+
+
+def add_interval(daily: DailyTotals, start: datetime, end: datetime) -> None:
+    """Repartir un intervalo entre los días que abarca (una sesión puede cruzar la medianoche)"""
+    # Cortes en las medianoches locales, duraciones en tiempo UTC (los cambios de horario no alteran la duración)
+    current = to_rollup_tz(start)
+    end_ts = end.timestamp()
+    while current.timestamp() < end_ts:
+        next_midnight = datetime.combine(current.date() + timedelta(days=1), datetime.min.time(), tzinfo=ROLLUP_TZ)
+        chunk_end_ts = min(end_ts, next_midnight.timestamp())
+        add_amount(daily, current, chunk_end_ts - current.timestamp())
+        current = datetime.fromtimestamp(chunk_end_ts, ROLLUP_TZ)
+
+
+def iter_days(start_day: date, end_day: date) -> Iterator[date]:
+    """Días del rango [start_day, end_day]"""
+    day = start_day
+    while day <= end_day:
+        yield day
+        day += timedelta(days=1)
+
+
+def sum_range(daily: DailyTotals, start_day: date, end_day: date) -> float:
+    """Total de segundos en el rango de días (inclusive)"""
+    return sum(daily.get(day.isoformat(), 0) for day in iter_days(start_day, end_day))
+
+
+def week_range(today: Optional[date] = None) -> Tuple[date, date]:
+    """Lunes y domingo de la semana ISO actual (hora de Chile)"""
+    today = today or datetime.now(ROLLUP_TZ).date()
+    monday = today - timedelta(days=today.weekday())
+    return monday, monday + timedelta(days=6)
+
+
+def month_range(today: Optional[date] = None) -> Tuple[date, date]:
+    """Primer y último día del mes actual (hora de Chile)"""
+    today = today or datetime.now(ROLLUP_TZ).date()
+    first = today.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return first, next_month - timedelta(days=1)
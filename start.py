@@ -249,6 +249,9 @@ def main():
         # Importar el bot
         import bot
         print("✅ Bot iniciado correctamente")
+
+        # Ejecutar con apagado ordenado (SIGTERM/SIGINT)
+        bot.run_bot(token)
         
     except ImportError as e:
         print(f"❌ Error de importación: {e}")
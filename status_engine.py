@@ -0,0 +1,81 @@
+"""
+Motor de estado de usuarios: deriva el estado (Activo / Pausado / Terminado /
+Inactivo) y el límite de horas según el rol. El TimeTracker guarda el resultado
+en cada transición para que las vistas solo tengan que leerlo.
+"""
+
+from typing import Any, Dict
+
+STATUS_ACTIVE = "active"
+STATUS_PAUSED = "paused"
+STATUS_FINISHED = "finished"
+STATUS_INACTIVE = "inactive"
+
+STATUS_LABELS = {
+    STATUS_ACTIVE: "🟢 Activo",
+    STATUS_PAUSED: "⏸️ Pausado",
+    STATUS_FINISHED: "✅ Terminado",
+    STATUS_INACTIVE: "🔴 Inactivo",
+}
+
+# Límites de horas por tipo de rol
+GOLD_LIMIT_HOURS = 2.0
+UNLIMITED_ROLE_LIMIT_HOURS = 4.0
+NORMAL_LIMIT_HOURS = 1.0
+DEFAULT_LIMIT_HOURS = NORMAL_LIMIT_HOURS
+
+
+def role_limit_hours(role_type: str, has_unlimited_role: bool) -> float:
+    """Límite de horas de un usuario según su rol (Gold tiene prioridad sobre el rol especial)"""
+    if role_type == "gold":
+        return GOLD_LIMIT_HOURS
+    if has_unlimited_role:
+        return UNLIMITED_ROLE_LIMIT_HOURS
+    return NORMAL_LIMIT_HOURS
+
+
+def role_label(role_type: str, has_unlimited_role: bool) -> str:
+    """Descripción del rol y su límite para mostrar al usuario"""
+    if role_type == "gold":
+        return "🏆 Gold - Límite: 2 horas"
+    if has_unlimited_role:
+        return "⭐ Rol Especial - Límite: 4 horas"
+    return "👤 Recluta - Límite: 1 hora"
+
+
+def format_limit_hours(limit_hours: float) -> str:
+    """Formatear un límite de horas ("1 hora", "2 horas")"""
+    hours = int(limit_hours) if float(limit_hours).is_integer() else limit_hours
+    return f"{hours} hora{'s' if hours != 1 else ''}"
+
+
+def is_limit_reached(total_seconds: float, limit_hours: float) -> bool:
+    """Indicar si el tiempo acumulado alcanzó el límite"""
+    return total_seconds / 3600 >= limit_hours
+
+
+def derive_status(user_data: Dict[str, Any], total_seconds: float, limit_hours: float) -> str:
+    """Derivar el estado de un usuario a partir de sus datos y su límite"""
+    if user_data.get('is_active', False):
+        return STATUS_ACTIVE
+
+    if user_data.get('is_paused', False):
+        if user_data.get('milestone_completed', False) or is_limit_reached(total_seconds, limit_hours):
+            return STATUS_FINISHED
+        return STATUS_PAUSED
+
+    return STATUS_INACTIVE
+
+
+def get_status(user_data: Dict[str, Any]) -> str:
+    """Leer el estado materializado (o derivarlo si el registro es antiguo)"""
+    status = user_data.get('status')
+    if status in STATUS_LABELS:
+        return status
+    limit_hours = user_data.get('limit_hours', DEFAULT_LIMIT_HOURS)
+    return derive_status(user_data, user_data.get('total_time', 0), limit_hours)
+
+
+def get_status_label(user_data: Dict[str, Any]) -> str:
+    """Etiqueta visible del estado materializado de un usuario"""
+    return STATUS_LABELS[get_status(user_data)]
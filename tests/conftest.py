@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from time_tracker import TimeTracker
+
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    """TimeTracker aislado en un directorio temporal"""
+    monkeypatch.chdir(tmp_path)
+    return TimeTracker(str(tmp_path / "user_times.json"))
@@ -0,0 +1,24 @@
+import asyncio
+
+from limit_engine import LimitScheduler
+
+
+def test_clear_all_data_cancels_armed_limit_timers(tracker):
+    fired = []
+
+    async def scenario():
+        scheduler = LimitScheduler(max_hours=8, on_limit=fired.append)
+        tracker.add_listener(scheduler.observe)
+        scheduler.start(asyncio.get_running_loop(), tracker.get_all_tracked_users().items())
+
+        tracker.start_tracking(1, "Ana")
+        await asyncio.sleep(0)
+        assert scheduler.deadline_for("1") is not None
+
+        tracker.clear_all_data()
+        await asyncio.sleep(0)
+        assert scheduler.deadline_for("1") is None
+        assert len(scheduler) == 0
+
+    asyncio.run(scenario())
+    assert fired == []
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from rollups import ROLLUP_TZ, add_interval, deduct_amount
+
+
+def test_interval_across_dst_end_keeps_its_real_duration():
+    # 2026-04-04 a las 24:00 Chile vuelve de -03 a -04: ese día dura 25 horas
+    daily = {}
+    add_interval(daily, datetime(2026, 4, 4, 12, tzinfo=ROLLUP_TZ), datetime(2026, 4, 5, 12, tzinfo=ROLLUP_TZ))
+
+    assert daily == {"2026-04-04": 13 * 3600, "2026-04-05": 12 * 3600}
+
+
+def test_deduction_walks_back_from_today_without_negative_days():
+    daily = {"2026-03-01": 3600, "2026-03-02": 1800, "2026-03-03": 600}
+    deduct_amount(daily, datetime(2026, 3, 3, 10, tzinfo=ROLLUP_TZ), 3000)
+
+    assert daily == {"2026-03-01": 3000}
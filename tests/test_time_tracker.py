@@ -0,0 +1,7 @@
+def test_search_short_term_matches_inside_the_name(tracker):
+    tracker.start_tracking(1, "Pérez")
+    tracker.start_tracking(2, "Ezequiel")
+    tracker.start_tracking(3, "Ana")
+
+    assert tracker.search_users_by_name("ez") == ["2", "1"]
+    assert tracker.search_users_by_name("ez", limit=1) == ["2"]
@@ -1,13 +1,47 @@
 
 import json
 import os
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+
+import attendance_ledger
+from leaderboard import Leaderboard
+from name_search import TrigramIndex
+from order_index import SortedBucketList
+from rollups import add_amount, add_interval, deduct_amount, iter_days, sum_range
+from status_engine import DEFAULT_LIMIT_HOURS, derive_status, is_limit_reached
 
 class TimeTracker:
     def __init__(self, data_file: str = "user_times.json"):
         self.data_file = data_file
         self.data = self.load_data()
+        self._batch_depth = 0
+        self._dirty = False
+        # Versión de los datos: aumenta con cada modificación (clave de cachés de reportes)
+        self.version = 0
+        # Versión de cada registro: aumenta con cada transición del usuario (clave de cachés por usuario)
+        self._user_versions: Dict[str, int] = {}
+        # Ranking por tiempo acumulado, actualizado en cada transición
+        self.leaderboard = Leaderboard()
+        # Índice de estado: estado materializado → IDs de usuario
+        self._status_index: Dict[str, Set[str]] = {}
+        # Índice ordenado por nombre normalizado: entradas (nombre, user_id)
+        self.name_index = SortedBucketList()
+        self._name_keys: Dict[str, Tuple[str, str]] = {}
+        # Trigramas de los nombres para búsquedas por subcadena
+        self.name_trigrams = TrigramIndex()
+        # Inicio de cada sesión (timestamp) por usuario, en el orden del historial; se construye al consultarlo
+        self._session_starts: Dict[str, List[float]] = {}
+        # Índice por última actividad: entradas (timestamp, user_id), las más antiguas primero
+        self.activity_index = SortedBucketList()
+        self._activity_keys: Dict[str, Tuple[float, str]] = {}
+        # Funciones notificadas tras cada transición: (user_id, registro o None si se eliminó)
+        self._listeners: List[Callable[[str, Optional[Dict[str, Any]]], None]] = []
+        self._rebuild_indexes()
+        # Registros de usuarios eliminados por inactividad (una línea JSON por usuario)
+        self.archive_file = "archived_users.jsonl"
         self.attendance_file = "attendance_data.json"
         self.attendance_data = self.load_attendance_data()
 
@@ -22,14 +56,199 @@ class TimeTracker:
             print(f"Error cargando datos: {e}")
             return {}
 
+    def _rebuild_indexes(self) -> None:
+        """Recalcular los datos derivados de todos los usuarios (al cargar o limpiar)"""
+        self.leaderboard.clear()
+        self._status_index.clear()
+        self.name_index.clear()
+        self._name_keys.clear()
+        self.name_trigrams.clear()
+        self._session_starts.clear()
+        self.activity_index.clear()
+        self._activity_keys.clear()
+        now = datetime.now().isoformat()
+        for user_id_str, user_data in self.data.items():
+            if 'daily_totals' not in user_data:
+                self._backfill_daily_totals(user_data)
+            # Registros sin ninguna fecha: actividad desconocida, se cuenta desde ahora (no como antiquísima)
+            if not self._last_activity_ts(user_data):
+                user_data['last_activity'] = now
+            self._touch_user(user_id_str, activity=False)
+
+    def _touch_user(self, user_id_str: str, activity: bool = True) -> None:
+        """Actualizar los datos derivados de un usuario tras una transición de estado"""
+        user_data = self.data.get(user_id_str)
+        if user_data is None:
+            return
+
+        # Última actividad (al reconstruir los índices se conserva la registrada)
+        if activity:
+            user_data['last_activity'] = datetime.now().isoformat()
+        activity_key = (self._last_activity_ts(user_data), user_id_str)
+        old_activity_key = self._activity_keys.get(user_id_str)
+        if old_activity_key != activity_key:
+            if old_activity_key is not None:
+                self.activity_index.discard(old_activity_key)
+            self.activity_index.add(activity_key)
+            self._activity_keys[user_id_str] = activity_key
+
+        self._user_versions[user_id_str] = self._user_versions.get(user_id_str, 0) + 1
+
+        # Estado materializado: las vistas lo leen en lugar de recalcularlo por fila
+        limit_hours = user_data.get('limit_hours', DEFAULT_LIMIT_HOURS)
+        total_time = user_data.get('total_time', 0)
+        old_status = user_data.get('status')
+        user_data['status'] = derive_status(user_data, total_time, limit_hours)
+        if old_status in self._status_index:
+            self._status_index[old_status].discard(user_id_str)
+        self._status_index.setdefault(user_data['status'], set()).add(user_id_str)
+        user_data['limit_reached'] = user_data.get('milestone_completed', False) or is_limit_reached(total_time, limit_hours)
+
+        # Ranking: los activos se indexan con desplazamiento respecto al inicio de la sesión
+        active_since = None
+        if user_data.get('is_active', False) and user_data.get('last_start'):
+            active_since = datetime.fromisoformat(user_data['last_start']).timestamp()
+        self.leaderboard.update(user_id_str, total_time, active_since)
+
+        # Índice de nombres: solo se reubica si el nombre cambió
+        name_key = (self.normalize_name(user_data.get('name', f'Usuario {user_id_str}')), user_id_str)
+        old_key = self._name_keys.get(user_id_str)
+        if old_key != name_key:
+            if old_key is not None:
+                self.name_index.discard(old_key)
+            self.name_index.add(name_key)
+            self._name_keys[user_id_str] = name_key
+            self.name_trigrams.add(user_id_str, name_key[0])
+
+        self._notify_listeners(user_id_str, user_data)
+
+    def _forget_user(self, user_id_str: str) -> None:
+        """Quitar a un usuario eliminado de los índices"""
+        # La versión del registro se conserva: si el usuario vuelve, no reutiliza versiones antiguas
+        self._user_versions[user_id_str] = self._user_versions.get(user_id_str, 0) + 1
+        self.leaderboard.remove(user_id_str)
+        for status_users in self._status_index.values():
+            status_users.discard(user_id_str)
+        self._session_starts.pop(user_id_str, None)
+        old_key = self._name_keys.pop(user_id_str, None)
+        if old_key is not None:
+            self.name_index.discard(old_key)
+        self.name_trigrams.remove(user_id_str)
+        old_activity_key = self._activity_keys.pop(user_id_str, None)
+        if old_activity_key is not None:
+            self.activity_index.discard(old_activity_key)
+        self._notify_listeners(user_id_str, None)
+
+    def add_listener(self, listener: Callable[[str, Optional[Dict[str, Any]]], None]) -> None:
+        """Registrar una función que se llama tras cada transición de un usuario"""
+        self._listeners.append(listener)
+
+    def _notify_listeners(self, user_id_str: str, user_data: Optional[Dict[str, Any]]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(user_id_str, user_data)
+            except Exception as e:
+                print(f"Error notificando transición de {user_id_str}: {e}")
+
+    @staticmethod
+    def _last_activity_ts(user_data: Dict[str, Any]) -> float:
+        """Timestamp de la última actividad (registros antiguos: el evento más reciente que guardan)"""
+        candidates = [user_data.get('last_activity'), user_data.get('last_start'),
+                      user_data.get('pause_start'), user_data.get('pre_register_time')]
+        sessions = user_data.get('sessions')
+        if sessions:
+            candidates.append(sessions[-1].get('end'))
+
+        latest = 0.0
+        for value in candidates:
+            if value:
+                try:
+                    latest = max(latest, datetime.fromisoformat(value).timestamp())
+                except (TypeError, ValueError):
+                    continue
+        return latest
+
+    def _backfill_daily_totals(self, user_data: Dict[str, Any]) -> None:
+        """Construir los totales diarios de registros antiguos a partir de sus sesiones"""
+        daily = {}
+        for session in user_data.get('sessions', []):
+            try:
+                if session.get('start') and session.get('end'):
+                    add_interval(daily, datetime.fromisoformat(session['start']), datetime.fromisoformat(session['end']))
+            except (TypeError, ValueError):
+                continue
+        user_data['daily_totals'] = daily
+
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        """Nombre normalizado usado para ordenar y buscar"""
+        return name.lower()
+
+    def set_user_limit(self, user_id: int, limit_hours: float) -> bool:
+        """Actualizar el límite de horas de un usuario (al iniciar o cuando cambia su rol)"""
+        user_id_str = str(user_id)
+        user_data = self.data.get(user_id_str)
+        if user_data is None or user_data.get('limit_hours') == limit_hours:
+            return False
+
+        user_data['limit_hours'] = limit_hours
+        self._touch_user(user_id_str)
+        self.save_data()
+        return True
+
+    def mark_milestone_completed(self, user_id: int) -> bool:
+        """Marcar que un usuario completó su tiempo (estado Terminado)"""
+        user_id_str = str(user_id)
+        user_data = self.data.get(user_id_str)
+        if user_data is None:
+            return False
+
+        user_data['milestone_completed'] = True
+        self._touch_user(user_id_str)
+        self.save_data()
+        return True
+
     def save_data(self) -> None:
-        """Guardar datos al archivo JSON"""
+        """Guardar datos al archivo JSON (se posterga si hay un lote en curso)"""
+        self.version += 1
+        if self._batch_depth > 0:
+            self._dirty = True
+            return
+        self._write_data()
+
+    def _write_data(self) -> None:
+        """Escribir los datos de forma atómica (archivo temporal + reemplazo)"""
         try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
+            tmp_file = f"{self.data_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 json.dump(self.data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, self.data_file)
+            self._dirty = False
         except Exception as e:
+            # Los cambios siguen pendientes: el próximo guardado o flush() lo reintenta
+            self._dirty = True
             print(f"Error guardando datos: {e}")
 
+    @contextmanager
+    def batch(self):
+        """Agrupar varias modificaciones en una sola escritura al archivo"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty:
+                self._write_data()
+
+    def has_pending_writes(self) -> bool:
+        """Indicar si hay cambios en memoria que aún no se escribieron"""
+        return self._dirty
+
+    def flush(self) -> None:
+        """Escribir inmediatamente cualquier cambio pendiente (usado al apagar el bot)"""
+        if self._dirty:
+            self._write_data()
+
     def pre_register_user(self, user_id: int, user_name: str) -> bool:
         """Pre-registrar usuario para inicio automático"""
         user_id_str = str(user_id)
@@ -63,6 +282,7 @@ class TimeTracker:
         user_data['pre_register_time'] = current_time
         user_data['name'] = user_name  # Actualizar nombre
 
+        self._touch_user(user_id_str)
         self.save_data()
         return True
 
@@ -102,12 +322,14 @@ class TimeTracker:
             if 'pre_register_initiator' in user_data:
                 del user_data['pre_register_initiator']
 
-        # Iniciar nueva sesión
+        # Iniciar nueva sesión (manual salvo que el seguimiento por voz la marque después)
         user_data['is_active'] = True
         user_data['is_paused'] = False
         user_data['last_start'] = current_time
         user_data['name'] = user_name  # Actualizar nombre
+        user_data.pop('voice_session', None)
 
+        self._touch_user(user_id_str)
         self.save_data()
         return True
 
@@ -134,6 +356,7 @@ class TimeTracker:
         user_data['is_paused'] = False
         user_data['is_pre_registered'] = False
         user_data['last_start'] = current_time
+        user_data.pop('voice_session', None)
 
         # Limpiar pre-registro
         if 'pre_register_time' in user_data:
@@ -143,6 +366,7 @@ class TimeTracker:
         if 'pre_register_initiator' in user_data:
             del user_data['pre_register_initiator']
 
+        self._touch_user(user_id_str)
         self.save_data()
         return True
 
@@ -169,14 +393,17 @@ class TimeTracker:
         # Calcular tiempo de sesión
         if user_data.get('last_start'):
             session_start = datetime.fromisoformat(user_data['last_start'])
-            session_time = (datetime.now() - session_start).total_seconds()
+            session_end = datetime.now()
+            session_time = (session_end - session_start).total_seconds()
             
             # Añadir tiempo de sesión al total
             user_data['total_time'] = user_data.get('total_time', 0) + session_time
+            add_interval(user_data.setdefault('daily_totals', {}), session_start, session_end)
 
-        # Marcar como inactivo
+        # Marcar como inactivo (la sesión termina, sea o no de voz)
         user_data['is_active'] = False
         user_data['is_paused'] = False
+        user_data.pop('voice_session', None)
 
         # Agregar sesión al historial
         if 'sessions' not in user_data:
@@ -188,7 +415,9 @@ class TimeTracker:
             'duration': session_time if user_data.get('last_start') else 0
         }
         user_data['sessions'].append(session_record)
+        self._index_session(user_id_str, session_record)
 
+        self._touch_user(user_id_str)
         self.save_data()
         return True
 
@@ -207,15 +436,19 @@ class TimeTracker:
         # Calcular tiempo de sesión actual y añadirlo al total
         if user_data.get('last_start'):
             session_start = datetime.fromisoformat(user_data['last_start'])
-            session_time = (datetime.now() - session_start).total_seconds()
+            session_end = datetime.now()
+            session_time = (session_end - session_start).total_seconds()
             user_data['total_time'] = user_data.get('total_time', 0) + session_time
+            add_interval(user_data.setdefault('daily_totals', {}), session_start, session_end)
 
-        # Marcar como pausado
+        # Marcar como pausado (al despausar, la sesión pasa a ser manual)
         user_data['is_active'] = False
         user_data['is_paused'] = True
+        user_data.pop('voice_session', None)
         user_data['pause_start'] = datetime.now().isoformat()
         user_data['pause_count'] = user_data.get('pause_count', 0) + 1
 
+        self._touch_user(user_id_str)
         self.save_data()
         return True
 
@@ -240,6 +473,7 @@ class TimeTracker:
         if 'pause_start' in user_data:
             del user_data['pause_start']
 
+        self._touch_user(user_id_str)
         self.save_data()
         return True
 
@@ -261,6 +495,183 @@ class TimeTracker:
 
         return total_time
 
+    def get_ranking(self, limit: int = 10) -> List[Tuple[str, float]]:
+        """Usuarios con más tiempo acumulado: [(user_id, tiempo total)]"""
+        return self.leaderboard.top(limit, datetime.now().timestamp())
+
+    def get_user_rank(self, user_id: int) -> Optional[int]:
+        """Posición de un usuario en el ranking de tiempos (1 = primero)"""
+        return self.leaderboard.rank(str(user_id), datetime.now().timestamp())
+
+    def _live_daily_totals(self, user_data: Dict[str, Any]) -> Dict[str, float]:
+        """Totales diarios de la sesión en curso (aún no consolidados)"""
+        live = {}
+        if user_data.get('is_active', False) and user_data.get('last_start'):
+            add_interval(live, datetime.fromisoformat(user_data['last_start']), datetime.now())
+        return live
+
+    def get_time_in_range(self, user_id: int, start_day: date, end_day: date) -> float:
+        """Segundos acumulados por un usuario entre dos días (hora de Chile, inclusive)"""
+        user_data = self.data.get(str(user_id))
+        if user_data is None:
+            return 0.0
+        live = self._live_daily_totals(user_data)
+        return sum_range(user_data.get('daily_totals', {}), start_day, end_day) + sum_range(live, start_day, end_day)
+
+    def get_daily_breakdown(self, user_id: int, start_day: date, end_day: date) -> List[Tuple[date, float]]:
+        """Segundos por día de un usuario en el rango (hora de Chile, inclusive)"""
+        user_data = self.data.get(str(user_id))
+        if user_data is None:
+            return []
+        daily = user_data.get('daily_totals', {})
+        live = self._live_daily_totals(user_data)
+        return [
+            (day, daily.get(day.isoformat(), 0) + live.get(day.isoformat(), 0))
+            for day in iter_days(start_day, end_day)
+        ]
+
+    def get_period_totals(self, start_day: date, end_day: date) -> Dict[str, float]:
+        """Segundos de cada usuario entre dos días (solo usuarios con tiempo en el rango)"""
+        totals = {}
+        for user_id_str in self.data:
+            seconds = self.get_time_in_range(int(user_id_str), start_day, end_day)
+            if seconds > 0:
+                totals[user_id_str] = seconds
+        return totals
+
+    @staticmethod
+    def _session_start_key(session: Dict[str, Any]) -> float:
+        try:
+            return datetime.fromisoformat(session['start']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return 0.0
+
+    def _index_session(self, user_id_str: str, session: Dict[str, Any]) -> None:
+        """Añadir una sesión nueva al índice del usuario (si ya fue construido)"""
+        starts = self._session_starts.get(user_id_str)
+        if starts is None:
+            return
+        key = self._session_start_key(session)
+        if not starts or key >= starts[-1]:
+            starts.append(key)
+        else:
+            # Sesión fuera de orden: reconstruir el índice en la próxima consulta
+            del self._session_starts[user_id_str]
+
+    def _get_session_starts(self, user_id_str: str) -> List[float]:
+        """Índice ordenado de inicios de sesión de un usuario"""
+        starts = self._session_starts.get(user_id_str)
+        if starts is None:
+            sessions = self.data[user_id_str].get('sessions', [])
+            starts = [self._session_start_key(session) for session in sessions]
+            if any(starts[i] > starts[i + 1] for i in range(len(starts) - 1)):
+                # Historiales desordenados: ordenarlos una sola vez
+                sessions.sort(key=self._session_start_key)
+                starts.sort()
+            self._session_starts[user_id_str] = starts
+        return starts
+
+    def get_sessions_page(self, user_id: int, start_ts: Optional[float] = None, end_ts: Optional[float] = None,
+                          offset: int = 0, limit: int = 10) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Sesiones de un usuario que comenzaron en [start_ts, end_ts), de la más reciente a la
+        más antigua. Devuelve (total de sesiones en el rango, sesiones de la página).
+        """
+        user_id_str = str(user_id)
+        if user_id_str not in self.data:
+            return 0, []
+
+        starts = self._get_session_starts(user_id_str)
+        sessions = self.data[user_id_str].get('sessions', [])
+        lo = 0 if start_ts is None else bisect_left(starts, start_ts)
+        hi = len(starts) if end_ts is None else bisect_left(starts, end_ts)
+        total = max(0, hi - lo)
+
+        page_end = hi - offset
+        if page_end <= lo:
+            return total, []
+        page_start = max(lo, page_end - limit)
+        return total, list(reversed(sessions[page_start:page_end]))
+
+    def get_user_version(self, user_id: int) -> int:
+        """Versión del registro de un usuario (cambia con cada transición)"""
+        return self._user_versions.get(str(user_id), 0)
+
+    def count_users(self) -> int:
+        """Cantidad de usuarios con seguimiento"""
+        return len(self.data)
+
+    def get_users_by_name(self, offset: int = 0, limit: Optional[int] = None) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Página del listado alfabético: [(nombre normalizado, user_id, datos)] sin reordenar"""
+        stop = None if limit is None else offset + limit
+        return [(name, user_id_str, self.data[user_id_str]) for name, user_id_str in self.name_index.islice(offset, stop)]
+
+    def get_user_ids_by_status(self, status: str) -> Set[str]:
+        """IDs de los usuarios con el estado materializado indicado"""
+        return set(self._status_index.get(status, ()))
+
+    def query_users(self, status: Optional[str] = None, min_seconds: float = 0.0,
+                    order: str = "name") -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Usuarios filtrados por estado y tiempo mínimo, ordenados por nombre ("name") o por
+        tiempo descendente ("time"): [(nombre normalizado, user_id, datos)].
+        Se responde desde los índices de estado, nombres y ranking.
+        """
+        now = datetime.now().timestamp()
+        candidates = self._status_index.get(status, set()) if status else None
+
+        if order == "time":
+            if candidates is not None:
+                ranked = sorted(
+                    ((user_id_str, self.leaderboard.live_time(user_id_str, now) or 0.0) for user_id_str in candidates),
+                    key=lambda item: item[1], reverse=True
+                )
+            else:
+                ranked = self.leaderboard.iter_ranked(now)
+
+            rows = []
+            for user_id_str, live_time in ranked:
+                if live_time < min_seconds:
+                    break  # Orden descendente: el resto tampoco alcanza el mínimo
+                rows.append((self._name_keys[user_id_str][0], user_id_str, self.data[user_id_str]))
+            return rows
+
+        if candidates is not None:
+            ordered = [self._name_keys[user_id_str] for user_id_str in sorted(candidates, key=self._name_keys.__getitem__)]
+        else:
+            ordered = self.name_index
+
+        rows = []
+        for name, user_id_str in ordered:
+            if min_seconds > 0 and (self.leaderboard.live_time(user_id_str, now) or 0.0) < min_seconds:
+                continue
+            rows.append((name, user_id_str, self.data[user_id_str]))
+        return rows
+
+    def search_users_by_name(self, term: str, limit: Optional[int] = None) -> List[str]:
+        """
+        IDs de los usuarios cuyo nombre contiene `term`, en orden alfabético.
+        Los términos de menos de 3 caracteres no usan trigramas y recorren todos los nombres.
+        """
+        term = self.normalize_name(term.strip())
+        if not term:
+            return []
+
+        candidates = self.name_trigrams.search(term)
+        if candidates is not None:
+            matches = sorted(candidates, key=lambda user_id_str: self._name_keys[user_id_str])
+            return matches if limit is None else matches[:limit]
+
+        # Término corto: subcadena sobre el índice ordenado completo (ya en orden alfabético)
+        matches = []
+        for name, user_id_str in self.name_index:
+            if term not in name:
+                continue
+            matches.append(user_id_str)
+            if limit is not None and len(matches) >= limit:
+                break
+        return matches
+
     def get_user_data(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Obtener datos completos de un usuario"""
         user_id_str = str(user_id)
@@ -279,10 +690,12 @@ class TimeTracker:
 
         user_data = self.data[user_id_str]
         user_data['total_time'] = 0
+        user_data['daily_totals'] = {}
         user_data['is_active'] = False
         user_data['is_paused'] = False
         user_data['pause_count'] = 0
         user_data['sessions'] = []
+        self._session_starts.pop(user_id_str, None)
         user_data['notified_milestones'] = []
         user_data['milestone_completed'] = False
         user_data['is_pre_registered'] = False
@@ -295,6 +708,7 @@ class TimeTracker:
         if 'pre_register_time' in user_data:
             del user_data['pre_register_time']
 
+        self._touch_user(user_id_str)
         self.save_data()
         return True
 
@@ -316,13 +730,76 @@ class TimeTracker:
 
         # Eliminar completamente al usuario
         del self.data[user_id_str]
+        self._forget_user(user_id_str)
         self.save_data()
         return True
 
+    def cleanup_inactive_users(self, inactive_days: int, batch_size: int) -> List[Dict[str, Any]]:
+        """
+        Archivar y eliminar hasta `batch_size` usuarios sin actividad en los últimos
+        `inactive_days` días (los activos y pre-registrados se conservan).
+        Devuelve el resumen de los usuarios archivados.
+        """
+        cutoff = (datetime.now() - timedelta(days=inactive_days)).timestamp()
+        to_remove = []
+        # El índice está ordenado por última actividad: se recorre solo el tramo vencido
+        for last_activity, user_id_str in self.activity_index:
+            if last_activity >= cutoff or len(to_remove) >= batch_size:
+                break
+            user_data = self.data[user_id_str]
+            if user_data.get('is_active', False) or user_data.get('is_pre_registered', False):
+                continue
+            to_remove.append((user_id_str, last_activity))
+
+        if not to_remove:
+            return []
+
+        archived_at = datetime.now().isoformat()
+        archived = []
+        for user_id_str, last_activity in to_remove:
+            user_data = self.data[user_id_str]
+            archived.append({
+                'user_id': user_id_str,
+                'name': user_data.get('name', f'Usuario {user_id_str}'),
+                'total_time': user_data.get('total_time', 0),
+                'last_activity': datetime.fromtimestamp(last_activity).isoformat(),
+                'archived_at': archived_at,
+                'record': user_data,
+            })
+
+        # Solo se eliminan los usuarios si su copia quedó escrita en el archivo histórico
+        if not self._append_archive(archived):
+            return []
+
+        with self.batch():
+            for user_id_str, _ in to_remove:
+                del self.data[user_id_str]
+                self._forget_user(user_id_str)
+            self.save_data()
+
+        return [{key: value for key, value in entry.items() if key != 'record'} for entry in archived]
+
+    def _append_archive(self, entries: List[Dict[str, Any]]) -> bool:
+        """Agregar registros eliminados al archivo histórico (una línea JSON por usuario)"""
+        try:
+            lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries)
+            with open(self.archive_file, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            return True
+        except Exception as e:
+            print(f"Error archivando usuarios: {e}")
+            return False
+
     def clear_all_data(self) -> bool:
         """Limpiar completamente todos los datos"""
         try:
+            # Avisar a los observadores (temporizadores de límite) de cada usuario eliminado
+            for user_id_str in list(self.data):
+                self._forget_user(user_id_str)
             self.data = {}
+            self._rebuild_indexes()
             self.save_data()
             return True
         except Exception as e:
@@ -340,7 +817,9 @@ class TimeTracker:
         user_data = self.data[user_id_str]
         user_data['total_time'] = user_data.get('total_time', 0) + (minutes * 60)
         user_data['name'] = user_name  # Actualizar nombre
+        add_amount(user_data.setdefault('daily_totals', {}), datetime.now(), minutes * 60)
 
+        self._touch_user(user_id_str)
         self.save_data()
         return True
 
@@ -355,7 +834,9 @@ class TimeTracker:
         current_time = user_data.get('total_time', 0)
         new_time = max(0, current_time - (minutes * 60))
         user_data['total_time'] = new_time
+        deduct_amount(user_data.setdefault('daily_totals', {}), datetime.now(), current_time - new_time)
 
+        self._touch_user(user_id_str)
         self.save_data()
         return True
 
@@ -401,185 +882,115 @@ class TimeTracker:
         return ", ".join(parts)
 
     def load_attendance_data(self) -> Dict[str, Any]:
-        """Cargar datos de asistencias desde archivo JSON"""
+        """Cargar datos de asistencias desde archivo JSON (migrando el formato por fechas)"""
         try:
             if os.path.exists(self.attendance_file):
                 with open(self.attendance_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    data = json.load(f)
+                now = datetime.now()
+                for admin_data in data.values():
+                    attendance_ledger.migrate_admin_record(admin_data, now)
+                return data
             return {}
         except Exception as e:
             print(f"Error cargando datos de asistencias: {e}")
             return {}
 
     def save_attendance_data(self) -> None:
-        """Guardar datos de asistencias al archivo JSON"""
+        """Guardar datos de asistencias de forma atómica (archivo temporal + reemplazo)"""
         try:
-            with open(self.attendance_file, 'w', encoding='utf-8') as f:
+            tmp_file = f"{self.attendance_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 json.dump(self.attendance_data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, self.attendance_file)
         except Exception as e:
             print(f"Error guardando datos de asistencias: {e}")
 
+    def _get_admin_attendance(self, admin_id_str: str, admin_name: str) -> Dict[str, Any]:
+        """Registro de asistencias de un admin (se crea si no existe) con el nombre actualizado"""
+        admin_data = self.attendance_data.get(admin_id_str)
+        if admin_data is None:
+            admin_data = attendance_ledger.new_admin_record(admin_name)
+            self.attendance_data[admin_id_str] = admin_data
+        admin_data['name'] = admin_name
+        return admin_data
+
     def add_manual_attendance(self, admin_id: int, admin_name: str, quantity: int) -> bool:
         """Agregar asistencias manualmente (para comando /sumar_asistencias) - hasta 15 asistencias sin límites"""
-        admin_id_str = str(admin_id)
-        
         # Verificar que la cantidad esté entre 1 y 15
         if quantity < 1 or quantity > 15:
             return False
-        
-        # Inicializar datos del admin si no existen
-        if admin_id_str not in self.attendance_data:
-            self.attendance_data[admin_id_str] = {
-                'name': admin_name,
-                'daily_attendance': {},
-                'total_attendance': 0,
-                'manual_weekly_attendance': 0  # Nuevo campo para asistencias manuales semanales
-            }
-        
-        admin_data = self.attendance_data[admin_id_str]
-        admin_data['name'] = admin_name  # Actualizar nombre
-        
-        # Inicializar campo manual semanal si no existe
-        if 'manual_weekly_attendance' not in admin_data:
-            admin_data['manual_weekly_attendance'] = 0
-        
-        # Solo agregar al total y al contador semanal manual (NO al diario)
-        admin_data['manual_weekly_attendance'] += quantity
-        admin_data['total_attendance'] = admin_data.get('total_attendance', 0) + quantity
+
+        admin_data = self._get_admin_attendance(str(admin_id), admin_name)
+
+        # Solo suma al total y al contador semanal manual (NO al diario)
+        attendance_ledger.record(admin_data, attendance_ledger.KIND_MANUAL_WEEKLY, quantity, datetime.now())
         self.save_attendance_data()
         return True
 
     def add_daily_manual_attendance(self, admin_id: int, admin_name: str, quantity: int) -> bool:
         """Agregar asistencias diarias manualmente (para comando /agregar_asistencias_diarias) - máximo 3 por día"""
-        admin_id_str = str(admin_id)
-        today = datetime.now().strftime("%Y-%m-%d")
-        
         # Verificar que la cantidad esté entre 1 y 3
         if quantity < 1 or quantity > 3:
             return False
-        
-        # Inicializar datos del admin si no existen
-        if admin_id_str not in self.attendance_data:
-            self.attendance_data[admin_id_str] = {
-                'name': admin_name,
-                'daily_attendance': {},
-                'total_attendance': 0,
-                'manual_weekly_attendance': 0
-            }
-        
-        admin_data = self.attendance_data[admin_id_str]
-        admin_data['name'] = admin_name  # Actualizar nombre
-        
-        # Inicializar día si no existe
-        if today not in admin_data['daily_attendance']:
-            admin_data['daily_attendance'][today] = 0
-        
+
+        now = datetime.now()
+        admin_data = self._get_admin_attendance(str(admin_id), admin_name)
+
         # Verificar que no exceda 3 asistencias diarias
-        if admin_data['daily_attendance'][today] + quantity > 3:
+        if attendance_ledger.daily_count(admin_data, now) + quantity > 3:
             return False
-        
-        # SOLO agregar a diarias y totales
-        # NO agregar a manual_weekly_attendance porque get_weekly_attendance ya cuenta las diarias
-        admin_data['daily_attendance'][today] += quantity
-        admin_data['total_attendance'] = admin_data.get('total_attendance', 0) + quantity
-        
-        # Inicializar campo manual semanal si no existe (pero no sumar aquí)
-        if 'manual_weekly_attendance' not in admin_data:
-            admin_data['manual_weekly_attendance'] = 0
-        
+
+        # Cuenta como diaria (y por lo tanto en la semana), no como manual semanal
+        attendance_ledger.record(admin_data, attendance_ledger.KIND_MANUAL_DAILY, quantity, now)
         self.save_attendance_data()
         return True
 
     def add_attendance(self, admin_id: int, admin_name: str, attendances_to_add: int = 1) -> bool:
         """Agregar asistencia para un administrador (por defecto 1 asistencia)"""
-        admin_id_str = str(admin_id)
-        today = datetime.now().strftime("%Y-%m-%d")
-        
         # Verificar si puede recibir asistencias diarias (no ha transferido hoy)
         if not self.can_receive_daily_attendance(admin_id):
             return False
-        
-        # Inicializar datos del admin si no existen
-        if admin_id_str not in self.attendance_data:
-            self.attendance_data[admin_id_str] = {
-                'name': admin_name,
-                'daily_attendance': {},
-                'total_attendance': 0
-            }
-        
-        admin_data = self.attendance_data[admin_id_str]
-        admin_data['name'] = admin_name  # Actualizar nombre
-        
-        # Inicializar día si no existe
-        if today not in admin_data['daily_attendance']:
-            admin_data['daily_attendance'][today] = 0
-        
-        # Verificar límite diario (máximo 3 por día)
-        if admin_data['daily_attendance'][today] >= 3:
-            return False
-        
-        # Verificar límite semanal (máximo 15 por semana)
-        weekly_count = self.get_weekly_attendance(admin_id)
-        if weekly_count >= 15:
+
+        now = datetime.now()
+        admin_data = self._get_admin_attendance(str(admin_id), admin_name)
+        daily_count = attendance_ledger.daily_count(admin_data, now)
+        weekly_count = attendance_ledger.weekly_count(admin_data, now)
+
+        # Verificar límites diario (3) y semanal (15)
+        if daily_count >= 3 or weekly_count >= 15:
             return False
-        
-        # Verificar que no exceda el límite diario
-        if admin_data['daily_attendance'][today] + attendances_to_add > 3:
-            attendances_to_add = 3 - admin_data['daily_attendance'][today]
-        
-        # Verificar que no exceda el límite semanal
-        if weekly_count + attendances_to_add > 15:
-            attendances_to_add = 15 - weekly_count
-        
+
+        # Ajustar la cantidad para no exceder los límites
+        attendances_to_add = min(attendances_to_add, 3 - daily_count, 15 - weekly_count)
+
         if attendances_to_add > 0:
-            admin_data['daily_attendance'][today] += attendances_to_add
-            admin_data['total_attendance'] = admin_data.get('total_attendance', 0) + attendances_to_add
+            attendance_ledger.record(admin_data, attendance_ledger.KIND_GRANT, attendances_to_add, now)
             self.save_attendance_data()
             return True
-        
+
         return False
 
     def get_daily_attendance(self, admin_id: int) -> int:
         """Obtener asistencias del día actual"""
-        admin_id_str = str(admin_id)
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        if admin_id_str not in self.attendance_data:
+        admin_data = self.attendance_data.get(str(admin_id))
+        if admin_data is None:
             return 0
-        
-        return self.attendance_data[admin_id_str]['daily_attendance'].get(today, 0)
+        return attendance_ledger.daily_count(admin_data, datetime.now())
 
     def get_weekly_attendance(self, admin_id: int) -> int:
-        """Obtener asistencias de la semana actual"""
-        admin_id_str = str(admin_id)
-        
-        if admin_id_str not in self.attendance_data:
+        """Obtener asistencias de la semana actual (lunes a viernes más las manuales semanales)"""
+        admin_data = self.attendance_data.get(str(admin_id))
+        if admin_data is None:
             return 0
-        
-        admin_data = self.attendance_data[admin_id_str]
-        
-        # Calcular fechas de la semana actual (lunes a viernes)
-        today = datetime.now()
-        start_of_week = today - timedelta(days=today.weekday())
-        
-        weekly_count = 0
-        for i in range(5):  # Solo 5 días: lunes a viernes
-            date = (start_of_week + timedelta(days=i)).strftime("%Y-%m-%d")
-            weekly_count += admin_data['daily_attendance'].get(date, 0)
-        
-        # Agregar asistencias manuales semanales
-        weekly_count += admin_data.get('manual_weekly_attendance', 0)
-        
-        return weekly_count
+        return attendance_ledger.weekly_count(admin_data, datetime.now())
 
     def get_total_attendance(self, admin_id: int) -> int:
         """Obtener total de asistencias"""
-        admin_id_str = str(admin_id)
-        
-        if admin_id_str not in self.attendance_data:
+        admin_data = self.attendance_data.get(str(admin_id))
+        if admin_data is None:
             return 0
-        
-        return self.attendance_data[admin_id_str].get('total_attendance', 0)
+        return admin_data.get('total_attendance', 0)
 
     def get_attendance_info(self, admin_id: int) -> Dict[str, int]:
         """Obtener información completa de asistencias"""
@@ -635,67 +1046,39 @@ class TimeTracker:
         """Transferir asistencias de un usuario a otro - CEDE asistencias diarias del día actual"""
         from_user_id_str = str(from_user_id)
         to_user_id_str = str(to_user_id)
-        today = datetime.now().strftime("%Y-%m-%d")
-        
+        now = datetime.now()
+
         # Verificar que el transferidor tenga datos
-        if from_user_id_str not in self.attendance_data:
-            return False
-        
-        from_user_data = self.attendance_data[from_user_id_str]
-        
-        # Verificar que tenga exactamente 3 asistencias diarias
-        daily_count = self.get_daily_attendance(from_user_id)
-        if daily_count != 3:
-            return False
-        
-        # Verificar que tenga suficientes asistencias diarias para transferir
-        if daily_count < quantity:
+        from_user_data = self.attendance_data.get(from_user_id_str)
+        if from_user_data is None:
             return False
-        
-        # Inicializar datos del receptor si no existen
-        if to_user_id_str not in self.attendance_data:
-            self.attendance_data[to_user_id_str] = {
-                'name': to_user_name,
-                'daily_attendance': {},
-                'total_attendance': 0,
-                'manual_weekly_attendance': 0
-            }
-        
-        to_user_data = self.attendance_data[to_user_id_str]
-        to_user_data['name'] = to_user_name  # Actualizar nombre
-        
-        # Inicializar día del receptor si no existe
-        if today not in to_user_data['daily_attendance']:
-            to_user_data['daily_attendance'][today] = 0
-        
-        # Verificar límites del receptor
-        if to_user_data['daily_attendance'][today] + quantity > 3:
+
+        # Debe tener exactamente 3 asistencias diarias y suficientes para transferir
+        daily_count = attendance_ledger.daily_count(from_user_data, now)
+        if daily_count != 3 or daily_count < quantity:
             return False
-        
-        to_weekly_count = self.get_weekly_attendance(to_user_id)
-        if to_weekly_count + quantity > 15:
+
+        # Verificar límites del receptor antes de crear su registro
+        to_user_data = self.attendance_data.get(to_user_id_str)
+        if to_user_data is not None:
+            if attendance_ledger.daily_count(to_user_data, now) + quantity > 3:
+                return False
+            if attendance_ledger.weekly_count(to_user_data, now) + quantity > 15:
+                return False
+        elif quantity > 3:
             return False
-        
-        # LÓGICA CORRECTA FINAL:
-        # 1. Restar del transferidor (diarias, semanales Y totales - es la misma asistencia)
-        from_user_data['daily_attendance'][today] -= quantity
-        from_user_data['total_attendance'] = max(0, from_user_data.get('total_attendance', 0) - quantity)
-        
-        # 2. Agregar al receptor (diario y total solamente)
-        # NO agregar a manual_weekly_attendance porque son asistencias diarias transferidas
-        # que ya se contarán automáticamente en get_weekly_attendance()
-        to_user_data['daily_attendance'][today] += quantity
-        
-        # Inicializar manual_weekly_attendance si no existe (pero no sumar aquí)
-        if 'manual_weekly_attendance' not in to_user_data:
-            to_user_data['manual_weekly_attendance'] = 0
-        
-        to_user_data['total_attendance'] = to_user_data.get('total_attendance', 0) + quantity
-        
-        # 3. Marcar al transferidor como "no puede obtener más asistencias hoy"
+        to_user_data = self._get_admin_attendance(to_user_id_str, to_user_name)
+
+        # La asistencia sale del día (y total) del transferidor y entra al día del receptor
+        attendance_ledger.record(from_user_data, attendance_ledger.KIND_TRANSFER_OUT, quantity, now,
+                                 counterparty=to_user_id_str)
+        attendance_ledger.record(to_user_data, attendance_ledger.KIND_TRANSFER_IN, quantity, now,
+                                 counterparty=from_user_id_str)
+
+        # Marcar al transferidor como "no puede obtener más asistencias hoy"
         from_user_data['transferred_today'] = True
-        from_user_data['transfer_date'] = today
-        
+        from_user_data['transfer_date'] = now.strftime("%Y-%m-%d")
+
         self.save_attendance_data()
         return True
 
@@ -717,6 +1100,23 @@ class TimeTracker:
         
         return True
 
+    def get_attendance_admin_ids(self) -> List[str]:
+        """IDs de los administradores con registro de asistencias"""
+        return list(self.attendance_data)
+
+    def prune_attendance(self, admin_ids: List[str], retention_days: int) -> int:
+        """Descartar asistencias fuera de la ventana de retención para un lote de admins"""
+        cutoff = datetime.now() - timedelta(days=retention_days)
+        removed = 0
+        for admin_id_str in admin_ids:
+            admin_data = self.attendance_data.get(admin_id_str)
+            if admin_data is not None:
+                removed += attendance_ledger.prune(admin_data, cutoff)
+
+        if removed:
+            self.save_attendance_data()
+        return removed
+
     def reset_all_attendances(self) -> bool:
         """Resetear completamente todas las asistencias de todos los usuarios"""
         try:
@@ -0,0 +1,48 @@
+"""
+Seguimiento automático por canales de voz: agrupa los eventos de entrada y
+salida por usuario y solo entrega el estado final cuando lleva `window` segundos
+sin cambios (las reconexiones rápidas se cancelan entre sí).
+"""
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+def is_tracked_channel(channel_id: Optional[int], allowed_ids: Set[int], excluded_ids: Set[int]) -> bool:
+    """Verificar si un canal de voz cuenta para el seguimiento (sin canales permitidos = todos)"""
+    if channel_id is None:
+        return False
+    if allowed_ids and channel_id not in allowed_ids:
+        return False
+    return channel_id not in excluded_ids
+
+
+class VoiceDebouncer:
+    """Último estado de voz pendiente por usuario: user_id → (en canal, momento, datos)"""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._pending: Dict[int, Tuple[bool, float, Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def record(self, user_id: int, joined: bool, now: float, payload: Any = None) -> None:
+        """Registrar una entrada (True) o salida (False); reemplaza al evento pendiente anterior"""
+        self._pending[user_id] = (joined, now, payload)
+
+    def pop_settled(self, now: float) -> List[Tuple[int, bool, Any]]:
+        """Quitar y devolver los usuarios cuyo último evento ya superó la ventana"""
+        settled = [
+            (user_id, joined, payload)
+            for user_id, (joined, moment, payload) in self._pending.items()
+            if now - moment >= self.window
+        ]
+        for user_id, _, _ in settled:
+            del self._pending[user_id]
+        return settled
+
+    def next_settle_time(self) -> Optional[float]:
+        """Momento en que se asienta el próximo evento pendiente"""
+        if not self._pending:
+            return None
+        return min(moment for _, moment, _ in self._pending.values()) + self.window